@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from pathlib import Path
@@ -21,4 +21,13 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+def ensure_analysis_columns():
+    """Add columns introduced after the analyses table was first created"""
+    added_columns = {'loan_payload': 'TEXT', 'rules_version': 'VARCHAR', 'category_scores': 'TEXT'}
+    columns = {column['name'] for column in inspect(engine).get_columns('analyses')}
+    with engine.begin() as connection:
+        for name, column_type in added_columns.items():
+            if name not in columns:
+                connection.execute(text(f"ALTER TABLE analyses ADD COLUMN {name} {column_type}"))
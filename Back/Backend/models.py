@@ -28,6 +28,9 @@ class Analysis(Base):
     conditions = Column(Text)  # JSON string
     processing_time = Column(Float)  # in seconds
     confidence = Column(Float)  # 0-100
+    rules_version = Column(String)  # KYC rule snapshot used for risk_score
+    category_scores = Column(Text)  # JSON string, risk_score split by rule category
+    loan_payload = Column(Text)  # raw credit-service payload, JSON string
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
 class Feedback(Base):
@@ -0,0 +1,204 @@
+import json
+import logging
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, Set
+
+from prometheus_client import Gauge
+
+from src.risk_engine import RiskEngine
+from src.risk_engine.base import rules_version
+from .database import SessionLocal
+from . import models
+
+logger = logging.getLogger(__name__)
+
+RESCORE_PROGRESS = Gauge('rescore_progress_ratio', 'Share of stored analyses processed by the current re-scoring job')
+RESCORE_THROUGHPUT = Gauge('rescore_loans_per_second', 'Throughput of the current re-scoring job')
+
+# One worker so successive rule edits are applied to the portfolio in order
+rescoring_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rescoring")
+
+
+def changed_categories(old_rules: Dict[str, Dict[str, float]],
+                       new_rules: Dict[str, Dict[str, float]]) -> Set[str]:
+    """Rule categories whose items, weights or item order differ"""
+    return {
+        category
+        for category in set(old_rules) | set(new_rules)
+        if list(old_rules.get(category, {}).items()) != list(new_rules.get(category, {}).items())
+    }
+
+
+class RescoringJob:
+    """Recompute stored risk scores after the KYC rules changed.
+
+    Only the categories whose weights changed are re-evaluated. Each analysis
+    stores the score every rule category contributed; for rows scored under
+    the old rules the untouched categories are reused and only the changed
+    ones are scored again with the new rules. Any other row (an older rules
+    version, or no stored category scores) is fully re-evaluated. Analyses
+    are streamed in id order, scored in batches through
+    RiskEngine.category_scores_many and written back in bulk.
+    """
+
+    def __init__(self, old_rules: Dict[str, Dict[str, float]],
+                 new_rules: Dict[str, Dict[str, float]],
+                 session_factory=SessionLocal, batch_size: int = 500):
+        self.job_id = str(uuid.uuid4())
+        self.categories = changed_categories(old_rules, new_rules)
+        self.old_version = rules_version(old_rules)
+        self.engine = RiskEngine(new_rules)
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+
+        self.status = "pending"
+        self.total = 0
+        self.processed = 0
+        self.updated = 0
+        self.failed = 0
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.error: Optional[str] = None
+
+    def run(self):
+        """Stream every stored payload through the new engine and persist new scores"""
+        self.started_at = time.time()
+        self.status = "running"
+        if not self.categories:
+            logger.info("Rules unchanged - nothing to re-score")
+            self._finish("completed")
+            return
+
+        logger.info(f"Re-scoring job {self.job_id} started for categories: {sorted(self.categories)}")
+        db = self.session_factory()
+        try:
+            self.total = db.query(models.Analysis).filter(models.Analysis.loan_payload.isnot(None)).count()
+            last_id = 0
+            while True:
+                rows = (
+                    db.query(models.Analysis.id, models.Analysis.risk_score, models.Analysis.rules_version,
+                             models.Analysis.category_scores, models.Analysis.loan_payload)
+                    .filter(models.Analysis.loan_payload.isnot(None), models.Analysis.id > last_id)
+                    .order_by(models.Analysis.id)
+                    .limit(self.batch_size)
+                    .all()
+                )
+                if not rows:
+                    break
+                last_id = rows[-1].id
+
+                updates = self._rescore_batch(rows)
+                if updates:
+                    db.bulk_update_mappings(models.Analysis, updates)
+                    db.commit()
+                self._advance(len(rows))
+
+            self._finish("completed")
+            logger.info(
+                f"Re-scoring job {self.job_id} completed: {self.updated}/{self.processed} analyses updated "
+                f"({self.loans_per_second():.1f} loans/s)"
+            )
+        except Exception as e:
+            db.rollback()
+            self.error = str(e)
+            self._finish("failed")
+            logger.error(f"Re-scoring job {self.job_id} failed: {str(e)}")
+        finally:
+            db.close()
+
+    def _rescore_batch(self, rows) -> list:
+        """Compute updated risk scores for one batch of stored analyses"""
+        payloads, stored_scores, scored_rows = [], [], []
+        for row in rows:
+            try:
+                payloads.append(json.loads(row.loan_payload))
+                # Stored category scores are only valid on top of the old rules
+                stored = row.category_scores if row.rules_version == self.old_version else None
+                stored_scores.append(json.loads(stored) if stored else None)
+                scored_rows.append(row)
+            except (TypeError, ValueError) as e:
+                self.failed += 1
+                logger.warning(f"Skipping analysis {row.id} with unreadable payload: {str(e)}")
+
+        if not payloads:
+            return []
+
+        partial = [stored is not None for stored in stored_scores]
+        partial_payloads = [payload for payload, reuse in zip(payloads, partial) if reuse]
+        full_payloads = [payload for payload, reuse in zip(payloads, partial) if not reuse]
+        changed_parts = iter(self.engine.category_scores_many(partial_payloads, self.categories))
+        full_parts = iter(self.engine.category_scores_many(full_payloads))
+
+        updates = []
+        for row, stored, reuse in zip(scored_rows, stored_scores, partial):
+            if reuse:
+                category_scores = {
+                    category: score for category, score in stored.items() if category not in self.categories
+                }
+                category_scores.update(next(changed_parts))
+            else:
+                category_scores = next(full_parts)
+            risk_score = sum(category_scores.values())
+            if risk_score != row.risk_score:
+                self.updated += 1
+            updates.append({
+                'id': row.id,
+                'risk_score': risk_score,
+                'category_scores': json.dumps(category_scores, ensure_ascii=False),
+                'rules_version': self.engine.rules_version
+            })
+        return updates
+
+    def _advance(self, processed: int):
+        self.processed += processed
+        RESCORE_PROGRESS.set(self.processed / self.total if self.total else 1.0)
+        RESCORE_THROUGHPUT.set(self.loans_per_second())
+
+    def _finish(self, status: str):
+        self.finished_at = time.time()
+        self.status = status
+        RESCORE_PROGRESS.set(1.0 if status == "completed" else self.processed / (self.total or 1))
+        RESCORE_THROUGHPUT.set(self.loans_per_second())
+
+    def loans_per_second(self) -> float:
+        """Processed analyses per second since the job started"""
+        if not self.started_at:
+            return 0.0
+        elapsed = (self.finished_at or time.time()) - self.started_at
+        return self.processed / elapsed if elapsed > 0 else 0.0
+
+    def progress(self) -> Dict[str, Any]:
+        """Snapshot of the job state for the status endpoint"""
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "categories": sorted(self.categories),
+            "total": self.total,
+            "processed": self.processed,
+            "updated": self.updated,
+            "rules_version": self.engine.rules_version,
+            "failed": self.failed,
+            "progress": round(self.processed / self.total, 4) if self.total else (1.0 if self.status == "completed" else 0.0),
+            "loans_per_second": round(self.loans_per_second(), 2),
+            "error": self.error
+        }
+
+
+_latest_job: Optional[RescoringJob] = None
+
+
+def schedule_rescoring(old_rules: Dict[str, Dict[str, float]],
+                       new_rules: Dict[str, Dict[str, float]]) -> RescoringJob:
+    """Queue a re-scoring job on the background worker"""
+    global _latest_job
+    job = RescoringJob(old_rules, new_rules)
+    _latest_job = job
+    rescoring_pool.submit(job.run)
+    return job
+
+
+def latest_job() -> Optional[RescoringJob]:
+    """Most recently scheduled re-scoring job, if any"""
+    return _latest_job
@@ -1,14 +1,18 @@
+import argparse
 import json
 import logging
+import sys
 import traceback
 import asyncio
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Iterable, List, Optional
 from datetime import datetime
-from src.config import LOG_FILE, PDF_DIR
+from src.batch import BatchCheckpoint, BatchItem, BatchPipeline, Stage
+from src.config import BATCH_CONFIG, LOG_FILE, PDF_DIR
 from src.data_loader import DataLoader
-from src.risk_engine import RiskEngine, BusinessRulesEngine
-from src.llm import LLMAnalyzer, LoanVectorDB
+from src.risk_engine import RiskEngine, BusinessRulesEngine, rule_store
+from src.llm import AsyncLLMAnalyzer, LLMAnalyzer, LoanVectorDB
+from src.llm.readiness import model_readiness
 from src.reporting import ProfessionalPDF
 
 async def configure_logging(log_file: Path = LOG_FILE) -> None:
@@ -46,14 +50,16 @@ async def initialize_components() -> tuple:
         
         # Core components
         data_loader = DataLoader()
-        rules = data_loader.load_rules()  
+        rules_snapshot = rule_store.current()
+        logger.info("Using rules version %s", rules_snapshot.version)
         
-        risk_engine = RiskEngine(rules)
-        business_rules = BusinessRulesEngine()
+        risk_engine = rules_snapshot.risk_engine
+        business_rules = rules_snapshot.business_rules
         vector_db = LoanVectorDB()
         
         # LLM components
         llm_analyzer = LLMAnalyzer(vector_db)
+        model_readiness.start()
         
         logger.info("All components initialized successfully")
         return data_loader, risk_engine, business_rules, vector_db, llm_analyzer
@@ -63,12 +69,12 @@ async def initialize_components() -> tuple:
         raise
 
 async def load_loan_data_fallback(loan_id: Optional[str] = None, 
-                                external_id: Optional[str] = None) -> Dict[str, Any]:
+                                external_id: Optional[str] = None,
+                                data_loader: Optional[DataLoader] = None) -> Dict[str, Any]:
     """Load loan data with fallback to local JSON file"""
     try:
-        # Try to load from API first
-        from src.data_loader import DataLoader
-        data_loader = DataLoader()
+        # Try to load from API first, reusing the caller's loader when given
+        data_loader = data_loader or DataLoader()
         return await data_loader.load_loan_data(loan_id, external_id)
     except Exception as api_error:
         print(f"API unavailable, using fallback data: {api_error}")
@@ -149,15 +155,7 @@ async def generate_report(assessment: Dict[str, Any]) -> Path:
     
     try:
         logger.info("Generating PDF report")
-
-        # Create report with timestamp
-        loan_id = assessment['loan_info']['basic_info'].get('loan_id', 'unknown')
-        report_date = datetime.now().strftime('%Y%m%d_%H%M%S')
-        report_filename = PDF_DIR / f"loan_assessment_{loan_id}_{report_date}.pdf"
-        
-        pdf = ProfessionalPDF()
-        pdf.generate_report(assessment, report_filename)
-        
+        report_filename = write_report(assessment)
         logger.info("Report generated: %s", report_filename)
         return report_filename
         
@@ -165,6 +163,16 @@ async def generate_report(assessment: Dict[str, Any]) -> Path:
         logger.error("Report generation failed: %s", str(e))
         raise
 
+def write_report(assessment: Dict[str, Any]) -> Path:
+    """Render the PDF report of an assessment, named by loan id and timestamp"""
+    loan_id = assessment['loan_info']['basic_info'].get('loan_id', 'unknown')
+    report_date = datetime.now().strftime('%Y%m%d_%H%M%S')
+    report_filename = PDF_DIR / f"loan_assessment_{loan_id}_{report_date}.pdf"
+
+    pdf = ProfessionalPDF()
+    pdf.generate_report(assessment, report_filename)
+    return report_filename
+
 async def run_loan_processing(loan_id: Optional[str] = None, 
                             external_id: Optional[str] = None) -> Path:
     """Run the complete loan processing pipeline"""
@@ -211,9 +219,126 @@ async def run_loan_processing(loan_id: Optional[str] = None,
     finally:
         await data_loader.close()
 
+def read_loan_ids(source: str) -> List[str]:
+    """Loan ids from a file, or stdin for "-": one per line, blank lines and # comments ignored"""
+    lines = sys.stdin if source == "-" else open(source, 'r')
+    try:
+        return [line.strip() for line in lines if line.strip() and not line.strip().startswith('#')]
+    finally:
+        if lines is not sys.stdin:
+            lines.close()
+
+def build_batch_stages(data_loader: DataLoader,
+                       risk_engine: RiskEngine,
+                       business_rules: BusinessRulesEngine,
+                       llm_analyzer: AsyncLLMAnalyzer,
+                       workers: Dict[str, int]) -> List[Stage]:
+    """fetch -> risk -> llm -> pdf -> store, sharing one set of initialized components"""
+
+    async def fetch(item: BatchItem):
+        # No demo-data fallback here: an API error must fail the loan, not score Loan2.json under its id
+        item.data['raw'] = await data_loader.load_loan_data(item.loan_id)
+
+    async def risk(item: BatchItem):
+        assessment = await asyncio.to_thread(risk_engine.evaluate, item.data.pop('raw'))
+        if not assessment.get('risk_assessment'):
+            raise ValueError("Risk assessment failed - no results")
+        assessment['business_rules'] = await asyncio.to_thread(business_rules.apply_rules, assessment)
+        item.data['assessment'] = assessment
+
+    async def llm(item: BatchItem):
+        assessment = item.data['assessment']
+        analysis = await llm_analyzer.analyze_loan_async(assessment)
+        # analyze_loan_async swallows LLM errors; read its type before the next await so
+        # another worker cannot overwrite it, and don't checkpoint a placeholder analysis
+        if llm_analyzer.last_analysis_type == 'fallback':
+            raise RuntimeError(f"LLM analysis failed: {'; '.join(analysis.get('rationale', []))}")
+        assessment['llm_analysis'] = analysis
+
+    async def pdf(item: BatchItem):
+        item.data['report'] = await asyncio.to_thread(write_report, item.data['assessment'])
+
+    async def store(item: BatchItem):
+        await llm_analyzer.store_current_loan_async(item.data['assessment'])
+
+    return [
+        Stage('fetch', fetch, workers['fetch']),
+        Stage('risk', risk, workers['risk']),
+        Stage('llm', llm, workers['llm']),
+        Stage('pdf', pdf, workers['pdf']),
+        Stage('store', store, workers['store'])
+    ]
+
+def _batch_result(item: BatchItem) -> Dict[str, Any]:
+    """Checkpoint details of a finished loan; drops its assessment from memory"""
+    assessment = item.data.pop('assessment')
+    return {
+        'recommendation': assessment['llm_analysis']['recommendation'],
+        'report': str(item.data.pop('report'))
+    }
+
+async def run_batch(loan_ids: Iterable[str],
+                    checkpoint_file: Path = BATCH_CONFIG['checkpoint_file'],
+                    summary_file: Optional[Path] = None,
+                    workers: Optional[Dict[str, int]] = None,
+                    queue_size: int = BATCH_CONFIG['queue_size']) -> Dict[str, Any]:
+    """Analyze many loans with one set of components and a pipelined, resumable run"""
+    await configure_logging()
+    await log_system_info()
+    logger = logging.getLogger(__name__)
+
+    data_loader = DataLoader()
+    try:
+        rules_snapshot = rule_store.current()
+        logger.info("Using rules version %s", rules_snapshot.version)
+        llm_analyzer = AsyncLLMAnalyzer(LoanVectorDB())
+        model_readiness.start()
+
+        stages = build_batch_stages(
+            data_loader, rules_snapshot.risk_engine, rules_snapshot.business_rules, llm_analyzer,
+            {**BATCH_CONFIG['workers'], **(workers or {})}
+        )
+        pipeline = BatchPipeline(stages, BatchCheckpoint(checkpoint_file), queue_size, on_done=_batch_result)
+        summary = await pipeline.run(loan_ids)
+    finally:
+        await data_loader.close()
+
+    summary_file = summary_file or Path(checkpoint_file).with_suffix('.summary.json')
+    with open(summary_file, 'w') as f:
+        json.dump(summary, f, indent=2)
+
+    loans = summary['loans']
+    print(f"\nProcessed {loans['done']} loans in {summary['elapsed_seconds']}s "
+          f"({loans['failed']} failed, {loans['skipped']} already done, {loans['loans_per_minute']} loans/min)")
+    for name, stats in summary['stages'].items():
+        print(f"  {name:<6} workers={stats['workers']:<2} processed={stats['processed']:<6} "
+              f"failed={stats['failed']:<4} busy={stats['busy_seconds']}s rate={stats['loans_per_minute']}/min")
+    print(f"Summary written to {summary_file}")
+    return summary
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run loan assessments and generate PDF reports")
+    parser.add_argument('--loan-id', default="33415", help="Loan to process in single-loan mode")
+    parser.add_argument('--external-id', default="33421", help="External id for single-loan mode")
+    parser.add_argument('--batch', metavar='FILE', help="File of loan ids, one per line, or - for stdin")
+    parser.add_argument('--checkpoint', type=Path, default=BATCH_CONFIG['checkpoint_file'],
+                        help="Progress file; loans recorded as done are skipped on the next run")
+    parser.add_argument('--summary', type=Path, help="Where to write the batch summary JSON")
+    parser.add_argument('--queue-size', type=int, default=BATCH_CONFIG['queue_size'],
+                        help="Loans allowed to wait between two stages")
+    for stage, count in BATCH_CONFIG['workers'].items():
+        parser.add_argument(f'--{stage}-workers', type=int, default=count, help=f"Concurrent {stage} workers")
+    return parser.parse_args(argv)
+
 if __name__ == "__main__":
-    # Example usage - you can modify these IDs directly
-    LOAN_ID = "33415"  # Replace with actual loan ID or None
-    EXTERNAL_ID = "33421"  # Replace with actual external ID or None
-    
-    asyncio.run(run_loan_processing(loan_id=LOAN_ID, external_id=EXTERNAL_ID))
\ No newline at end of file
+    args = parse_args()
+    if args.batch:
+        asyncio.run(run_batch(
+            read_loan_ids(args.batch),
+            checkpoint_file=args.checkpoint,
+            summary_file=args.summary,
+            workers={stage: getattr(args, f'{stage}_workers') for stage in BATCH_CONFIG['workers']},
+            queue_size=args.queue_size
+        ))
+    else:
+        asyncio.run(run_loan_processing(loan_id=args.loan_id, external_id=args.external_id))
\ No newline at end of file
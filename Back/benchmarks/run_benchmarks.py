@@ -0,0 +1,137 @@
+"""Risk scoring micro-benchmarks.
+
+Run from the ``Back`` directory::
+
+    python -m benchmarks.run_benchmarks --loans 2000 --udf-groups 8 --json baseline.json
+
+Every case is timed without tracing (best of ``--repeat`` runs) and then run
+once more under tracemalloc to report peak and retained memory per item.
+"""
+import argparse
+import gc
+import json
+import logging
+import platform
+import random
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Sequence
+
+from src.data_loader import DataLoader
+from src.llm.prompts import LLMPromptBuilder
+from src.risk_engine import RiskEngine, BusinessRulesEngine, IncrementalRiskEvaluator
+from .synthetic import SyntheticLoanGenerator, BRANCHES, ADDRESSES
+
+
+def measure(name: str, func: Callable[[Any], Any], items: Sequence[Any], repeat: int,
+            loans_per_item: int = 1) -> Dict[str, Any]:
+    """Throughput and per-item memory of ``func`` applied to every item
+
+    ``loans_per_item`` normalizes batch cases, where one item is a whole batch.
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        for item in items:
+            func(item)
+        best = min(best, time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        results = [func(item) for item in items]
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del results
+
+    count = len(items) * loans_per_item
+    return {
+        'name': name,
+        'items': count,
+        'seconds': round(best, 4),
+        'items_per_second': round(count / best, 1) if best > 0 else None,
+        'us_per_item': round(best / count * 1e6, 2),
+        'peak_kib_per_item': round(peak / count / 1024, 2),
+        'retained_kib_per_item': round(retained / count / 1024, 2)
+    }
+
+
+def run(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    rules = DataLoader.read_rules()
+    generator = SyntheticLoanGenerator(
+        seed=args.seed,
+        udf_groups=args.udf_groups,
+        udf_fields=args.udf_fields,
+        aml_checks=args.aml_checks,
+        rules=rules
+    )
+    loans = list(generator.loans(args.loans))
+    engine = RiskEngine(rules)
+    business_rules = BusinessRulesEngine()
+
+    assessments = [engine.evaluate(loan) for loan in loans]
+    for assessment in assessments:
+        assessment['business_rules'] = business_rules.apply_rules(assessment)
+
+    rng = random.Random(args.seed)
+    rule_lookups = []
+    for _ in range(args.loans * 10):
+        category = rng.choice(list(rules))
+        value = rng.choice(list(rules[category]) + ['valeur inconnue'])
+        rule_lookups.append((category, f"  {value.lower()} "))
+    # Re-evaluating unchanged loans, the common case of a repeated live analysis
+    incremental = IncrementalRiskEvaluator(max_loans=len(loans))
+    for loan in loans:
+        incremental.evaluate(engine, loan)
+
+    regions = [(f"{rng.choice(BRANCHES)}\r\n", rng.choice(ADDRESSES)) for _ in range(args.loans * 10)]
+
+    cases = [
+        measure('RiskEngine.evaluate', engine.evaluate, loans, args.repeat),
+        measure('IncrementalRiskEvaluator.evaluate', lambda loan: incremental.evaluate(engine, loan),
+                loans, args.repeat),
+        measure('RiskEngine.evaluate_many', engine.evaluate_many, [loans], args.repeat,
+                loans_per_item=len(loans)),
+        measure('RiskEngine._find_matching_rule', lambda lookup: engine._find_matching_rule(*lookup),
+                rule_lookups, args.repeat),
+        measure('RiskEngine._extract_region', lambda pair: engine._extract_region(*pair), regions, args.repeat),
+        measure('BusinessRulesEngine.apply_rules', business_rules.apply_rules, assessments, args.repeat),
+        measure('LLMPromptBuilder.build_basic_prompt', LLMPromptBuilder.build_basic_prompt, assessments, args.repeat)
+    ]
+    return cases
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Risk scoring micro-benchmarks")
+    parser.add_argument('--loans', type=int, default=1000, help="Synthetic loans per case")
+    parser.add_argument('--udf-groups', type=int, default=4, help="UDF groups per loan")
+    parser.add_argument('--udf-fields', type=int, default=6, help="Fields per UDF group")
+    parser.add_argument('--aml-checks', type=int, default=2, help="AML checks per customer")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--repeat', type=int, default=3, help="Timed runs per case (best is kept)")
+    parser.add_argument('--json', help="Also write the results to this file")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    results = run(args)
+
+    print(f"{'case':<40}{'items/s':>14}{'us/item':>12}{'peak KiB':>11}{'kept KiB':>11}")
+    for case in results:
+        print(f"{case['name']:<40}{case['items_per_second']:>14,.1f}{case['us_per_item']:>12.2f}"
+              f"{case['peak_kib_per_item']:>11.2f}{case['retained_kib_per_item']:>11.2f}")
+
+    if args.json:
+        report = {
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'parameters': vars(args),
+            'results': results
+        }
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+import copy
+import json
+import random
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from src.config import DATA_DIR
+from src.data_loader import DataLoader
+
+TEMPLATE_FILES = ('Loan1.json', 'Loan2.json')
+
+BRANCHES = ['AGENCE GABES', 'AGENCE TUNIS', 'AGENCE SFAX', 'AGENCE SOUSSE', 'AGENCE KAIROUAN', 'AGENCE GAFSA']
+ADDRESSES = ['charguia', 'Tunis, Tunisia', 'Route de Gabès km 3', 'cité el amal', 'Sfax el jadida', '']
+MARITAL_STATUSES = ['S', 'M', 'D', 'W', 'marié', 'Célibataire', 'divorcee', 'N/A']
+CUSTOMER_TYPES = ['INDIV', 'SA', 'SARL', 'SUARL', 'ONG', 'Société Personne Physique']
+AML_LISTS = ['PPE', 'OFAC', 'UN', 'EU', 'CNLCT']
+AML_STATUSES = ['SAFE', 'SAFE', 'SAFE', 'MATCH', 'PENDING']
+FILLER_FIELDS = ['Nombre d\'enfants', 'Ancienneté', 'Revenu mensuel', 'Observation agent', 'Source de revenu']
+
+
+def load_templates(data_dir: Path = DATA_DIR) -> List[Dict[str, Any]]:
+    """Real credit-service payloads used as the shape of generated loans"""
+    templates = []
+    for name in TEMPLATE_FILES:
+        with open(data_dir / name, 'r', encoding='utf-8') as f:
+            templates.append(json.load(f))
+    return templates
+
+
+class SyntheticLoanGenerator:
+    """Reproducible loan payloads shaped like ``Data/Loan1.json``.
+
+    Each loan is a copy of one of the real payloads with its scored fields
+    (product, purpose, sector, customer demographics, branch) drawn from the
+    KYC rule items, plus ``udf_groups`` x ``udf_fields`` UDF fields and
+    ``aml_checks`` AML checks.
+    """
+
+    def __init__(self, seed: int = 42, udf_groups: int = 4, udf_fields: int = 6,
+                 aml_checks: int = 2, rules: Optional[Dict[str, Dict[str, float]]] = None):
+        self.random = random.Random(seed)
+        self.udf_groups = udf_groups
+        self.udf_fields = udf_fields
+        self.aml_checks = aml_checks
+        self.rules = rules if rules is not None else DataLoader.read_rules()
+        self.templates = load_templates()
+
+    def _items(self, category: str, fallback: List[str]) -> List[str]:
+        return list(self.rules.get(category, {})) or fallback
+
+    def _udf_data(self) -> List[Dict[str, Any]]:
+        udf_values = {
+            'Type d\'activité': self._items('Type d\'activité', ['Commerce']),
+            'Niveau d\'étude': self._items('Niveau d\'étude', ['Primaire', 'Secondaire', 'Universitaire']),
+            'Type Logement': self._items('Type de logement', ['Propriétaire', 'Locataire']),
+            'Couverture sociale': self._items('Couverture sociale', ['CNSS', 'CNRPS', 'Aucune']),
+            'Patenté': ['Oui', 'Non'],
+            'Résident': ['Oui', 'Non'],
+            'Appréciation du niveau de vie': self._items('Niveau de vie', ['Moyen', 'Bon'])
+        }
+        scored_names = list(udf_values)
+        groups = []
+        for group_index in range(self.udf_groups):
+            fields = []
+            for field_index in range(self.udf_fields):
+                if self.random.random() < 0.5:
+                    name = self.random.choice(scored_names)
+                    value = self.random.choice(udf_values[name])
+                else:
+                    name = self.random.choice(FILLER_FIELDS)
+                    value = str(self.random.randint(0, 5000))
+                fields.append({
+                    'idUDFField': group_index * 100 + field_index,
+                    'fieldName': name,
+                    'value': value,
+                    'mandatory': self.random.random() < 0.3
+                })
+            groups.append({
+                'idUDFGroup': group_index,
+                'userDefinedFieldGroupName': f"Groupe {group_index + 1}",
+                'udfGroupeFieldsModels': fields
+            })
+        return groups
+
+    def loan(self, loan_id: int) -> Dict[str, Any]:
+        """One synthetic payload"""
+        loan = copy.deepcopy(self.random.choice(self.templates))
+        branch = self.random.choice(BRANCHES)
+        loan.update({
+            'loanId': loan_id,
+            'idLoanExtern': loan_id + 1000000,
+            'productCode': self.random.choice(self._items('Produit', ['Herfeti'])),
+            'loanReasonCode': self.random.choice(self._items('Raison de financement', ['Services'])),
+            'industryCode': self.random.choice(self._items('Secteur d\'activité', ['3'])),
+            'branchDescription': f"{branch}\r\n",
+            'approvelAmount': round(self.random.uniform(1000, 30000), 3),
+            'applyAmountTotal': round(self.random.uniform(1000, 30000), 3),
+            'termPeriodNum': self.random.choice([6, 12, 18, 24, 36]),
+            'udf_data': self._udf_data()
+        })
+        customer = loan.setdefault('customerDTO', {})
+        customer.update({
+            'customerType': self.random.choice(CUSTOMER_TYPES),
+            'gender': self.random.choice(['M', 'F']),
+            'maritalStatus': self.random.choice(MARITAL_STATUSES),
+            'customerAddress': self.random.choice(ADDRESSES),
+            'age': self.random.randint(18, 80),
+            'acmAmlChecksDTOs': [
+                {
+                    'customerId': customer.get('id'),
+                    'score': self.random.choice([0, 0, 10, 33, 60]),
+                    'listName': self.random.choice(AML_LISTS),
+                    'amlStatus': self.random.choice(AML_STATUSES)
+                }
+                for _ in range(self.aml_checks)
+            ]
+        })
+        return loan
+
+    def loans(self, count: int, start_id: int = 100000) -> Iterator[Dict[str, Any]]:
+        """Yield ``count`` payloads with consecutive loan ids"""
+        for offset in range(count):
+            yield self.loan(start_id + offset)
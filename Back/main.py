@@ -26,11 +26,20 @@ from prometheus_fastapi_instrumentator import Instrumentator
 from prometheus_client import Counter, Histogram, Gauge, generate_latest, CONTENT_TYPE_LATEST
 
 # Import backend modules
-from Backend.database import get_db, engine, Base
+from Backend.database import get_db, SessionLocal, engine, Base, ensure_analysis_columns
 from Backend import models, schemas
+from Backend.rescoring import schedule_rescoring, latest_job
 
 # Import analysis functions
 from analyse import load_loan_data_fallback
+from src.data_loader import DataLoader
+from src.risk_engine import rule_store, incremental_evaluator
+from src.scheduler import analysis_scheduler, QueueFullError, PRIORITIES, PRIORITY_INTERACTIVE
+from src.llm.readiness import model_readiness
+from src.llm.backends import ollama_backends
+from src.llm.feedback import FeedbackSystem
+from src.llm.vector_db import shared_vector_db
+from src.llm.analyzer import reembed_stale_loans
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -38,6 +47,7 @@ logger = logging.getLogger(__name__)
 
 # Create tables
 Base.metadata.create_all(bind=engine)
+ensure_analysis_columns()
 
 app = FastAPI(
     title="Loan Analysis API", 
@@ -144,6 +154,7 @@ async def send_websocket_update(analysis_id: str, message_type: str, data: Dict[
 async def process_loan_with_websocket(data_loader, risk_engine, business_rules, llm_analyzer, analysis_id, loan_id=None, external_id=None):
     """Process loan with detailed WebSocket updates including PDF generation"""
     logger.info(f"STARTING ANALYSIS PROCESS for analysis_id: {analysis_id}, loan_id: {loan_id}, external_id: {external_id}")
+    process_start = time.time()
     
     try:
         # Send immediate confirmation that processing has started
@@ -202,7 +213,8 @@ async def process_loan_with_websocket(data_loader, risk_engine, business_rules,
         
         assessment = await loop.run_in_executor(
             thread_pool,
-            risk_engine.evaluate,
+            incremental_evaluator.evaluate,
+            risk_engine,
             raw_loan_data
         )
         
@@ -210,7 +222,7 @@ async def process_loan_with_websocket(data_loader, risk_engine, business_rules,
             raise ValueError("Risk assessment failed - no results")
             
         await send_websocket_update(analysis_id, "log", {
-            "message": f"Risk assessment completed - Score: {assessment['risk_assessment']['total_score']}, Level: {assessment['risk_assessment']['risk_level']}",
+            "message": f"Risk assessment completed - Score: {assessment['risk_assessment']['total_score']}, Level: {assessment['risk_assessment']['risk_level']} (rules {assessment.get('rules_version')})",
             "level": "success"
         })
         
@@ -246,11 +258,11 @@ async def process_loan_with_websocket(data_loader, risk_engine, business_rules,
             "progress": 70
         })
         
-        analysis = await loop.run_in_executor(
-            thread_pool,
-            llm_analyzer.analyze_loan,
-            assessment
-        )
+        async def forward_token(token: str, replace: bool = False):
+            # replace=True: the text supersedes what was streamed so far (a failed contextual run)
+            await send_websocket_update(analysis_id, "llm_token", {"token": token, "replace": replace})
+        
+        analysis = await llm_analyzer.analyze_loan_async(assessment, on_token=forward_token)
         assessment['llm_analysis'] = analysis
         
         await send_websocket_update(analysis_id, "log", {
@@ -262,6 +274,29 @@ async def process_loan_with_websocket(data_loader, risk_engine, business_rules,
             "progress": 80
         })
         
+        # Keep the raw payload so the analysis can be re-scored when rules change,
+        # whether or not the PDF report is generated afterwards
+        loan_id = assessment['loan_info']['basic_info'].get('loan_id', 'unknown')
+        try:
+            category_scores = risk_engine.category_scores_many([raw_loan_data])[0]
+            with SessionLocal() as db:
+                db.add(models.Analysis(
+                    analysis_id=analysis_id,
+                    loan_id=str(loan_id),
+                    risk_score=assessment['risk_assessment']['total_score'],
+                    decision=analysis.get('recommendation', 'review'),
+                    summary=analysis.get('summary', ''),
+                    key_findings=json.dumps(analysis.get('key_findings', [])),
+                    conditions=json.dumps(analysis.get('conditions', [])),
+                    processing_time=time.time() - process_start,
+                    rules_version=assessment.get('rules_version'),
+                    category_scores=json.dumps(category_scores, ensure_ascii=False),
+                    loan_payload=json.dumps(raw_loan_data, default=str)
+                ))
+                db.commit()
+        except Exception as e:
+            logger.warning(f"Failed to save analysis record for {analysis_id}: {e}")
+        
         # PDF Generation
         await send_websocket_update(analysis_id, "log", {
             "message": "Generating PDF report",
@@ -274,7 +309,6 @@ async def process_loan_with_websocket(data_loader, risk_engine, business_rules,
             pdf = ProfessionalPDF()
             
             # Create report with timestamp
-            loan_id = assessment['loan_info']['basic_info'].get('loan_id', 'unknown')
             report_date = datetime.now().strftime('%Y%m%d_%H%M%S')
             report_filename = pdf_dir / f"loan_assessment_{loan_id}_{report_date}.pdf"
             
@@ -296,11 +330,7 @@ async def process_loan_with_websocket(data_loader, risk_engine, business_rules,
             
             # Store loan in vector DB
             try:
-                await loop.run_in_executor(
-                    thread_pool,
-                    llm_analyzer.store_current_loan,
-                    assessment
-                )
+                await llm_analyzer.store_current_loan_async(assessment)
                 await send_websocket_update(analysis_id, "log", {
                     "message": "Loan data stored in vector database",
                     "level": "success"
@@ -313,16 +343,16 @@ async def process_loan_with_websocket(data_loader, risk_engine, business_rules,
             
             # Create PDF report entry in database
             try:
-                db = next(get_db())
-                pdf_report = models.PDFReport(
-                    loan_id=loan_id,
-                    file_name=report_filename.name,
-                    file_path=str(report_filename),
-                    file_size=report_filename.stat().st_size,
-                    generated_at=datetime.now()
-                )
-                db.add(pdf_report)
-                db.commit()
+                with SessionLocal() as db:
+                    pdf_report = models.PDFReport(
+                        loan_id=loan_id,
+                        file_name=report_filename.name,
+                        file_path=str(report_filename),
+                        file_size=report_filename.stat().st_size,
+                        generated_at=datetime.now()
+                    )
+                    db.add(pdf_report)
+                    db.commit()
                 
                 await send_websocket_update(analysis_id, "log", {
                     "message": "PDF report saved to database",
@@ -344,7 +374,7 @@ async def process_loan_with_websocket(data_loader, risk_engine, business_rules,
         # Send completion
         await send_websocket_update(analysis_id, "result", {
             "analysis": analysis,
-            "assessment": assessment,
+            "assessment": assessment.to_dict(),
             "pdf_generated": True,
             "pdf_filename": report_filename.name,
             "message": "Analysis completed successfully!"
@@ -393,6 +423,22 @@ def track_memory_usage():
             logger.error(f"Memory tracking error: {e}")
             time.sleep(60)
 
+# Re-score stored analyses whenever the rules change, through the API or a hot reload
+rule_store.subscribe(lambda previous, snapshot: schedule_rescoring(previous.rules, snapshot.rules))
+# Cached indicator rows of the replaced rules version can never be reused
+rule_store.subscribe(lambda previous, snapshot: incremental_evaluator.forget_rules_version(previous.version))
+
+def migrate_stale_embeddings():
+    """Re-embed loans stored from an older embedding view once the models are ready"""
+    model_readiness.start().join()
+    if not model_readiness.status()['ready']:
+        logger.warning("Skipping embedding migration: Ollama models are not ready")
+        return
+    try:
+        reembed_stale_loans()
+    except Exception as e:
+        logger.error(f"Embedding migration failed: {str(e)}")
+
 # Start the memory tracking thread when the app starts
 @app.on_event("startup")
 async def startup_event():
@@ -402,6 +448,14 @@ async def startup_event():
     memory_thread.start()
     logger.info("Memory monitoring started")
 
+    # Check, pull and pre-load the Ollama models without blocking requests
+    model_readiness.start()
+    if ollama_backends.is_pooled:
+        ollama_backends.start_health_checks()
+
+    # Vectors from an older embedding view are not comparable with new query embeddings
+    threading.Thread(target=migrate_stale_embeddings, name="embedding-migration", daemon=True).start()
+
 # Add middleware to track requests
 @app.middleware("http")
 async def monitor_requests(request: Request, call_next):
@@ -456,6 +510,9 @@ def health_check(db: Session = Depends(get_db)):
             "status": "healthy", 
             "message": "Loan Analysis API is running",
             "database": "connected",
+            "analysis_queue": analysis_scheduler.stats(),
+            "llm_models": model_readiness.status(),
+            "llm_backends": ollama_backends.stats(),
             "timestamp": datetime.now().isoformat()
         }
     except Exception as e:
@@ -673,40 +730,50 @@ def read_loan(loan_id: str, db: Session = Depends(get_db)):
 
 # ✅ UPDATED: Analysis creation endpoint with detailed WebSocket logging
 @app.post("/api/analyses")
-async def create_analysis(loan_data: Dict[str, Any]):
+async def create_analysis(loan_data: Dict[str, Any], request: Request):
     """Create a new loan analysis with detailed WebSocket updates"""
     loan_id = loan_data.get('loan_id', 'unknown')
     ANALYSIS_TOTAL.labels(loan_id=loan_id).inc()
     
     try:
+        # Refuse early, before building any components, when the queue is full
+        priority = PRIORITIES.get(loan_data.get('priority', 'interactive'), PRIORITY_INTERACTIVE)
+        analysis_scheduler.check_capacity(priority)
+        
         analysis_id = str(uuid.uuid4())
         
         # Import the components we need
-        from src.data_loader import DataLoader
-        from src.risk_engine import RiskEngine, BusinessRulesEngine
-        from src.llm import LLMAnalyzer, LoanVectorDB
+        from src.llm import AsyncLLMAnalyzer, LoanVectorDB
         
-        # Initialize components
+        # Initialize components - rules come from the shared, versioned snapshot
         data_loader = DataLoader()
-        rules = data_loader.load_rules()
-        risk_engine = RiskEngine(rules)
-        business_rules = BusinessRulesEngine()
+        rules_snapshot = rule_store.current()
         vector_db = LoanVectorDB()
-        llm_analyzer = LLMAnalyzer(vector_db)
+        llm_analyzer = AsyncLLMAnalyzer(vector_db)
         
-        # ✅ CRITICAL FIX: Start analysis in background task WITH proper async handling
-        asyncio.create_task(
-            process_loan_with_websocket(
-                data_loader, risk_engine, business_rules, llm_analyzer,
+        # Queue the analysis on the bounded scheduler; UI requests go before batch re-runs
+        client_id = request.headers.get("X-Client-Id") or (request.client.host if request.client else "anonymous")
+        await analysis_scheduler.submit(
+            lambda: process_loan_with_websocket(
+                data_loader, rules_snapshot.risk_engine, rules_snapshot.business_rules, llm_analyzer,
                 analysis_id, 
                 loan_data.get('loan_id'), 
                 loan_data.get('external_id')
-            )
+            ),
+            client_id=client_id,
+            priority=priority
         )
         
         # ✅ Send immediate response so frontend can connect WebSocket
-        return {"analysis_id": analysis_id}
-        
+        return {"analysis_id": analysis_id, "queue": analysis_scheduler.stats()}
+        
+    except QueueFullError as e:
+        logger.warning(f"Analysis for loan {loan_id} refused: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
     except Exception as e:
         error_type = type(e).__name__
         ANALYSIS_FAILURE.labels(error_type=error_type).inc()
@@ -868,7 +935,7 @@ def create_feedback(feedback: schemas.FeedbackCreate, db: Session = Depends(get_
             db.refresh(loan)
         
         # Also save to JSON file
-        save_feedback_to_json({
+        feedback_entry = {
             'loan_id': feedback.loan_id,
             'analyst_id': 'web_user',
             'agent_recommendation': feedback.agent_recommendation,
@@ -876,7 +943,8 @@ def create_feedback(feedback: schemas.FeedbackCreate, db: Session = Depends(get_
             'rating': feedback.rating,
             'comments': feedback.comments,
             'timestamp': datetime.now().isoformat()
-        })
+        }
+        save_feedback_to_json(feedback_entry)
         
         db_feedback = models.Feedback(
             loan_id=feedback.loan_id,
@@ -889,6 +957,14 @@ def create_feedback(feedback: schemas.FeedbackCreate, db: Session = Depends(get_
         db.commit()
         db.refresh(db_feedback)
         
+        # Make the review available to similar-loan analyses and rebuild the summaries citing it
+        try:
+            FeedbackSystem(shared_vector_db()).apply_feedback(
+                feedback.loan_id, feedback_entry, {'recommendation': feedback.agent_recommendation}
+            )
+        except Exception as e:
+            logger.warning(f"Feedback not applied to the vector DB: {e}")
+        
         # Notify via WebSocket
         asyncio.run(manager.send_message("new_feedback", {
             "type": "feedback_created",
@@ -997,14 +1073,11 @@ def get_rules():
 def update_rules(updated_rules: List[Dict[str, Any]]):
     """Update risk rules"""
     try:
-        rules_file = Path("./Data/KYC.LOV.csv")
-        
-        fieldnames = ['Category', 'Item', 'Weight']
+        old_version = rule_store.current().version
         
-        with open(rules_file, 'w', encoding='utf-8', newline='') as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(updated_rules)
+        # Atomic replace + swap; the swap schedules re-scoring of stored analyses in the background
+        new_snapshot = rule_store.write(updated_rules)
+        job = latest_job() if new_snapshot.version != old_version else None
         
         # Notify via WebSocket
         asyncio.run(manager.send_message("rules_updated", {
@@ -1012,7 +1085,14 @@ def update_rules(updated_rules: List[Dict[str, Any]]):
             "count": len(updated_rules)
         }))
         
-        return {"message": "Rules updated successfully"}
+        return {
+            "message": "Rules updated successfully",
+            "rules_version": new_snapshot.version,
+            "rescoring_job": job.job_id if job else None
+        }
+    except ValueError as e:
+        logger.warning(f"Rejected rules update: {e}")
+        raise HTTPException(status_code=400, detail=f"Invalid rules: {e}")
     except Exception as e:
         logger.error(f"Error updating rules: {e}")
         raise HTTPException(status_code=500, detail="Failed to update rules")
@@ -1117,13 +1197,11 @@ def reset_rules():
             {'Category': 'Couverture sociale', 'Item': 'Non', 'Weight': '2'}
         ]
         
-        rules_file = Path("./Data/KYC.LOV.csv")
-        fieldnames = ['Category', 'Item', 'Weight']
+        old_version = rule_store.current().version
         
-        with open(rules_file, 'w', encoding='utf-8', newline='') as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(default_rules)
+        # Atomic replace + swap; the swap schedules re-scoring of stored analyses in the background
+        new_snapshot = rule_store.write(default_rules)
+        job = latest_job() if new_snapshot.version != old_version else None
         
         # Notify via WebSocket
         asyncio.run(manager.send_message("rules_reset", {
@@ -1131,11 +1209,23 @@ def reset_rules():
             "count": len(default_rules)
         }))
         
-        return {"message": "Rules reset to default"}
+        return {
+            "message": "Rules reset to default",
+            "rules_version": new_snapshot.version,
+            "rescoring_job": job.job_id if job else None
+        }
     except Exception as e:
         logger.error(f"Error resetting rules: {e}")
         raise HTTPException(status_code=500, detail="Failed to reset rules")
 
+@app.get("/api/rules/rescoring")
+def get_rescoring_status():
+    """Progress of the latest portfolio re-scoring job"""
+    job = latest_job()
+    if job is None:
+        raise HTTPException(status_code=404, detail="No re-scoring job has run")
+    return job.progress()
+
 # Clear cache endpoint for development
 @app.post("/clear-cache")
 async def clear_cache():
@@ -0,0 +1,187 @@
+import asyncio
+import json
+import logging
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+StageFunc = Callable[["BatchItem"], Awaitable[None]]
+
+
+class BatchItem:
+    """One loan moving through the batch pipeline"""
+    __slots__ = ('loan_id', 'data', 'started_at')
+
+    def __init__(self, loan_id: str):
+        self.loan_id = loan_id
+        self.data: Dict[str, Any] = {}
+        self.started_at = time.monotonic()
+
+
+class Stage:
+    """A pipeline step run by ``concurrency`` workers"""
+
+    def __init__(self, name: str, func: StageFunc, concurrency: int = 1):
+        self.name = name
+        self.func = func
+        self.concurrency = max(1, concurrency)
+        self.processed = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+        self.first_started: Optional[float] = None
+        self.last_finished: Optional[float] = None
+
+    def stats(self) -> Dict[str, Any]:
+        active = (self.last_finished or 0.0) - (self.first_started or 0.0)
+        return {
+            'workers': self.concurrency,
+            'processed': self.processed,
+            'failed': self.failed,
+            'busy_seconds': round(self.busy_seconds, 2),
+            'loans_per_minute': round(60 * self.processed / active, 2) if active > 0 else None
+        }
+
+
+class BatchCheckpoint:
+    """Append-only JSON lines record of finished loans, used to resume a batch"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+
+    def completed(self) -> Set[str]:
+        """Loan ids that already went through every stage"""
+        if not self.path.exists():
+            return set()
+        done = set()
+        with open(self.path, 'r') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # a line cut short by an interrupted run
+                if entry.get('status') == 'done':
+                    done.add(str(entry['loan_id']))
+        return done
+
+    def record(self, entry: Dict[str, Any]):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, 'a') as f:
+            f.write(json.dumps({**entry, 'timestamp': datetime.now().isoformat()}, default=str) + "\n")
+
+
+class BatchPipeline:
+    """Runs loans through a chain of stages connected by bounded queues.
+
+    Every stage has its own worker count, so slow stages (the LLM) can be
+    widened without starving or flooding the others, and the bounded queues
+    keep at most ``queue_size`` loans waiting between two stages. Finished
+    and failed loans are appended to the checkpoint as they complete; loans
+    recorded as done there are skipped when the batch is run again.
+    """
+
+    def __init__(self, stages: List[Stage], checkpoint: BatchCheckpoint, queue_size: int = 8,
+                 on_done: Optional[Callable[[BatchItem], Dict[str, Any]]] = None):
+        self.stages = stages
+        self.checkpoint = checkpoint
+        self.queue_size = queue_size
+        self.on_done = on_done
+        self.failures: List[Dict[str, Any]] = []
+        self.done = 0
+        self.skipped = 0
+
+    async def run(self, loan_ids: Iterable[str]) -> Dict[str, Any]:
+        started_at = datetime.now()
+        started = time.monotonic()
+        completed = self.checkpoint.completed()
+        pending = []
+        for loan_id in dict.fromkeys(str(loan_id) for loan_id in loan_ids):
+            if loan_id in completed:
+                self.skipped += 1
+            else:
+                pending.append(loan_id)
+        logger.info(f"Batch of {len(pending)} loans ({self.skipped} already done)")
+
+        queues = [asyncio.Queue(maxsize=self.queue_size) for _ in self.stages]
+        runners = [
+            asyncio.create_task(self._run_stage(index, stage, queues))
+            for index, stage in enumerate(self.stages)
+        ]
+
+        for loan_id in pending:
+            await queues[0].put(BatchItem(loan_id))
+        for _ in range(self.stages[0].concurrency):
+            await queues[0].put(None)
+        await asyncio.gather(*runners)
+
+        return self.summary(started_at, time.monotonic() - started, len(pending))
+
+    async def _run_stage(self, index: int, stage: Stage, queues: List[asyncio.Queue]):
+        last = index == len(self.stages) - 1
+        await asyncio.gather(*(self._worker(stage, queues[index], None if last else queues[index + 1])
+                               for _ in range(stage.concurrency)))
+        if not last:
+            # Upstream is drained: release every worker of the next stage
+            for _ in range(self.stages[index + 1].concurrency):
+                await queues[index + 1].put(None)
+
+    async def _worker(self, stage: Stage, inbox: asyncio.Queue, outbox: Optional[asyncio.Queue]):
+        while True:
+            item = await inbox.get()
+            if item is None:
+                return
+
+            began = time.monotonic()
+            if stage.first_started is None:
+                stage.first_started = began
+            try:
+                await stage.func(item)
+            except Exception as e:
+                stage.failed += 1
+                self._fail(item, stage, e)
+                continue
+            finally:
+                stage.busy_seconds += time.monotonic() - began
+                stage.last_finished = time.monotonic()
+
+            stage.processed += 1
+            if outbox is not None:
+                await outbox.put(item)
+            else:
+                self._finish(item, stage)
+
+    def _finish(self, item: BatchItem, stage: Stage):
+        try:
+            details = self.on_done(item) if self.on_done else {}
+        except Exception as e:
+            # A failing callback fails this loan only, never the worker running the last stage
+            self._fail(item, stage, e)
+            return
+        self.done += 1
+        self.checkpoint.record({
+            'loan_id': item.loan_id, 'status': 'done',
+            'seconds': round(time.monotonic() - item.started_at, 2), **details
+        })
+
+    def _fail(self, item: BatchItem, stage: Stage, error: Exception):
+        logger.error(f"Loan {item.loan_id} failed in stage {stage.name}: {str(error)}")
+        failure = {'loan_id': item.loan_id, 'status': 'failed', 'stage': stage.name, 'error': str(error)}
+        self.failures.append(failure)
+        self.checkpoint.record(failure)
+
+    def summary(self, started_at: datetime, elapsed: float, submitted: int) -> Dict[str, Any]:
+        return {
+            'started_at': started_at.isoformat(),
+            'elapsed_seconds': round(elapsed, 2),
+            'loans': {
+                'submitted': submitted,
+                'done': self.done,
+                'failed': len(self.failures),
+                'skipped': self.skipped,
+                'loans_per_minute': round(60 * self.done / elapsed, 2) if elapsed > 0 else None
+            },
+            'stages': {stage.name: stage.stats() for stage in self.stages},
+            'failures': self.failures
+        }
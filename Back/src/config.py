@@ -7,6 +7,8 @@ from typing import Dict, Any
 DATA_DIR = Path('./Data')
 LOGS_DIR = DATA_DIR / 'logs'
 RULES_FILE = DATA_DIR / 'KYC.LOV.csv'
+BUSINESS_RULES_FILE = DATA_DIR / 'business_rules.json'
+PROMPT_TEMPLATE_DIR = DATA_DIR / 'prompts'
 PDF_DIR = Path('./PDF Loans')
 VECTOR_DB_PATH = DATA_DIR / 'loans_vector.db'
 
@@ -19,12 +21,68 @@ API_CONFIG = {
 
 # LLM Configuration
 OLLAMA_HOST = os.getenv('OLLAMA_HOST', 'http://localhost:11434')
+# Comma-separated Ollama endpoints; calls are spread over all of them
+OLLAMA_HOSTS = [host.strip() for host in os.getenv('OLLAMA_HOSTS', OLLAMA_HOST).split(',') if host.strip()]
 LLM_CONFIG = {
     'model_name': "deepseek-r1:1.5b",
     'temperature': 0.3,
     'num_ctx': 4096,
     'embedding_model': "nomic-embed-text",
-    'base_url': OLLAMA_HOST
+    'base_url': OLLAMA_HOST,
+    # In-flight requests the async analyzer sends to the Ollama server
+    'max_concurrent_generations': int(os.getenv('OLLAMA_MAX_CONCURRENT_GENERATIONS', 2)),
+    'max_concurrent_embeddings': int(os.getenv('OLLAMA_MAX_CONCURRENT_EMBEDDINGS', 4)),
+    # Start the basic prompt while context is retrieved; use it if retrieval misses the deadline
+    'speculative_basic': os.getenv('LLM_SPECULATIVE_BASIC', 'false').lower() == 'true',
+    'speculative_deadline_seconds': float(os.getenv('LLM_SPECULATIVE_DEADLINE_SECONDS', 20)),
+    # Upper bound on a whole speculative analysis; past it the fallback analysis is returned
+    'speculative_budget_seconds': float(os.getenv('LLM_SPECULATIVE_BUDGET_SECONDS', 120)),
+    # Request format="json" from Ollama for analysis generations
+    'json_format': os.getenv('LLM_JSON_FORMAT', 'true').lower() == 'true',
+    # How long Ollama keeps the model (and the cached prompt prefix) loaded after a request
+    'keep_alive': os.getenv('LLM_KEEP_ALIVE', '30m')
+}
+
+# Ollama host routing and circuit breaking
+BACKEND_CONFIG = {
+    # Consecutive failed or slow requests before a host is taken out of rotation
+    'failure_threshold': int(os.getenv('OLLAMA_FAILURE_THRESHOLD', 3)),
+    'cooldown_seconds': float(os.getenv('OLLAMA_COOLDOWN_SECONDS', 30)),
+    'slow_request_seconds': float(os.getenv('OLLAMA_SLOW_REQUEST_SECONDS', 180)),
+    'health_interval_seconds': float(os.getenv('OLLAMA_HEALTH_INTERVAL_SECONDS', 15))
+}
+
+# Prompt budgeting: allowed num_ctx values, tokens kept free for the answer
+PROMPT_BUDGET_CONFIG = {
+    'context_sizes': [int(size) for size in os.getenv('LLM_CONTEXT_SIZES', '2048,4096,8192').split(',')],
+    # Opt-in deviation from the smallest adequate num_ctx: never step a model's num_ctx back down,
+    # since a different num_ctx makes Ollama reload the model and drop its cached prefix
+    'sticky_context': os.getenv('LLM_STICKY_CONTEXT', 'false').lower() == 'true',
+    'response_tokens': int(os.getenv('LLM_RESPONSE_TOKENS', 1024)),
+    'chars_per_token': 3.0
+}
+
+# Analysis job scheduler (admission control in front of the LLM)
+SCHEDULER_CONFIG = {
+    'max_workers': int(os.getenv('ANALYSIS_MAX_WORKERS', 2)),
+    'max_queue': int(os.getenv('ANALYSIS_MAX_QUEUE', 50)),
+    # Duration assumed for Retry-After hints until real jobs have been timed
+    'initial_job_seconds': 60.0
+}
+
+# Offline batch analysis (analyse.py --batch): workers per stage and queue bound between stages
+BATCH_CONFIG = {
+    'workers': {'fetch': 4, 'risk': 2, 'llm': LLM_CONFIG['max_concurrent_generations'], 'pdf': 2, 'store': 2},
+    'queue_size': 8,
+    'checkpoint_file': DATA_DIR / 'batch_checkpoint.jsonl'
+}
+
+# On-disk cache of LLM responses keyed by hash(model, options, prompt)
+LLM_CACHE_FILE = DATA_DIR / 'llm_cache.db'
+LLM_CACHE_CONFIG = {
+    'enabled': os.getenv('LLM_CACHE_ENABLED', 'true').lower() == 'true',
+    'ttl_seconds': int(os.getenv('LLM_CACHE_TTL_SECONDS', 7 * 24 * 3600)),
+    'max_bytes': int(os.getenv('LLM_CACHE_MAX_BYTES', 64 * 1024 * 1024))
 }
 
 # Risk scoring thresholds
@@ -34,6 +92,23 @@ RISK_THRESHOLDS = {
     'high': 50
 }
 
+# Per-engine memo of raw value -> normalized value
+NORMALIZATION_CACHE_SIZE = 4096
+
+# Loans whose per-group indicator results are kept for incremental re-evaluation
+INCREMENTAL_CACHE_SIZE = 10000
+
+# Loan embeddings kept in memory, keyed by content hash
+EMBEDDING_CACHE_SIZE = 2048
+
+# Canonical embedding view: indicators kept (highest score first) and total length cap
+EMBEDDING_VIEW_MAX_INDICATORS = 25
+EMBEDDING_VIEW_MAX_CHARS = 2000
+
+# Feedback summaries kept in memory, keyed by the neighbor loans and their feedback timestamps
+FEEDBACK_SUMMARY_CACHE_SIZE = 512
+FEEDBACK_SUMMARY_PRECOMPUTE = os.getenv('FEEDBACK_SUMMARY_PRECOMPUTE', 'true').lower() == 'true'
+
 # Business rule priorities
 RULE_PRIORITIES = {
     'region_risk': 1,
@@ -1,6 +1,6 @@
 import csv
 from pathlib import Path
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Iterable
 from datetime import datetime
 from .api_client import APIClient
 from .config import RULES_FILE
@@ -43,20 +43,29 @@ class DataLoader:
 
     def load_rules(self) -> Dict[str, Dict[str, float]]:
         """Load rules (identical to your working version)"""
-        rules = {}
+        return self.read_rules()
+
+    @staticmethod
+    def read_rules(rules_file: Path = RULES_FILE) -> Dict[str, Dict[str, float]]:
+        """Parse the KYC rules CSV into {category: {item: weight}}"""
         try:
-            with open(RULES_FILE, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    category = row['Category']
-                    if category not in rules:
-                        rules[category] = {}
-                    rules[category][row['Item']] = float(row['Weight'])
-            return rules
+            with open(rules_file, 'r', encoding='utf-8') as f:
+                return DataLoader.parse_rules(f)
         except Exception as e:
             logger.error(f"Error loading rules: {str(e)}")
             raise
 
+    @staticmethod
+    def parse_rules(lines: Iterable[str]) -> Dict[str, Dict[str, float]]:
+        """Parse KYC rules CSV lines into {category: {item: weight}}"""
+        rules = {}
+        for row in csv.DictReader(lines):
+            category = row['Category']
+            if category not in rules:
+                rules[category] = {}
+            rules[category][row['Item']] = float(row['Weight'])
+        return rules
+
     @staticmethod
     def format_date(date_str: str) -> str:
         """Format date (identical to your working version)"""
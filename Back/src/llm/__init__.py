@@ -1,5 +1,6 @@
 from .analyzer import LLMAnalyzer
+from .async_analyzer import AsyncLLMAnalyzer
 from .vector_db import LoanVectorDB
 from .prompts import LLMPromptBuilder
 
-__all__ = ['LLMAnalyzer', 'LoanVectorDB', 'LLMPromptBuilder']
\ No newline at end of file
+__all__ = ['LLMAnalyzer', 'AsyncLLMAnalyzer', 'LoanVectorDB', 'LLMPromptBuilder']
\ No newline at end of file
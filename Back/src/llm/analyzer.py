@@ -1,62 +1,62 @@
 import logging
 import ollama
 import json
+import threading
+from functools import partial
 from time import time
-from typing import Dict, Optional, List, Union
+from typing import Callable, Dict, Optional, List, Tuple
 from pathlib import Path
+from ..config import LLM_CONFIG
 from ..data_models import LLMAnalysis
+from ..risk_engine.results import json_default
 from .prompts import LLMPromptBuilder
-from .vector_db import LoanVectorDB
+from .vector_db import LoanVectorDB, shared_vector_db
 from .feedback import FeedbackSystem
+from .embeddings import EMBEDDING_VIEW_VERSION, embedding_cache, embedding_text
+from .feedback_cache import feedback_summary_cache
+from .response_cache import LLMResponseCache, llm_response_cache
+from .parsing import parse_analysis, strip_reasoning
+from .backends import ollama_backends
+from .budget import PromptSection, prompt_budget
 
 logger = logging.getLogger(__name__)
 
 class LLMAnalyzer:
-    def __init__(self, vector_db: Optional[LoanVectorDB] = None):
+    GENERATION_OPTIONS = {
+        'temperature': 0.3,
+        'num_ctx': 4096,
+        'timeout': 120
+    }
+    FEEDBACK_SUMMARY_OPTIONS = {'temperature': 0.1}  # Lower temperature for consistency; num_ctx is sized per prompt
+
+    def __init__(self, vector_db: Optional[LoanVectorDB] = None,
+                 response_cache: Optional[LLMResponseCache] = None,
+                 use_response_cache: bool = True):
         self.vector_db = vector_db
+        self.response_cache = response_cache or llm_response_cache
+        self.use_response_cache = use_response_cache
         self.embedding_model = "nomic-embed-text"
         self.generation_model = "deepseek-r1:1.5b"
+        # Ask Ollama for JSON-constrained output; parsing still tolerates free text
+        self.response_format = 'json' if LLM_CONFIG['json_format'] else ''
+        self.keep_alive = LLM_CONFIG['keep_alive']
         self.last_analysis_time = 0
         self.last_analysis_type = "basic"
         self.feedback_system = FeedbackSystem(vector_db)
-        
-        try:
-            self._verify_models()
-        except Exception as e:
-            logger.warning(f"Model verification warning: {str(e)}")
-
-    def _verify_models(self):
-        try:
-            models_response = ollama.list()
-            available_models = set()
-
-            if isinstance(models_response, dict) and 'models' in models_response:
-                for model in models_response['models']:
-                    if 'model' in model:
-                        available_models.add(model['model'])
-                    elif 'name' in model:
-                        available_models.add(model['name'])
-
-            if self.embedding_model not in available_models:
-                logger.info(f"Downloading embedding model: {self.embedding_model}")
-                ollama.pull(self.embedding_model)
-
-            if self.generation_model not in available_models:
-                logger.info(f"Downloading generation model: {self.generation_model}")
-                ollama.pull(self.generation_model)
-
-        except Exception as e:
-            logger.error(f"Model verification error: {str(e)}")
-            raise
+        self.prompt_budget = prompt_budget
+        # Spread calls over OLLAMA_HOSTS when several are configured, else use the default client
+        self.llm_client = ollama_backends if ollama_backends.is_pooled else ollama
 
     def analyze_loan(self, loan_data: Dict) -> LLMAnalysis:
         start_time = time()
         try:
-            if self.vector_db and self._has_similar_loans():
-                analysis = self._analyze_with_context(loan_data)
+            # One embedding serves retrieval, feedback lookup and the later upsert
+            embedding = self._safe_embed_loan(loan_data) if self.vector_db else None
+            if embedding is not None and self._has_similar_loans():
+                analysis = self._analyze_with_context(loan_data, embedding)
                 self.last_analysis_type = "contextual"
             else:
-                analysis = self._basic_analysis(loan_data)
+                analysis = self._basic_analysis(loan_data, embedding)
                 self.last_analysis_type = "basic"
                 
             if 'llm_analysis' not in loan_data:
@@ -78,79 +78,167 @@ class LLMAnalyzer:
             logger.warning(f"Vector DB check failed: {str(e)}")
             return False
 
-    def _basic_analysis(self, loan_data: Dict) -> LLMAnalysis:
-        prompt = LLMPromptBuilder.build_basic_prompt(loan_data)
-        prompt = self._apply_feedback_to_prompt(prompt, loan_data)
-        response = self._call_llm(prompt)
-        return self._parse_response(response)
+    def embed_loan(self, loan_data: Dict) -> List[float]:
+        """Embedding of a loan assessment, served from the content-hash cache when unchanged"""
+        return embedding_cache.get_or_compute(
+            self.embedding_model,
+            embedding_text(loan_data),
+            lambda text: self.llm_client.embeddings(model=self.embedding_model, prompt=text)['embedding']
+        )
 
-    def _analyze_with_context(self, loan_data: Dict) -> LLMAnalysis:
+    def _safe_embed_loan(self, loan_data: Dict) -> Optional[List[float]]:
         try:
-            embedding_response = ollama.embeddings(
-                model=self.embedding_model,
-                prompt=json.dumps(loan_data)
-            )
-            embedding = embedding_response['embedding']
+            return self.embed_loan(loan_data)
+        except Exception as e:
+            logger.warning(f"Loan embedding failed: {str(e)}")
+            return None
+
+    def _basic_analysis(self, loan_data: Dict, embedding: Optional[List[float]] = None) -> LLMAnalysis:
+        feedback = self._feedback_parts(loan_data, embedding)
+        prompt, num_ctx = self._fit_prompt(
+            lambda udf_data, loan_type: LLMPromptBuilder.build_basic_prompt(loan_data, udf_data, loan_type),
+            loan_data, feedback
+        )
+        response = self._call_llm(prompt, num_ctx)
+        return self._parse_response(response)
 
+    def _analyze_with_context(self, loan_data: Dict, embedding: List[float]) -> LLMAnalysis:
+        try:
             similar_loans = self.vector_db.find_similar_loans(embedding)
 
             if not similar_loans['documents']:
                 logger.info("No similar loans found - falling back to basic analysis")
-                return self._basic_analysis(loan_data)
+                return self._basic_analysis(loan_data, embedding)
 
-            prompt = LLMPromptBuilder.build_contextual_prompt(loan_data, similar_loans)
-            prompt = self._apply_feedback_to_prompt(prompt, loan_data)
-            response = self._call_llm(prompt)
+            feedback = self._feedback_parts(loan_data, embedding)
+            prompt, num_ctx = self._fit_prompt(
+                lambda udf_data, loan_type: LLMPromptBuilder.build_contextual_prompt(
+                    loan_data, similar_loans, udf_data, loan_type),
+                loan_data, feedback
+            )
+            response = self._call_llm(prompt, num_ctx)
 
             return self._parse_response(response, context=similar_loans)
 
         except Exception as e:
             logger.warning(f"Contextual analysis failed: {str(e)}")
-            return self._basic_analysis(loan_data)
+            return self._basic_analysis(loan_data, embedding)
 
-    def _apply_feedback_to_prompt(self, prompt: str, loan_data: Dict) -> str:
+    def _feedback_parts(self, loan_data: Dict, embedding: Optional[List[float]] = None) -> Tuple[str, List[str]]:
+        """Feedback summary and detailed cases from similar reviewed loans, empty without any"""
         if not self.vector_db:
-            return prompt
+            return "", []
         
         try:
-            embedding_response = ollama.embeddings(
-                model=self.embedding_model,
-                prompt=json.dumps(loan_data))
-            embedding = embedding_response['embedding']
-        
-        # Query for similar loans WITH feedback
-            similar_with_feedback = self.vector_db.collection.query(
-                query_embeddings=[embedding],
-                n_results=5,  # Increased to get more context
-                where={"has_feedback": True},
-                include=['documents', 'metadatas', 'distances']
-            )
+            if embedding is None:
+                embedding = self.embed_loan(loan_data)
         
+            similar_with_feedback = self._query_feedback_cases(embedding)
             if not similar_with_feedback['documents']:
-                return prompt
+                return "", []
             
-        # Build comprehensive feedback context
-            feedback_context = self._build_feedback_context(
+            return self._build_feedback_parts(
                 similar_with_feedback['documents'][0],
                 similar_with_feedback['metadatas'][0],
                 similar_with_feedback.get('distances', [[]])[0]
             )
         
-            if feedback_context:
-                return (
-                    prompt + "\n\n=== RELEVANT FEEDBACK FROM SIMILAR CASES ===\n" +
-                    feedback_context + 
-                    "\n\nPlease carefully apply these lessons to your current analysis. " +
-                    "Pay special attention to any inconsistencies or patterns mentioned in the feedback."
-                )
-            return prompt
-        
         except Exception as e:
             logger.warning(f"Feedback application failed: {str(e)}")
+            return "", []
+
+    def _fit_prompt(self, build: Callable[[Optional[str], str], str], loan_data: Dict,
+                    feedback: Tuple[str, List[str]], loan_type: Optional[str] = None) -> Tuple[str, int]:
+        """Assemble prompt and feedback within the context budget, returning the prompt and its num_ctx.
+
+        ``build(udf_data, loan_type)`` renders the base prompt; the loan type is
+        detected once here (unless given) and reused by every trimming pass.
+        """
+        if loan_type is None:
+            loan_type = LLMPromptBuilder.determine_loan_type(loan_data)
+        summary, entries = feedback
+        sections = [
+            # Trimmed in this order when the prompt would overflow the largest context
+            PromptSection('feedback_details', ["\n".join(entries), ""], value=1),
+            PromptSection('udf_data', [
+                LLMPromptBuilder.format_udf_data(loan_data.get('customer_info', {})),
+                "Omitted to fit the context window"
+            ], value=2),
+            PromptSection('feedback_summary', [summary, ""], value=3),
+        ]
+
+        def render(parts: Dict[str, str]) -> str:
+            details = parts['feedback_details']
+            feedback_context = self._format_feedback_context([details] if details else [], parts['feedback_summary'])
+            return self._append_feedback(build(parts['udf_data'], loan_type), feedback_context)
+
+        return self.prompt_budget.fit(sections, render, self.generation_model)
+
+    def _query_feedback_cases(self, embedding: List[float]) -> Dict:
+        """Query for similar loans WITH feedback"""
+        return self.vector_db.collection.query(
+            query_embeddings=[embedding],
+            n_results=5,  # Increased to get more context
+            where={"has_feedback": True},
+            include=['documents', 'metadatas', 'distances']
+        )
+
+    @staticmethod
+    def _append_feedback(prompt: str, feedback_context: str) -> str:
+        if not feedback_context:
             return prompt
+        return (
+            prompt + "\n\n=== RELEVANT FEEDBACK FROM SIMILAR CASES ===\n" +
+            feedback_context + 
+            "\n\nPlease carefully apply these lessons to your current analysis. " +
+            "Pay special attention to any inconsistencies or patterns mentioned in the feedback."
+        )
 
     def _build_feedback_context(self, documents: List[str], metadatas: List[Dict], distances: List[float]) -> str:
         """Build comprehensive feedback context from similar cases"""
+        summary, feedback_entries = self._build_feedback_parts(documents, metadatas, distances)
+        return self._format_feedback_context(feedback_entries, summary)
+
+    def _build_feedback_parts(self, documents: List[str], metadatas: List[Dict],
+                              distances: List[float]) -> Tuple[str, List[str]]:
+        """Generated summary (cached per neighbor set) and the detailed feedback entries"""
+        feedback_entries = self._feedback_entries(documents, metadatas, distances)
+        if not feedback_entries:
+            return "", []
+
+        neighbors = feedback_summary_cache.neighbors(metadatas)
+        cache_key = feedback_summary_cache.key(self.generation_model, neighbors)
+        summary = feedback_summary_cache.get(cache_key)
+        if summary is not None:
+            return summary, feedback_entries
+    
+        try:
+            prompt = self._feedback_summary_prompt(feedback_entries)
+            response = self.llm_client.generate(
+                model=self.generation_model,
+                prompt=prompt,
+                options=self._feedback_summary_options(prompt),
+                keep_alive=self.keep_alive
+            )
+            feedback_summary_cache.put(cache_key, neighbors, response['response'],
+                                       self._summary_refresher(metadatas, distances))
+            return response['response'], feedback_entries
+        except Exception as e:
+            logger.warning(f"Feedback summarization failed: {str(e)}")
+            return "", feedback_entries  # Fallback to raw feedback
+
+    def _feedback_summary_options(self, prompt: str) -> Dict:
+        return {**self.FEEDBACK_SUMMARY_OPTIONS, 'num_ctx': self.prompt_budget.context_size(prompt, self.generation_model)}
+
+    def _summary_refresher(self, metadatas: List[Dict], distances: List[float]) -> Optional[Callable[[], None]]:
+        """Callback rebuilding a neighbor set's summary; it holds ids and distances, not this analyzer"""
+        if not self.vector_db:
+            return None
+        distance_by_id = {str(meta.get('loan_id')): distance for meta, distance in zip(metadatas, distances)}
+        return partial(refresh_feedback_summary, distance_by_id)
+
+    def _feedback_entries(self, documents: List[str], metadatas: List[Dict], distances: List[float]) -> List[str]:
+        """One text entry per similar case that carries feedback comments"""
         feedback_entries = []
     
         for i, (doc, meta, distance) in enumerate(zip(documents, metadatas, distances)):
@@ -183,88 +271,74 @@ class LLMAnalyzer:
                 except Exception as e:
                     logger.warning(f"Couldn't process feedback entry {i}: {str(e)}")
                     continue
-    
-        if not feedback_entries:
-            return ""
-    
+        return feedback_entries
+
+    @staticmethod
+    def _feedback_summary_prompt(feedback_entries: List[str]) -> str:
         # Add summary of key patterns
-        summary_prompt = (
+        return (
             "Based on the following feedback from similar loan cases, extract the most important "
             "actionable insights and patterns that should be applied to future analyses:\n\n" +
             "\n".join(feedback_entries) +
             "\n\nProvide 3-5 specific, actionable insights in bullet points:"
         )
-    
-        try:
-            response = ollama.generate(
-                model=self.generation_model,
-                prompt=summary_prompt,
-                options={'temperature': 0.1, 'num_ctx': 2048}  # Lower temperature for consistency
-            )
-            return f"FEEDBACK SUMMARY:\n{response['response']}\n\nDETAILED FEEDBACK CASES:\n" + "\n".join(feedback_entries)
-        except Exception as e:
-            logger.warning(f"Feedback summarization failed: {str(e)}")
-            return "\n".join(feedback_entries)  # Fallback to raw feedback
 
-    def _summarize_feedback(self, documents: List[str], metadatas: List[Dict]) -> str:
-        feedback_entries = []
-        for doc, meta in zip(documents, metadatas):
-            if meta.get('feedback', {}).get('comments'):
-                loan_data = json.loads(doc)
-                feedback_entries.append(
-                    f"Case: {loan_data.get('customer_info', {}).get('name', 'Unknown')}\n"
-                    f"Feedback Rating: {meta['feedback']['rating']}/5\n"
-                    f"Feedback: {meta['feedback']['comments']}\n"
-                )
-        
-        if not feedback_entries:
-            return ""
-        
-        prompt = (
-            "Extract actionable insights from these loan assessment feedback entries:\n\n" +
-            "\n---\n".join(feedback_entries) +
-            "\n\nProvide 3-5 concise bullet points of improvements to apply to future analyses:"
-        )
-        
-        try:
-            response = ollama.generate(
-                model=self.generation_model,
-                prompt=prompt,
-                options={'temperature': 0.2, 'num_ctx': 2048}
-            )
-            return response['response']
-        except Exception as e:
-            logger.warning(f"Feedback summarization failed: {str(e)}")
-            return ""
+    @staticmethod
+    def _format_feedback_context(feedback_entries: List[str], summary: str) -> str:
+        parts = []
+        if summary:
+            parts.append(f"FEEDBACK SUMMARY:\n{summary}")
+        if feedback_entries:
+            parts.append("DETAILED FEEDBACK CASES:\n" + "\n".join(feedback_entries))
+        return "\n\n".join(parts)
+
+    def _call_llm(self, prompt: str, num_ctx: Optional[int] = None) -> str:
+        options = self._generation_options(num_ctx)
+        cache_key = self.response_cache.key(self.generation_model, {**options, 'format': self.response_format}, prompt)
+        if self.use_response_cache:
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                logger.info("LLM response served from cache")
+                return cached
 
-    def _call_llm(self, prompt: str) -> str:
         try:
-            response = ollama.generate(
+            response = self.llm_client.generate(
                 model=self.generation_model,
                 prompt=prompt,
-                options={
-                    'temperature': 0.3,
-                    'num_ctx': 4096,
-                    'timeout': 120
-                }
+                options=options,
+                format=self.response_format,
+                keep_alive=self.keep_alive
             )
+            self._cache_response(cache_key, response['response'])
             return response['response']
         except Exception as e:
             logger.error(f"LLM call failed: {str(e)}")
             raise
 
+    def _cache_response(self, cache_key: str, response: str):
+        """Cache a generation only if it parses, so a truncated or reasoning-only answer is retried"""
+        if parse_analysis(response) is None:
+            logger.info("LLM response not cached - it could not be parsed")
+            return
+        self.response_cache.put(cache_key, self.generation_model, response)
+
+    def _generation_options(self, num_ctx: Optional[int] = None) -> Dict:
+        options = dict(self.GENERATION_OPTIONS)
+        if num_ctx:
+            options['num_ctx'] = num_ctx
+        return options
+
     def _parse_response(self, response: str, context: Optional[Dict] = None) -> LLMAnalysis:
         try:
-            json_str = response[response.find('{'):response.rfind('}') + 1]
-            data = json.loads(json_str)
-
-            analysis_data = {
-                'summary': data.get('summary', 'No summary provided'),
-                'recommendation': data.get('recommendation', 'review').lower(),
-                'rationale': self._ensure_list(data.get('rationale', [])),
-                'key_findings': self._ensure_list(data.get('key_findings', [])),
-                'conditions': self._ensure_list(data.get('conditions', []))
-            }
+            analysis_data = parse_analysis(response)
+            if analysis_data is None:
+                return LLMAnalysis(
+                    summary=strip_reasoning(response).strip()[:500],
+                    recommendation="review",
+                    rationale=["Could not parse LLM response"],
+                    key_findings=[],
+                    conditions=[]
+                )
 
             if context:
                 similar_cases = []
@@ -291,25 +365,12 @@ class LLMAnalyzer:
                     'similar_cases': similar_cases
                 }
 
-            return LLMAnalysis(**analysis_data)
+            return analysis_data
 
-        except json.JSONDecodeError:
-            return LLMAnalysis(
-                summary=response[:500],
-                recommendation="review",
-                rationale=["Could not parse LLM response"],
-                key_findings=[],
-                conditions=[]
-            )
         except Exception as e:
             logger.error(f"Response parsing error: {str(e)}")
             return self._create_fallback_analysis(str(e))
 
-    def _ensure_list(self, value: Union[str, List]) -> List[str]:
-        if isinstance(value, str):
-            return [value]
-        return [str(item) for item in value]
-
     def _create_fallback_analysis(self, error_msg: str) -> LLMAnalysis:
         return LLMAnalysis(
             summary="Analysis failed due to system error",
@@ -319,31 +380,67 @@ class LLMAnalyzer:
             conditions=[]
         )
 
-    def store_current_loan(self, loan_data: Dict):
+    def store_current_loan(self, loan_data: Dict, embedding: Optional[List[float]] = None):
         if not self.vector_db:
             return
 
         try:
-            embedding_response = ollama.embeddings(
-                model=self.embedding_model,
-                prompt=json.dumps(loan_data))
-            embedding = embedding_response['embedding']
+            if embedding is None:
+                embedding = self.embed_loan(loan_data)
 
-            loan_id = str(loan_data.get('loan_info', {}).get('basic_info', {}).get('loan_id', 'unknown'))
-            
-            self.vector_db.collection.upsert(
-                ids=[f"loan_{loan_id}"],
-                embeddings=[embedding],
-                documents=[json.dumps(loan_data)],
-                metadatas=[{
-                    'loan_id': loan_id,
-                    'has_feedback': False,
-                    'analysis_type': self.last_analysis_type,
-                    'processing_time': self.last_analysis_time,
-                    'timestamp': time()
-                }]
-            )
-            logger.info(f"Successfully stored loan {loan_id} in vector DB")
+            record = self._loan_record(loan_data, embedding)
+            self.vector_db.collection.upsert(**record)
+            logger.info(f"Successfully stored loan {record['metadatas'][0]['loan_id']} in vector DB")
 
         except Exception as e:
-            logger.error(f"Failed to store loan in vector DB: {str(e)}")
\ No newline at end of file
+            logger.error(f"Failed to store loan in vector DB: {str(e)}")
+
+    def _loan_record(self, loan_data: Dict, embedding: List[float]) -> Dict:
+        """Vector DB upsert arguments for an analyzed loan"""
+        loan_id = str(loan_data.get('loan_info', {}).get('basic_info', {}).get('loan_id', 'unknown'))
+        return {
+            'ids': [f"loan_{loan_id}"],
+            'embeddings': [embedding],
+            'documents': [json.dumps(loan_data, default=json_default)],
+            'metadatas': [{
+                'loan_id': loan_id,
+                'has_feedback': False,
+                'analysis_type': self.last_analysis_type,
+                'processing_time': self.last_analysis_time,
+                'embedding_view_version': EMBEDDING_VIEW_VERSION,
+                'timestamp': time()
+            }]
+        }
+
+
+_summary_analyzer: Optional[LLMAnalyzer] = None
+_summary_analyzer_lock = threading.Lock()
+
+
+def summary_analyzer() -> LLMAnalyzer:
+    """Process-wide analyzer that rebuilds feedback summaries in the background"""
+    global _summary_analyzer
+    with _summary_analyzer_lock:
+        if _summary_analyzer is None:
+            _summary_analyzer = LLMAnalyzer(shared_vector_db())
+        return _summary_analyzer
+
+
+def reembed_stale_loans() -> int:
+    """Re-embed stored loans whose vectors were built from an older embedding view"""
+    analyzer = summary_analyzer()
+    return analyzer.vector_db.reembed_stale(analyzer.embed_loan, EMBEDDING_VIEW_VERSION)
+
+
+def refresh_feedback_summary(distance_by_id: Dict[str, float]):
+    """Rebuild the summary of a neighbor set from the current vector DB metadata"""
+    analyzer = summary_analyzer()
+    current = analyzer.vector_db.collection.get(
+        ids=[f"loan_{loan_id}" for loan_id in distance_by_id],
+        include=['documents', 'metadatas']
+    )
+    analyzer._build_feedback_context(
+        current['documents'],
+        current['metadatas'],
+        [distance_by_id.get(str(meta.get('loan_id')), 1.0) for meta in current['metadatas']]
+    )
@@ -0,0 +1,330 @@
+import asyncio
+import logging
+from time import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from ..config import LLM_CONFIG
+from ..data_models import LLMAnalysis
+from .analyzer import LLMAnalyzer
+from .async_client import AsyncOllamaPool, ollama_pool
+from .embeddings import embedding_cache, embedding_text
+from .feedback_cache import feedback_summary_cache
+from .prompts import LLMPromptBuilder
+from .response_cache import LLMResponseCache
+from .vector_db import LoanVectorDB
+
+logger = logging.getLogger(__name__)
+
+# Called with each generated token; ``replace=True`` means the text replaces everything sent so far
+TokenCallback = Callable[..., Awaitable[None]]
+
+
+class AsyncLLMAnalyzer(LLMAnalyzer):
+    """LLMAnalyzer whose Ollama calls are awaited on the event loop.
+
+    Generation and embedding requests go through a shared pooled async
+    client with bounded concurrency, so analyses no longer occupy the API's
+    worker threads while the model is generating. Vector DB and response
+    cache calls are short and run in the default executor.
+    """
+
+    def __init__(self, vector_db: Optional[LoanVectorDB] = None,
+                 response_cache: Optional[LLMResponseCache] = None,
+                 use_response_cache: bool = True,
+                 pool: AsyncOllamaPool = ollama_pool,
+                 speculative: bool = LLM_CONFIG['speculative_basic'],
+                 speculative_deadline: float = LLM_CONFIG['speculative_deadline_seconds'],
+                 speculative_budget: float = LLM_CONFIG['speculative_budget_seconds']):
+        super().__init__(vector_db, response_cache, use_response_cache)
+        self.pool = pool
+        self.speculative = speculative
+        self.speculative_deadline = speculative_deadline
+        self.speculative_budget = speculative_budget
+
+    async def analyze_loan_async(self, loan_data: Dict, on_token: Optional[TokenCallback] = None) -> LLMAnalysis:
+        """Analyze a loan; ``on_token`` receives generated text as it streams in"""
+        start_time = time()
+        try:
+            if self.speculative and self.vector_db:
+                analysis, self.last_analysis_type = await self._speculative_analysis_async(loan_data, on_token)
+            else:
+                embedding = await self._safe_embed_loan_async(loan_data) if self.vector_db else None
+                if embedding is not None and await asyncio.to_thread(self._has_similar_loans):
+                    analysis = await self._analyze_with_context_async(loan_data, embedding, on_token)
+                    self.last_analysis_type = "contextual"
+                else:
+                    analysis = await self._basic_analysis_async(loan_data, embedding, on_token)
+                    self.last_analysis_type = "basic"
+
+            if 'llm_analysis' not in loan_data:
+                loan_data['llm_analysis'] = analysis
+
+        except Exception as e:
+            logger.error(f"Analysis failed: {str(e)}")
+            analysis = self._create_fallback_analysis(str(e))
+            self.last_analysis_type = "fallback"
+
+        self.last_analysis_time = time() - start_time
+        logger.info(f"Analysis completed ({self.last_analysis_type}) in {self.last_analysis_time:.2f}s")
+        return analysis
+
+    async def embed_loan_async(self, loan_data: Dict) -> List[float]:
+        """Async counterpart of embed_loan sharing the same embedding cache"""
+        text = embedding_text(loan_data)
+        embedding = embedding_cache.get(self.embedding_model, text)
+        if embedding is None:
+            embedding = await self.pool.embeddings(self.embedding_model, text)
+            embedding_cache.put(self.embedding_model, text, embedding)
+        return embedding
+
+    async def _safe_embed_loan_async(self, loan_data: Dict) -> Optional[List[float]]:
+        try:
+            return await self.embed_loan_async(loan_data)
+        except Exception as e:
+            logger.warning(f"Loan embedding failed: {str(e)}")
+            return None
+
+    async def _basic_analysis_async(self, loan_data: Dict, embedding: Optional[List[float]] = None,
+                                    on_token: Optional[TokenCallback] = None) -> LLMAnalysis:
+        feedback = await self._feedback_parts_async(loan_data, embedding)
+        prompt, num_ctx = self._fit_prompt(
+            lambda udf_data, loan_type: LLMPromptBuilder.build_basic_prompt(loan_data, udf_data, loan_type),
+            loan_data, feedback
+        )
+        response = await self._call_llm_async(prompt, on_token, num_ctx)
+        return self._parse_response(response)
+
+    async def _analyze_with_context_async(self, loan_data: Dict, embedding: List[float],
+                                          on_token: Optional[TokenCallback] = None) -> LLMAnalysis:
+        try:
+            contextual = await self._contextual_prompt_async(loan_data, embedding)
+            if contextual is None:
+                logger.info("No similar loans found - falling back to basic analysis")
+                return await self._basic_analysis_async(loan_data, embedding, on_token)
+
+            prompt, num_ctx, similar_loans = contextual
+            response = await self._call_llm_async(prompt, on_token, num_ctx)
+
+            return self._parse_response(response, context=similar_loans)
+
+        except Exception as e:
+            logger.warning(f"Contextual analysis failed: {str(e)}")
+            return await self._basic_analysis_async(loan_data, embedding, on_token)
+
+    async def _contextual_prompt_async(self, loan_data: Dict, embedding: List[float],
+                                       loan_type: Optional[str] = None) -> Optional[Tuple[str, int, Dict]]:
+        """Contextual prompt with feedback, its num_ctx and the similar loans it cites, or None without neighbors"""
+        similar_loans = await asyncio.to_thread(self.vector_db.find_similar_loans, embedding)
+        if not similar_loans['documents']:
+            return None
+
+        feedback = await self._feedback_parts_async(loan_data, embedding)
+        prompt, num_ctx = self._fit_prompt(
+            lambda udf_data, loan_type: LLMPromptBuilder.build_contextual_prompt(
+                loan_data, similar_loans, udf_data, loan_type),
+            loan_data, feedback, loan_type
+        )
+        return prompt, num_ctx, similar_loans
+
+    async def _retrieve_context_async(self, loan_data: Dict,
+                                      loan_type: Optional[str] = None) -> Optional[Tuple[str, int, Dict]]:
+        embedding = await self._safe_embed_loan_async(loan_data)
+        if embedding is None or not await asyncio.to_thread(self._has_similar_loans):
+            return None
+        return await self._contextual_prompt_async(loan_data, embedding, loan_type)
+
+    async def _speculative_analysis_async(self, loan_data: Dict,
+                                          on_token: Optional[TokenCallback] = None) -> Tuple[LLMAnalysis, str]:
+        """Race a plain basic generation against context retrieval.
+
+        The basic prompt (without feedback) starts generating right away. If
+        retrieval produces a contextual prompt within the deadline, the
+        contextual prompt is generated with streaming, and its first token
+        cancels the basic run so only one generation slot stays in use. A
+        contextual run that fails before producing anything falls back to the
+        still running basic one; after that the basic prompt is generated
+        again. Both generations share ``speculative_budget`` seconds from the
+        start; past it the fallback analysis is returned. The basic result is
+        forwarded whole, replacing any contextual text already sent.
+        """
+        started = time()
+
+        def remaining() -> float:
+            return max(0.0, self.speculative_budget - (time() - started))
+
+        # Both candidate prompts share one loan type detection
+        loan_type = LLMPromptBuilder.determine_loan_type(loan_data)
+        basic_prompt, basic_num_ctx = self._fit_prompt(
+            lambda udf_data, loan_type: LLMPromptBuilder.build_basic_prompt(loan_data, udf_data, loan_type),
+            loan_data, ("", []), loan_type
+        )
+
+        def start_basic() -> asyncio.Task:
+            task = asyncio.create_task(self._call_llm_async(basic_prompt, num_ctx=basic_num_ctx))
+            # Consume the outcome so a cancelled or failed speculative run is never reported as unretrieved
+            task.add_done_callback(lambda done: done.cancelled() or done.exception())
+            return task
+
+        async def stop(task: asyncio.Task):
+            task.cancel()
+            await asyncio.wait([task])  # let the request release its generation slot
+
+        basic = start_basic()
+        try:
+            contextual = await asyncio.wait_for(self._retrieve_context_async(loan_data, loan_type),
+                                              min(self.speculative_deadline, remaining()))
+        except asyncio.TimeoutError:
+            logger.info(f"Context retrieval missed the {self.speculative_deadline}s deadline - using the basic analysis")
+            contextual = None
+        except Exception as e:
+            logger.warning(f"Context retrieval failed: {str(e)}")
+            contextual = None
+
+        streamed = False
+        if contextual is not None:
+            prompt, num_ctx, similar_loans = contextual
+
+            async def forward(token: str):
+                nonlocal streamed
+                if not streamed:
+                    streamed = True
+                    await stop(basic)
+                if on_token:
+                    await on_token(token)
+
+            try:
+                response = await asyncio.wait_for(self._call_llm_async(prompt, forward, num_ctx), remaining())
+            except asyncio.TimeoutError:
+                logger.warning(f"Contextual analysis missed the {self.speculative_budget}s budget")
+            except Exception as e:
+                logger.warning(f"Contextual analysis failed - using the basic analysis: {str(e)}")
+            else:
+                await stop(basic)
+                return self._parse_response(response, context=similar_loans), "contextual"
+            if basic.cancelled():
+                basic = start_basic()
+
+        try:
+            response = await asyncio.wait_for(basic, remaining())
+        except asyncio.TimeoutError:
+            logger.warning(f"Speculative analysis exceeded the {self.speculative_budget}s budget")
+            if on_token and streamed:
+                await on_token("", replace=True)
+            return self._create_fallback_analysis(
+                f"LLM analysis exceeded the {self.speculative_budget}s time budget"), "fallback"
+        if on_token and streamed:
+            await on_token(response, replace=True)
+        elif on_token:
+            await on_token(response)
+        return self._parse_response(response), "basic"
+
+    async def _feedback_parts_async(self, loan_data: Dict,
+                                    embedding: Optional[List[float]] = None) -> Tuple[str, List[str]]:
+        if not self.vector_db:
+            return "", []
+
+        try:
+            if embedding is None:
+                embedding = await self.embed_loan_async(loan_data)
+
+            similar_with_feedback = await asyncio.to_thread(self._query_feedback_cases, embedding)
+            if not similar_with_feedback['documents']:
+                return "", []
+
+            return await self._build_feedback_parts_async(
+                similar_with_feedback['documents'][0],
+                similar_with_feedback['metadatas'][0],
+                similar_with_feedback.get('distances', [[]])[0]
+            )
+
+        except Exception as e:
+            logger.warning(f"Feedback application failed: {str(e)}")
+            return "", []
+
+    async def _build_feedback_parts_async(self, documents: List[str], metadatas: List[Dict],
+                                          distances: List[float]) -> Tuple[str, List[str]]:
+        feedback_entries = self._feedback_entries(documents, metadatas, distances)
+        if not feedback_entries:
+            return "", []
+
+        neighbors = feedback_summary_cache.neighbors(metadatas)
+        cache_key = feedback_summary_cache.key(self.generation_model, neighbors)
+        summary = feedback_summary_cache.get(cache_key)
+        if summary is not None:
+            return summary, feedback_entries
+
+        try:
+            prompt = self._feedback_summary_prompt(feedback_entries)
+            response = await self.pool.generate(
+                model=self.generation_model,
+                prompt=prompt,
+                options=self._feedback_summary_options(prompt),
+                keep_alive=self.keep_alive
+            )
+            feedback_summary_cache.put(cache_key, neighbors, response['response'],
+                                       self._summary_refresher(metadatas, distances))
+            return response['response'], feedback_entries
+        except Exception as e:
+            logger.warning(f"Feedback summarization failed: {str(e)}")
+            return "", feedback_entries
+
+    async def _call_llm_async(self, prompt: str, on_token: Optional[TokenCallback] = None,
+                              num_ctx: Optional[int] = None) -> str:
+        options = self._generation_options(num_ctx)
+        cache_key = self.response_cache.key(self.generation_model, {**options, 'format': self.response_format}, prompt)
+        if self.use_response_cache:
+            cached = await asyncio.to_thread(self.response_cache.get, cache_key)
+            if cached is not None:
+                logger.info("LLM response served from cache")
+                if on_token:
+                    await on_token(cached)
+                return cached
+
+        try:
+            if on_token:
+                response_text = await self._stream_llm(prompt, options, on_token)
+            else:
+                response = await self.pool.generate(
+                    model=self.generation_model,
+                    prompt=prompt,
+                    options=options,
+                    format=self.response_format,
+                    keep_alive=self.keep_alive
+                )
+                response_text = response['response']
+            await asyncio.to_thread(self._cache_response, cache_key, response_text)
+            return response_text
+        except Exception as e:
+            logger.error(f"LLM call failed: {str(e)}")
+            raise
+
+    async def _stream_llm(self, prompt: str, options: Dict, on_token: TokenCallback) -> str:
+        """Generate with streaming, forwarding each token and returning the full text"""
+        parts = []
+        async for chunk in self.pool.generate_stream(
+            model=self.generation_model,
+            prompt=prompt,
+            options=options,
+            format=self.response_format,
+            keep_alive=self.keep_alive
+        ):
+            token = chunk.get('response', '')
+            if token:
+                parts.append(token)
+                try:
+                    await on_token(token)
+                except Exception as e:
+                    logger.debug(f"Token callback failed: {str(e)}")
+        return ''.join(parts)
+
+    async def store_current_loan_async(self, loan_data: Dict, embedding: Optional[List[float]] = None):
+        """Upsert the analyzed loan into the vector DB; errors are raised to the caller"""
+        if not self.vector_db:
+            return
+
+        if embedding is None:
+            embedding = await self.embed_loan_async(loan_data)
+
+        record = self._loan_record(loan_data, embedding)
+        await asyncio.to_thread(self.vector_db.collection.upsert, **record)
+        logger.info(f"Successfully stored loan {record['metadatas'][0]['loan_id']} in vector DB")
@@ -0,0 +1,104 @@
+import asyncio
+import logging
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+import ollama
+
+from ..config import LLM_CONFIG
+from .backends import NoBackendAvailable, OllamaBackend, OllamaBackendPool, ollama_backends
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncOllamaPool:
+    """Shared ``ollama.AsyncClient`` per host with bounded concurrency per request kind.
+
+    One pooled HTTP client per Ollama host is kept per event loop, and every
+    request is routed by the shared OllamaBackendPool so sync and async
+    callers see the same load and circuit state. Generations and embeddings
+    have separate limits, scaled by the number of hosts, so a burst of long
+    generations cannot starve the short embedding calls, and requests beyond
+    the limit wait on the event loop instead of holding a worker thread.
+    """
+
+    def __init__(self, host: Optional[str] = None,
+                 max_generations: int = LLM_CONFIG['max_concurrent_generations'],
+                 max_embeddings: int = LLM_CONFIG['max_concurrent_embeddings'],
+                 backends: Optional[OllamaBackendPool] = None):
+        self.backends = backends or (OllamaBackendPool([host]) if host else ollama_backends)
+        self.max_generations = max_generations
+        self.max_embeddings = max_embeddings
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._clients: Dict[str, Any] = {}
+        self._generation_slots: Optional[asyncio.Semaphore] = None
+        self._embedding_slots: Optional[asyncio.Semaphore] = None
+
+    def _bind(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            hosts = [backend.host for backend in self.backends.backends]
+            self._clients = {
+                host: ollama.AsyncClient(
+                    host=host,
+                    limits=httpx.Limits(max_connections=self.max_generations + self.max_embeddings)
+                )
+                for host in hosts
+            }
+            self._generation_slots = asyncio.Semaphore(self.max_generations * len(hosts))
+            self._embedding_slots = asyncio.Semaphore(self.max_embeddings * len(hosts))
+
+    async def _call(self, operation: str, request: Callable[[Any], Awaitable[Any]]) -> Any:
+        """Await request on the least loaded host, failing over to the others"""
+        tried: List[OllamaBackend] = []
+        last_error: Optional[Exception] = None
+        while len(tried) < len(self.backends.backends):
+            backend = self.backends.acquire(exclude=tried)
+            tried.append(backend)
+            started = time.monotonic()
+            try:
+                result = await request(self._clients[backend.host])
+            except asyncio.CancelledError:
+                self.backends.release(backend, operation, started, ok=None)
+                raise
+            except Exception as e:
+                self.backends.release(backend, operation, started, ok=False)
+                logger.warning(f"Ollama {operation} on {backend.host} failed: {str(e)}")
+                last_error = e
+                continue
+            self.backends.release(backend, operation, started, ok=True)
+            return result
+        raise NoBackendAvailable(f"Ollama {operation} failed on every host: {last_error}") from last_error
+
+    async def generate(self, **kwargs) -> Dict[str, Any]:
+        self._bind()
+        async with self._generation_slots:
+            return await self._call('generate', lambda client: client.generate(**kwargs))
+
+    async def generate_stream(self, **kwargs) -> AsyncIterator[Dict[str, Any]]:
+        """Yield generation chunks as the server produces them"""
+        self._bind()
+        async with self._generation_slots:
+            backend = self.backends.acquire()
+            started = time.monotonic()
+            ok = False
+            try:
+                async for chunk in await self._clients[backend.host].generate(stream=True, **kwargs):
+                    yield chunk
+                ok = True
+            except (asyncio.CancelledError, GeneratorExit):
+                ok = None  # abandoned by the caller, says nothing about the host
+                raise
+            finally:
+                self.backends.release(backend, 'generate', started, ok)
+
+    async def embeddings(self, model: str, prompt: str) -> List[float]:
+        self._bind()
+        async with self._embedding_slots:
+            response = await self._call('embeddings', lambda client: client.embeddings(model=model, prompt=prompt))
+        return response['embedding']
+
+
+ollama_pool = AsyncOllamaPool()
@@ -0,0 +1,239 @@
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import ollama
+from prometheus_client import Counter, Gauge, Histogram
+
+from ..config import BACKEND_CONFIG, OLLAMA_HOSTS
+
+logger = logging.getLogger(__name__)
+
+BACKEND_LATENCY = Histogram(
+    'ollama_request_seconds', 'Ollama request latency per host', ['host', 'operation'],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+)
+BACKEND_OUTSTANDING = Gauge('ollama_outstanding_requests', 'In-flight requests per Ollama host', ['host'])
+BACKEND_UP = Gauge('ollama_backend_up', 'Whether the Ollama host is accepting requests (circuit closed)', ['host'])
+BACKEND_FAILURES = Counter('ollama_request_failures_total', 'Failed or too slow Ollama requests', ['host', 'operation'])
+
+
+class NoBackendAvailable(Exception):
+    """Raised when every Ollama host failed the request"""
+
+
+class OllamaBackend:
+    """One Ollama host with its in-flight count and circuit breaker state"""
+
+    def __init__(self, host: str, failure_threshold: int, cooldown_seconds: float, slow_seconds: float):
+        self.host = host
+        self.client = ollama.Client(host=host)
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.slow_seconds = slow_seconds
+        self.outstanding = 0
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.tripped_at = 0.0
+        self.trial_in_flight = False
+        self.healthy = True
+        self.avg_latency = 0.0
+        BACKEND_UP.labels(host=host).set(1)
+
+    @property
+    def closed(self) -> bool:
+        return not self.open_until
+
+    def available(self, now: float) -> bool:
+        """Closed circuit, or half-open with no trial request in flight yet"""
+        if self.closed:
+            return True
+        return now >= self.open_until and not self.trial_in_flight
+
+    def reserve(self):
+        self.outstanding += 1
+        if not self.closed:
+            # Half-open (or a last-resort probe while open): this request decides the circuit
+            self.trial_in_flight = True
+
+    def record(self, operation: str, started: float, ok: Optional[bool]):
+        """Account a finished request; ``ok=None`` (cancelled) only gives up its trial"""
+        tripped = not self.closed
+        # Requests that began before the circuit opened say nothing about the trial
+        is_trial = tripped and started >= self.tripped_at
+        if ok is None:
+            if is_trial:
+                self.trial_in_flight = False
+            return
+
+        latency = time.monotonic() - started
+        BACKEND_LATENCY.labels(host=self.host, operation=operation).observe(latency)
+        ok = ok and latency <= self.slow_seconds
+        if ok:
+            self.avg_latency = latency if not self.avg_latency else 0.8 * self.avg_latency + 0.2 * latency
+        else:
+            BACKEND_FAILURES.labels(host=self.host, operation=operation).inc()
+
+        if tripped:
+            if is_trial:
+                self.trial_in_flight = False
+                if ok:
+                    self._close()
+                else:
+                    self._trip()
+            return
+
+        if ok:
+            self.consecutive_failures = 0
+            return
+        self.consecutive_failures += 1
+        if self.consecutive_failures >= self.failure_threshold:
+            self._trip()
+
+    def record_health(self, latency: float, ok: bool):
+        """Account a model-list probe; it may open the circuit of an unreachable host, never close it"""
+        BACKEND_LATENCY.labels(host=self.host, operation='health').observe(latency)
+        self.healthy = ok
+        if not ok:
+            BACKEND_FAILURES.labels(host=self.host, operation='health').inc()
+            if self.closed:
+                self._trip()
+
+    def _trip(self):
+        now = time.monotonic()
+        self.open_until = now + self.cooldown_seconds
+        self.tripped_at = now
+        self.trial_in_flight = False
+        BACKEND_UP.labels(host=self.host).set(0)
+        logger.warning(f"Ollama host {self.host} disabled for {self.cooldown_seconds}s "
+                       f"after {self.consecutive_failures} failed or slow requests")
+
+    def _close(self):
+        self.open_until = 0.0
+        self.consecutive_failures = 0
+        BACKEND_UP.labels(host=self.host).set(1)
+        logger.info(f"Ollama host {self.host} enabled again after a successful trial request")
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            'host': self.host,
+            'outstanding': self.outstanding,
+            'up': self.closed,
+            'healthy': self.healthy,
+            'consecutive_failures': self.consecutive_failures,
+            'avg_latency': round(self.avg_latency, 3)
+        }
+
+
+class OllamaBackendPool:
+    """Spreads Ollama calls over several hosts.
+
+    Each call goes to the available host with the fewest outstanding
+    requests (ties go to the faster host). Hosts that fail or exceed
+    ``slow_seconds`` ``failure_threshold`` times in a row are skipped for
+    ``cooldown_seconds``; then a single trial request is let through, and
+    only its success closes the circuit (a failure starts another cooldown).
+    Health probes can open the circuit of an unreachable host but never
+    close one. A failed call is retried once on every other host before
+    giving up.
+
+    ``generate`` and ``embeddings`` mirror the module-level ``ollama``
+    functions, so the pool can stand in for the module.
+    """
+
+    def __init__(self, hosts: Sequence[str] = OLLAMA_HOSTS,
+                 failure_threshold: int = BACKEND_CONFIG['failure_threshold'],
+                 cooldown_seconds: float = BACKEND_CONFIG['cooldown_seconds'],
+                 slow_seconds: float = BACKEND_CONFIG['slow_request_seconds']):
+        if not hosts:
+            raise ValueError("At least one Ollama host is required")
+        self.backends = [OllamaBackend(host, failure_threshold, cooldown_seconds, slow_seconds) for host in hosts]
+        self._lock = threading.Lock()
+        self._health_thread: Optional[threading.Thread] = None
+
+    @property
+    def is_pooled(self) -> bool:
+        return len(self.backends) > 1
+
+    def acquire(self, exclude: Sequence[OllamaBackend] = ()) -> OllamaBackend:
+        """Reserve the least loaded available host"""
+        with self._lock:
+            now = time.monotonic()
+            candidates = [backend for backend in self.backends if backend not in exclude]
+            if not candidates:
+                raise NoBackendAvailable("All Ollama hosts failed")
+            available = [backend for backend in candidates if backend.available(now)]
+            if available:
+                backend = min(available, key=lambda b: (b.outstanding, b.avg_latency))
+            else:
+                # Every circuit is open: probe the host that will recover first
+                backend = min(candidates, key=lambda b: b.open_until)
+            backend.reserve()
+            BACKEND_OUTSTANDING.labels(host=backend.host).set(backend.outstanding)
+            return backend
+
+    def release(self, backend: OllamaBackend, operation: str, started: float, ok: Optional[bool]):
+        """Return a reserved host; ``ok=None`` (cancelled) only frees its trial slot"""
+        with self._lock:
+            backend.outstanding -= 1
+            BACKEND_OUTSTANDING.labels(host=backend.host).set(backend.outstanding)
+            backend.record(operation, started, ok)
+
+    def call(self, operation: str, request: Callable[[OllamaBackend], Any]) -> Any:
+        """Run request on the best host, failing over to the others"""
+        tried: List[OllamaBackend] = []
+        last_error: Optional[Exception] = None
+        while len(tried) < len(self.backends):
+            backend = self.acquire(exclude=tried)
+            tried.append(backend)
+            started = time.monotonic()
+            try:
+                result = request(backend)
+            except Exception as e:
+                self.release(backend, operation, started, ok=False)
+                logger.warning(f"Ollama {operation} on {backend.host} failed: {str(e)}")
+                last_error = e
+                continue
+            self.release(backend, operation, started, ok=True)
+            return result
+        raise NoBackendAvailable(f"Ollama {operation} failed on every host: {last_error}") from last_error
+
+    def generate(self, **kwargs) -> Dict[str, Any]:
+        return self.call('generate', lambda backend: backend.client.generate(**kwargs))
+
+    def embeddings(self, **kwargs) -> Dict[str, Any]:
+        return self.call('embeddings', lambda backend: backend.client.embeddings(**kwargs))
+
+    def check_health(self):
+        """Probe every host's model list; a failed probe opens that host's circuit"""
+        for backend in self.backends:
+            started = time.monotonic()
+            try:
+                backend.client.list()
+                ok = True
+            except Exception as e:
+                logger.warning(f"Ollama health check on {backend.host} failed: {str(e)}")
+                ok = False
+            with self._lock:
+                backend.record_health(time.monotonic() - started, ok)
+
+    def start_health_checks(self, interval: float = BACKEND_CONFIG['health_interval_seconds']):
+        """Run check_health periodically on a daemon thread"""
+        if self._health_thread is not None:
+            return
+
+        def run():
+            while True:
+                self.check_health()
+                time.sleep(interval)
+
+        self._health_thread = threading.Thread(target=run, name="ollama-health", daemon=True)
+        self._health_thread.start()
+
+    def stats(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [backend.snapshot() for backend in self.backends]
+
+
+ollama_backends = OllamaBackendPool()
@@ -0,0 +1,89 @@
+import logging
+import math
+import threading
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from ..config import PROMPT_BUDGET_CONFIG
+
+logger = logging.getLogger(__name__)
+
+
+class PromptSection:
+    """Alternative renderings of one part of a prompt, fullest first"""
+    __slots__ = ('name', 'variants', 'value')
+
+    def __init__(self, name: str, variants: Sequence[str], value: int):
+        self.name = name
+        self.variants = list(variants)
+        self.value = value  # lower values are trimmed first
+
+
+class PromptBudget:
+    """Fits prompts into the smallest adequate Ollama context window.
+
+    Token counts are estimated from the character length, which is
+    conservative for the numeric, mixed French/English text of the
+    prompts. When a prompt plus the room reserved for the answer exceeds
+    the largest allowed window, sections are stepped down to their shorter
+    variants, lowest value first.
+
+    ``sticky`` (off by default) deliberately departs from picking the
+    smallest window: per model, the chosen num_ctx only grows, so later
+    prompts reuse the largest one and Ollama does not reload the model and
+    lose its kept-alive prompt prefix when sizes alternate.
+    """
+
+    def __init__(self, context_sizes: Sequence[int] = PROMPT_BUDGET_CONFIG['context_sizes'],
+                 response_tokens: int = PROMPT_BUDGET_CONFIG['response_tokens'],
+                 chars_per_token: float = PROMPT_BUDGET_CONFIG['chars_per_token'],
+                 sticky: bool = PROMPT_BUDGET_CONFIG['sticky_context']):
+        self.context_sizes = sorted(context_sizes)
+        self.response_tokens = response_tokens
+        self.chars_per_token = chars_per_token
+        self.sticky = sticky
+        self._sticky_sizes: Dict[Optional[str], int] = {}
+        self._lock = threading.Lock()
+
+    def count_tokens(self, text: str) -> int:
+        return math.ceil(len(text) / self.chars_per_token)
+
+    def context_size(self, prompt: str, model: Optional[str] = None) -> int:
+        """Smallest allowed num_ctx holding the prompt and the answer (and, when sticky, any earlier one of model)"""
+        needed = self.count_tokens(prompt) + self.response_tokens
+        if not self.sticky:
+            return self._smallest_size(needed)
+        with self._lock:
+            size = self._smallest_size(max(needed, self._sticky_sizes.get(model, 0)))
+            self._sticky_sizes[model] = size
+        return size
+
+    def _smallest_size(self, needed: int) -> int:
+        return next((size for size in self.context_sizes if needed <= size), self.context_sizes[-1])
+
+    def fits(self, prompt: str) -> bool:
+        return self.count_tokens(prompt) + self.response_tokens <= self.context_sizes[-1]
+
+    def fit(self, sections: List[PromptSection], render: Callable[[Dict[str, str]], str],
+            model: Optional[str] = None) -> Tuple[str, int]:
+        """Render the fullest prompt that fits and the num_ctx to run it with"""
+        choice = {section.name: 0 for section in sections}
+
+        def current() -> str:
+            return render({section.name: section.variants[choice[section.name]] for section in sections})
+
+        prompt = current()
+        while not self.fits(prompt):
+            trimmable = [section for section in sections if choice[section.name] < len(section.variants) - 1]
+            if not trimmable:
+                logger.warning(f"Prompt of ~{self.count_tokens(prompt)} tokens exceeds the "
+                               f"{self.context_sizes[-1]} token context even after trimming")
+                break
+            section = min(trimmable, key=lambda s: s.value)
+            choice[section.name] += 1
+            logger.info(f"Trimmed prompt section '{section.name}' to fit the context window")
+            prompt = current()
+
+        return prompt, self.context_size(prompt, model)
+
+
+prompt_budget = PromptBudget()
@@ -0,0 +1,115 @@
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+
+from ..config import EMBEDDING_CACHE_SIZE, EMBEDDING_VIEW_MAX_CHARS, EMBEDDING_VIEW_MAX_INDICATORS
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever embedding_text changes so stored vectors can be told apart
+EMBEDDING_VIEW_VERSION = 1
+
+_CUSTOMER_FIELDS = (('type', ('type',)), ('gender', ('demographics', 'gender')),
+                    ('marital_status', ('demographics', 'marital_status')), ('age', ('demographics', 'age')),
+                    ('address', ('address',)))
+_LOAN_FIELDS = (('product', ('basic_info', 'product')), ('loan_amount', ('financials', 'loan_amount')),
+                ('personal_contribution', ('financials', 'personal_contribution')),
+                ('term_months', ('financials', 'term_months')), ('interest_rate', ('financials', 'interest_rate')),
+                ('apr', ('financials', 'apr')), ('monthly_payment', ('financials', 'monthly_payment')),
+                ('assets_total', ('financials', 'assets_total')), ('currency', ('financials', 'currency')))
+
+
+def _lookup(data: Mapping[str, Any], path: Tuple[str, ...]) -> Any:
+    for key in path:
+        if not isinstance(data, Mapping):
+            return None
+        data = data.get(key)
+    return data
+
+
+def embedding_text(loan_data: Mapping[str, Any],
+                   max_indicators: int = EMBEDDING_VIEW_MAX_INDICATORS,
+                   max_chars: int = EMBEDDING_VIEW_MAX_CHARS) -> str:
+    """Canonical text embedded for a loan.
+
+    Only risk-relevant fields are kept, one ``key: value`` line each in a
+    fixed order: the customer profile, the loan terms, the overall score and
+    the highest-scoring indicators sorted by name. Names, ids, free text and
+    the LLM's own output are left out, and the result is capped at
+    ``max_chars``.
+    """
+    customer = loan_data.get('customer_info') or {}
+    loan = loan_data.get('loan_info') or {}
+    risk = loan_data.get('risk_assessment') or {}
+
+    lines = [f"view: v{EMBEDDING_VIEW_VERSION}"]
+    lines += [f"customer.{name}: {_lookup(customer, path)}" for name, path in _CUSTOMER_FIELDS
+              if _lookup(customer, path) not in (None, '', 'N/A')]
+    lines += [f"loan.{name}: {_lookup(loan, path)}" for name, path in _LOAN_FIELDS
+              if _lookup(loan, path) not in (None, '')]
+    lines.append(f"risk.total_score: {risk.get('total_score')}")
+    lines.append(f"risk.level: {risk.get('risk_level')}")
+
+    indicators = risk.get('indicators') or {}
+    top = sorted(indicators.items(), key=lambda item: (-float(item[1].get('score') or 0), item[0]))[:max_indicators]
+    lines += [
+        f"indicator.{name}: {indicator.get('value')} ({indicator.get('risk_level')}, {indicator.get('score')})"
+        for name, indicator in sorted(top)
+    ]
+    return "\n".join(lines)[:max_chars]
+
+
+class EmbeddingCache:
+    """In-process LRU of embeddings keyed by a hash of model and input text.
+
+    Retrieval, feedback lookup and the vector store upsert of one loan all
+    share the same vector, and re-analyzing an unchanged loan does not call
+    the embedding model at all.
+    """
+
+    def __init__(self, max_entries: int = EMBEDDING_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(model: str, text: str) -> str:
+        return hashlib.sha256(f"{model}\0{text}".encode('utf-8')).hexdigest()
+
+    def get(self, model: str, text: str) -> Optional[List[float]]:
+        key = self.key(model, text)
+        with self._lock:
+            embedding = self._entries.get(key)
+            if embedding is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return embedding
+
+    def put(self, model: str, text: str, embedding: List[float]):
+        key = self.key(model, text)
+        with self._lock:
+            self._entries[key] = embedding
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_compute(self, model: str, text: str, compute: Callable[[str], List[float]]) -> List[float]:
+        """Return the cached embedding of text, computing it on a miss"""
+        embedding = self.get(model, text)
+        if embedding is None:
+            embedding = compute(text)
+            self.put(model, text, embedding)
+        return embedding
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+
+embedding_cache = EmbeddingCache()
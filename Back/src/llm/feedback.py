@@ -5,7 +5,8 @@ from typing import Dict, Any, Optional
 from datetime import datetime
 import json
 from pypdf import PdfReader
-from ..config import DATA_DIR, PDF_DIR
+from ..config import DATA_DIR, PDF_DIR, FEEDBACK_SUMMARY_PRECOMPUTE
+from .feedback_cache import feedback_summary_cache, refresh_in_background
 
 logger = logging.getLogger(__name__)
 
@@ -127,7 +128,7 @@ class FeedbackSystem:
             self._save_feedback_db(db)
             
             # ✅ CRITICAL: Update the vector DB entry with feedback metadata
-            self._update_vector_db_with_feedback(loan_id, feedback_entry, analysis)
+            self.apply_feedback(loan_id, feedback_entry, analysis)
         
             logger.info(f"Feedback stored for loan {loan_id}")
             return True
@@ -136,6 +137,15 @@ class FeedbackSystem:
             logger.error(f"Failed to store feedback: {str(e)}")
             return False
 
+    def apply_feedback(self, loan_id: str, feedback_entry: Dict, analysis: Dict):
+        """Attach feedback to the loan's vector DB entry and rebuild the summaries that cover it"""
+        self._update_vector_db_with_feedback(loan_id, feedback_entry, analysis)
+
+        # Summaries covering this loan are stale; rebuild them before the next analysis needs them
+        refreshers = feedback_summary_cache.invalidate(loan_id)
+        if FEEDBACK_SUMMARY_PRECOMPUTE:
+            refresh_in_background(refreshers)
+
     def _update_vector_db_with_feedback(self, loan_id: str, feedback_entry: Dict, analysis: Dict):
         """Update the vector DB entry to include feedback metadata"""
         if not self.vector_db:
@@ -0,0 +1,116 @@
+import hashlib
+import json
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from ..config import FEEDBACK_SUMMARY_CACHE_SIZE
+
+logger = logging.getLogger(__name__)
+
+# Sorted (loan_id, feedback timestamp) pairs of the neighbors a summary covers
+Neighbors = Tuple[Tuple[str, str], ...]
+
+
+class _SummaryEntry:
+    __slots__ = ('neighbors', 'summary', 'refresh')
+
+    def __init__(self, neighbors: Neighbors, summary: str, refresh: Optional[Callable[[], None]]):
+        self.neighbors = neighbors
+        self.summary = summary
+        self.refresh = refresh
+
+
+class FeedbackSummaryCache:
+    """In-process LRU of generated feedback summaries keyed by neighbor set.
+
+    Similar applications keep retrieving the same reviewed loans, so the
+    summary of their feedback is generated once per set of loans and
+    feedback timestamps. New feedback on any of those loans changes the key;
+    ``invalidate`` also drops the stale entries and hands back their refresh
+    callbacks so the summary can be rebuilt ahead of the next analysis.
+    """
+
+    def __init__(self, max_entries: int = FEEDBACK_SUMMARY_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, _SummaryEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def neighbors(metadatas: List[Dict]) -> Neighbors:
+        """Neighbor set of the cases whose feedback goes into a summary"""
+        return tuple(sorted(
+            (str(meta.get('loan_id')), str(meta['feedback'].get('timestamp')))
+            for meta in metadatas
+            if meta.get('has_feedback') and meta.get('feedback', {}).get('comments')
+        ))
+
+    @staticmethod
+    def key(model: str, neighbors: Neighbors) -> str:
+        payload = json.dumps([model, neighbors])
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.summary
+
+    def put(self, key: str, neighbors: Neighbors, summary: str,
+            refresh: Optional[Callable[[], None]] = None):
+        with self._lock:
+            self._entries[key] = _SummaryEntry(neighbors, summary, refresh)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, loan_id: str) -> List[Callable[[], None]]:
+        """Drop summaries that include loan_id and return their refresh callbacks"""
+        loan_id = str(loan_id)
+        with self._lock:
+            stale = [key for key, entry in self._entries.items()
+                     if any(neighbor_id == loan_id for neighbor_id, _ in entry.neighbors)]
+            refreshers = []
+            for key in stale:
+                entry = self._entries.pop(key)
+                if entry.refresh is not None:
+                    refreshers.append(entry.refresh)
+
+        if stale:
+            logger.info(f"Invalidated {len(stale)} feedback summaries for loan {loan_id}")
+        return refreshers
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+
+def refresh_in_background(refreshers: List[Callable[[], None]]) -> Optional[threading.Thread]:
+    """Rebuild invalidated summaries on a daemon thread"""
+    if not refreshers:
+        return None
+
+    def run():
+        for refresh in refreshers:
+            try:
+                refresh()
+            except Exception as e:
+                logger.warning(f"Feedback summary precompute failed: {str(e)}")
+
+    thread = threading.Thread(target=run, name="feedback-summary-precompute", daemon=True)
+    thread.start()
+    return thread
+
+
+feedback_summary_cache = FeedbackSummaryCache()
@@ -0,0 +1,163 @@
+import json
+import logging
+import re
+from typing import Any, Dict, List, Optional
+
+from prometheus_client import Counter
+
+from ..data_models import LLMAnalysis
+
+logger = logging.getLogger(__name__)
+
+PARSE_OUTCOMES = Counter('llm_response_parse_total', 'LLM responses by parse outcome', ['outcome'])
+
+RECOMMENDATIONS = ('approve', 'deny', 'review')
+_RECOMMENDATION_ALIASES = {
+    'approved': 'approve', 'approval': 'approve', 'accept': 'approve', 'accepted': 'approve',
+    'denied': 'deny', 'decline': 'deny', 'declined': 'deny', 'reject': 'deny', 'rejected': 'deny',
+    'manual review': 'review', 'refer': 'review', 'pending': 'review',
+}
+_ANALYSIS_KEYS = ('summary', 'recommendation', 'rationale', 'key_findings', 'conditions')
+
+_THINK_BLOCK = re.compile(r'<think>.*?</think>', re.IGNORECASE | re.DOTALL)
+_THINK_TAG = re.compile(r'</?think>', re.IGNORECASE)
+_TRAILING_COMMA = re.compile(r',\s*([}\]])')
+_PYTHON_LITERALS = {'True': 'true', 'False': 'false', 'None': 'null'}
+_SMART_QUOTES = str.maketrans({'“': '"', '”': '"', '‘': "'", '’': "'"})
+
+
+def strip_reasoning(text: str) -> str:
+    """Drop <think> blocks and markdown code fences around the answer"""
+    text = _THINK_BLOCK.sub('', text)
+    text = _THINK_TAG.sub('', text)
+    return text.replace('```json', '').replace('```', '')
+
+
+def extract_json_objects(text: str) -> List[str]:
+    """Top-level balanced {...} spans of text, in order.
+
+    Braces inside string literals are ignored. An object still open at the
+    end of the text (a truncated generation) is closed with the missing
+    brackets so it can be repaired.
+    """
+    objects = []
+    stack: List[str] = []
+    start = None
+    in_string = escaped = False
+
+    for index, char in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == '\\':
+                escaped = True
+            elif char == '"':
+                in_string = False
+            continue
+
+        if char == '"' and stack:
+            in_string = True
+        elif char in '{[':
+            if char == '{' and not stack:
+                start = index
+            if stack or char == '{':
+                stack.append('}' if char == '{' else ']')
+        elif char in '}]' and stack:
+            if char != stack[-1]:
+                continue  # stray closer, leave it to the repair step
+            stack.pop()
+            if not stack:
+                objects.append(text[start:index + 1])
+
+    if stack:
+        tail = text[start:] + ('"' if in_string else '')
+        objects.append(tail + ''.join(reversed(stack)))
+    return objects
+
+
+def repair_json(candidate: str) -> str:
+    """Fix the defects small models commonly produce in otherwise valid JSON"""
+    candidate = candidate.translate(_SMART_QUOTES)
+    out = []
+    in_string = escaped = False
+    index = 0
+    while index < len(candidate):
+        char = candidate[index]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == '\\':
+                escaped = True
+            elif char == '"':
+                in_string = False
+            elif char == '\n':
+                char = '\\n'
+            elif char == '\t':
+                char = '\\t'
+            out.append(char)
+            index += 1
+            continue
+
+        if char == '"':
+            in_string = True
+        elif char.isalpha():
+            word = re.match(r'[A-Za-z]+', candidate[index:]).group(0)
+            out.append(_PYTHON_LITERALS.get(word, word))
+            index += len(word)
+            continue
+        out.append(char)
+        index += 1
+
+    return _TRAILING_COMMA.sub(r'\1', ''.join(out))
+
+
+def _as_list(value: Any) -> List[str]:
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return [value] if value.strip() else []
+    if isinstance(value, dict):
+        return [f"{key}: {item}" for key, item in value.items()]
+    return [str(item) for item in value if str(item).strip()]
+
+
+def normalize_recommendation(value: Any) -> str:
+    recommendation = str(value or '').strip().lower()
+    if recommendation in RECOMMENDATIONS:
+        return recommendation
+    if recommendation in _RECOMMENDATION_ALIASES:
+        return _RECOMMENDATION_ALIASES[recommendation]
+    # Template placeholders such as "approve|deny|review" carry no decision
+    matches = [option for option in RECOMMENDATIONS if option in recommendation]
+    return matches[0] if len(matches) == 1 else 'review'
+
+
+def validate_analysis(data: Dict[str, Any]) -> LLMAnalysis:
+    """Coerce a decoded object to the LLMAnalysis schema"""
+    summary = data.get('summary')
+    return LLMAnalysis(
+        summary=str(summary).strip() if summary else 'No summary provided',
+        recommendation=normalize_recommendation(data.get('recommendation')),
+        rationale=_as_list(data.get('rationale')),
+        key_findings=_as_list(data.get('key_findings')),
+        conditions=_as_list(data.get('conditions'))
+    )
+
+
+def parse_analysis(response: str) -> Optional[LLMAnalysis]:
+    """Best-effort LLMAnalysis from a raw generation, or None if nothing usable is found"""
+    candidates = extract_json_objects(strip_reasoning(response))
+
+    for repaired in (False, True):
+        for candidate in candidates:
+            try:
+                data = json.loads(repair_json(candidate) if repaired else candidate)
+            except json.JSONDecodeError:
+                continue
+            if isinstance(data, dict) and any(key in data for key in _ANALYSIS_KEYS):
+                PARSE_OUTCOMES.labels(outcome='repaired' if repaired else 'clean').inc()
+                return validate_analysis(data)
+
+    PARSE_OUTCOMES.labels(outcome='failed').inc()
+    logger.warning(f"No analysis JSON found in {len(response)} characters of model output")
+    return None
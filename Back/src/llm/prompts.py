@@ -2,321 +2,20 @@ import json
 import logging
 from typing import Dict, List, Optional
 from src.utils import Utils
+from .templates import prompt_templates
 
 class LLMPromptBuilder:
     
-    @staticmethod
-    def _get_loan_type_template(loan_type: str) -> str:
-        """Get specialized template based on loan type - FIXED FORMATTING"""
-        templates = {
-            "large_commercial": """
-You are a senior commercial lending risk analyst with 20 years of experience in corporate banking.
-Conduct a comprehensive assessment of this commercial loan application, focusing on:
-
-1. **Business Financial Health**: Cash flow analysis, debt service coverage ratio, liquidity position
-2. **Industry Risk**: Market conditions, competitive landscape, regulatory environment
-3. **Management Evaluation**: Experience, track record, succession planning
-4. **Collateral Assessment**: Quality, liquidity, coverage ratios
-5. **Covenant Structure**: Appropriate financial covenants and monitoring requirements
-
-=== APPLICATION DETAILS ===
-
-**Borrower Profile:**
-- Name: {customer_name}
-- Loan Amount: {loan_amount} {currency}
-- Term: {term_months} months
-
-**Financial Metrics:**
-- Personal Contribution: {personal_contribution} {currency}
-- Monthly Payment: {monthly_payment} {currency}
-- Total Assets: {assets_total} {currency}
-- APR: {apr}%
-- Interest Rate: {interest_rate}%
-
-**Risk Assessment:**
-Total Score: {total_score}
-{risk_table}
-
-**Additional Information:**
-{udf_data}
-
-=== REQUIRED ANALYSIS ===
-
-Provide a professional assessment with VALID JSON following this exact structure:
-{{
-    "summary": "Comprehensive commercial risk analysis",
-    "recommendation": "approve|deny|review",
-    "rationale": [
-        "Primary reason for recommendation",
-        "Supporting financial analysis",
-        "Key risk factors"
-    ],
-    "key_findings": [
-        "Specific finding 1 with impact",
-        "Specific finding 2 with impact"
-    ],
-    "conditions": [
-        "Specific condition 1 if approving",
-        "Verification needed if reviewing"
-    ],
-    "commercial_analysis": [
-        "Industry risk assessment",
-        "Management evaluation", 
-        "Collateral analysis",
-        "Financial covenant recommendations",
-        "Monitoring requirements"
-    ]
-}}
-""",
-            "agricultural": """
-You are an agricultural lending specialist with deep expertise in farming risks and agribusiness.
-Analyze this agricultural loan application considering:
-
-1. **Crop Yield Projections**: Historical yields, weather patterns, soil quality
-2. **Commodity Price Risks**: Market volatility, price hedging strategies
-3. **Weather & Climate Impact**: Drought risk, irrigation capabilities, climate resilience
-4. **Farming Operations**: Equipment quality, operational efficiency, technology adoption
-5. **Government Programs**: Eligibility for subsidies, insurance programs, support mechanisms
-
-=== APPLICATION DETAILS ===
-
-**Farmer Profile:**
-- Name: {customer_name}
-- Loan Amount: {loan_amount} {currency}
-- Term: {term_months} months
-
-**Financial Metrics:**
-- Personal Contribution: {personal_contribution} {currency}
-- Monthly Payment: {monthly_payment} {currency}
-- Total Assets: {assets_total} {currency}
-- APR: {apr}%
-- Interest Rate: {interest_rate}%
-
-**Risk Assessment:**
-Total Score: {total_score}
-{risk_table}
-
-**Additional Information:**
-{udf_data}
-
-=== REQUIRED ANALYSIS ===
-
-Provide an agricultural risk assessment with VALID JSON following this structure:
-{{
-    "summary": "Agricultural risk analysis",
-    "recommendation": "approve|deny|review",
-    "rationale": [
-        "Primary agricultural risk factors",
-        "Commodity market analysis",
-        "Weather and climate impact"
-    ],
-    "key_findings": [
-        "Yield projection assessment",
-        "Price risk evaluation",
-        "Operational efficiency"
-    ],
-    "conditions": [
-        "Specific condition 1 if approving",
-        "Verification needed if reviewing"
-    ],
-    "agricultural_analysis": [
-        "Crop insurance requirement",
-        "Price hedging recommendation",
-        "Government program enrollment",
-        "Seasonal repayment structure",
-        "Weather risk mitigation"
-    ]
-}}
-""",
-            "personal": """
-You are a consumer lending expert specializing in personal loans and individual credit assessment.
-Evaluate this personal loan application focusing on:
-
-1. **Creditworthiness**: Income stability, debt-to-income ratio, credit history
-2. **Repayment Capacity**: Cash flow analysis, employment stability, financial resilience
-3. **Purpose Evaluation**: Loan purpose合理性, alignment with borrower's financial goals
-4. **Risk Mitigation**: Collateral quality, guarantor assessment, insurance coverage
-5. **Regulatory Compliance**: Consumer protection regulations, fair lending practices
-
-=== APPLICATION DETAILS ===
-
-**Borrower Profile:**
-- Name: {customer_name}
-- Age: {customer_age}
-- Gender: {customer_gender}
-- Marital Status: {marital_status}
-- Loan Amount: {loan_amount} {currency}
-- Term: {term_months} months
-
-**Financial Metrics:**
-- Personal Contribution: {personal_contribution} {currency}
-- Monthly Payment: {monthly_payment} {currency}
-- Total Assets: {assets_total} {currency}
-- APR: {apr}%
-- Interest Rate: {interest_rate}%
-
-**Risk Assessment:**
-Total Score: {total_score}
-{risk_table}
-
-**Additional Information:**
-{udf_data}
-
-=== REQUIRED ANALYSIS ===
-
-Provide a consumer lending assessment with VALID JSON following this structure:
-{{
-    "summary": "Personal loan risk analysis",
-    "recommendation": "approve|deny|review",
-    "rationale": [
-        "Creditworthiness assessment",
-        "Repayment capacity analysis",
-        "Purpose evaluation"
-    ],
-    "key_findings": [
-        "Income stability assessment",
-        "Debt burden analysis",
-        "Financial behavior evaluation"
-    ],
-    "conditions": [
-        "Specific condition 1 if approving",
-        "Verification needed if reviewing"
-    ],
-    "personal_analysis": [
-        "Guarantor requirement if needed",
-        "Insurance recommendation",
-        "Payment structure adjustment",
-        "Credit counseling recommendation",
-        "Debt consolidation options"
-    ]
-}}
-""",
-            "mortgage": """
-You are a mortgage lending specialist with expertise in real estate financing.
-Evaluate this mortgage loan application focusing on:
-
-1. **Property Valuation**: Market value assessment, location analysis, property condition
-2. **Loan-to-Value Ratio**: Equity position, down payment adequacy
-3. **Borrower Qualification**: Income verification, credit history, debt-to-income ratio
-4. **Market Conditions**: Real estate market trends, interest rate environment
-5. **Insurance Requirements**: Homeowners insurance, PMI if applicable
-
-=== APPLICATION DETAILS ===
-
-**Borrower Profile:**
-- Name: {customer_name}
-- Age: {customer_age}
-- Gender: {customer_gender}
-- Marital Status: {marital_status}
-- Loan Amount: {loan_amount} {currency}
-- Term: {term_months} months
-
-**Financial Metrics:**
-- Personal Contribution: {personal_contribution} {currency}
-- Monthly Payment: {monthly_payment} {currency}
-- Total Assets: {assets_total} {currency}
-- APR: {apr}%
-- Interest Rate: {interest_rate}%
-
-**Risk Assessment:**
-Total Score: {total_score}
-{risk_table}
-
-**Additional Information:**
-{udf_data}
-
-=== REQUIRED ANALYSIS ===
-
-Provide a mortgage risk assessment with VALID JSON following this structure:
-{{
-    "summary": "Mortgage loan risk analysis",
-    "recommendation": "approve|deny|review",
-    "rationale": [
-        "Property valuation assessment",
-        "Borrower qualification analysis",
-        "Market condition evaluation"
-    ],
-    "key_findings": [
-        "LTV ratio analysis",
-        "Income verification assessment",
-        "Property market position"
-    ],
-    "conditions": [
-        "Specific condition 1 if approving",
-        "Verification needed if reviewing"
-    ],
-    "mortgage_analysis": [
-        "Property appraisal requirement",
-        "Homeowners insurance requirement",
-        "Title verification",
-        "Flood insurance if applicable",
-        "PMI requirement if LTV > 80%"
-    ]
-}}
-""",
-            "standard": """
-You are a senior financial risk analyst with 15 years of experience in banking.
-Conduct a professional assessment of this loan application, focusing on:
-
-1. **Data Consistency**: Verification of provided information, red flags
-2. **Financial Capacity**: Repayment ability, debt service coverage, liquidity
-3. **Risk Factor Correlation**: Interrelationships between risk factors
-4. **Profile-Purpose Alignment**: Consistency between borrower profile and loan purpose
-
-=== APPLICATION DETAILS ===
-
-**Customer Profile:**
-- Name: {customer_name}
-- Age: {customer_age}
-- Gender: {customer_gender}
-- Marital Status: {marital_status}
-
-**Financial Details:**
-- Loan Amount: {loan_amount} {currency}
-- Personal Contribution: {personal_contribution} {currency}
-- Monthly Payment: {monthly_payment} {currency}
-- Assets Value: {assets_total} {currency}
-- APR: {apr}%
-- Interest Rate: {interest_rate}%
-- Term: {term_months} months
-
-**Risk Assessment:**
-Total Score: {total_score}
-{risk_table}
-
-**Additional Information:**
-{udf_data}
-
-=== REQUIRED ANALYSIS ===
-
-Provide a professional assessment with VALID JSON following this structure:
-{{
-    "summary": "Comprehensive risk analysis",
-    "recommendation": "approve|deny|review",
-    "rationale": [
-        "Primary reason for recommendation",
-        "Supporting evidence from data",
-        "Risk/benefit analysis"
-    ],
-    "key_findings": [
-        "Specific finding 1 with impact analysis",
-        "Specific finding 2 with impact analysis"
-    ],
-    "conditions": [
-        "Specific condition 1 if approving",
-        "Verification needed if reviewing"
-    ],
-    "data_mismatches": [
-        "Notable inconsistency 1 between fields",
-        "Notable inconsistency 2 between fields"
-    ]
-}}
-"""
-        }
-        return templates.get(loan_type, templates["standard"])
+    CONTEXTUAL_INSTRUCTIONS = {
+        "large_commercial": "Focus on industry trends, market position comparisons, and commercial risk patterns",
+        "agricultural": "Compare seasonal patterns, commodity price histories, and weather impact similarities",
+        "personal": "Analyze credit behavior patterns, income stability comparisons, and consumer risk trends",
+        "mortgage": "Evaluate property market trends, location comparisons, and real estate risk patterns",
+        "standard": "Consider general risk patterns and decision consistency across similar profiles"
+    }
 
     @staticmethod
-    def _determine_loan_type(loan_data: Dict) -> str:
+    def determine_loan_type(loan_data: Dict) -> str:
         """Determine loan type based on loan data characteristics"""
         try:
             financials = loan_data['loan_info']['financials']
@@ -347,27 +46,34 @@ Provide a professional assessment with VALID JSON following this structure:
             return "standard"
 
     @staticmethod
-    def build_basic_prompt(loan_data: Dict) -> str:
+    def format_udf_data(customer_info: Dict) -> str:
+        """Non-scoring UDF groups as the prompt's additional information block"""
+        udf_details = []
+        for group in customer_info.get('udf_data', []):
+            if group.get('udfGroupeFieldsModels'):
+                udf_details.append(f"\n{group['userDefinedFieldGroupName']}:")
+                for field in group['udfGroupeFieldsModels']:
+                    udf_details.append(f"- {field.get('fieldName', 'Unknown')}: {field.get('value', 'N/A')}")
+        return "".join(udf_details) if udf_details else "None"
+
+    @staticmethod
+    def build_basic_prompt(loan_data: Dict, udf_data: Optional[str] = None, loan_type: Optional[str] = None) -> str:
         """
-        Build comprehensive risk assessment prompt with loan type specialization
+        Build comprehensive risk assessment prompt with loan type specialization.
+        ``udf_data`` replaces the formatted UDF block, e.g. when it is trimmed for length.
+        ``loan_type`` skips detection when the caller already determined it.
         """
         try:
             customer_info = loan_data['customer_info']
             financials = loan_data['loan_info']['financials']
             risk_assessment = loan_data['risk_assessment']
             
-            # Determine loan type
-            loan_type = LLMPromptBuilder._determine_loan_type(loan_data)
+            if loan_type is None:
+                loan_type = LLMPromptBuilder.determine_loan_type(loan_data)
             logging.info(f"Using loan type template: {loan_type}")
             
             # Prepare UDF data
-            udf_details = []
-            for group in customer_info.get('udf_data', []):
-                if group.get('udfGroupeFieldsModels'):
-                    udf_details.append(f"\n{group['userDefinedFieldGroupName']}:")
-                    for field in group['udfGroupeFieldsModels']:
-                        udf_details.append(f"- {field.get('fieldName', 'Unknown')}: {field.get('value', 'N/A')}")
-            udf_str = "".join(udf_details) if udf_details else "None"
+            udf_str = udf_data if udf_data is not None else LLMPromptBuilder.format_udf_data(customer_info)
 
             # Format risk factors table
             risk_table = ["| Risk Factor | Value | Score | Risk Level |",
@@ -379,8 +85,8 @@ Provide a professional assessment with VALID JSON following this structure:
                 )
             risk_table_str = "\n".join(risk_table)
 
-            # Get the appropriate template
-            template = LLMPromptBuilder._get_loan_type_template(loan_type)
+            # Get the appropriate precompiled template
+            template = prompt_templates.get(loan_type)
             
             # Prepare template variables
             template_vars = {
@@ -402,24 +108,24 @@ Provide a professional assessment with VALID JSON following this structure:
             }
             
             # Format the template with variables
-            prompt = template.format(**template_vars)
-            return prompt
+            return template.render(**template_vars)
 
         except Exception as e:
             logging.error(f"Prompt building failed: {str(e)}")
             raise
 
     @staticmethod 
-    def build_contextual_prompt(loan_data: Dict, similar_loans: Dict) -> str:
+    def build_contextual_prompt(loan_data: Dict, similar_loans: Dict, udf_data: Optional[str] = None,
+                                loan_type: Optional[str] = None) -> str:
         """
         Build RAG-enhanced prompt with comparative historical analysis and loan type specialization.
         """
         try:
+            if loan_type is None:
+                loan_type = LLMPromptBuilder.determine_loan_type(loan_data)
+
             # First build the basic prompt with loan type specialization
-            base_prompt = LLMPromptBuilder.build_basic_prompt(loan_data)
-            
-            # Determine loan type for contextual analysis
-            loan_type = LLMPromptBuilder._determine_loan_type(loan_data)
+            base_prompt = LLMPromptBuilder.build_basic_prompt(loan_data, udf_data, loan_type)
             
             # Prepare historical cases section
             context_cases = []
@@ -455,51 +161,17 @@ Provide a professional assessment with VALID JSON following this structure:
 
             historical_context = "\n".join(context_cases) if context_cases else "No sufficiently similar historical cases"
 
-            # Add loan-type specific historical context
-            contextual_instructions = {
-                "large_commercial": "Focus on industry trends, market position comparisons, and commercial risk patterns",
-                "agricultural": "Compare seasonal patterns, commodity price histories, and weather impact similarities",
-                "personal": "Analyze credit behavior patterns, income stability comparisons, and consumer risk trends",
-                "mortgage": "Evaluate property market trends, location comparisons, and real estate risk patterns",
-                "standard": "Consider general risk patterns and decision consistency across similar profiles"
-            }
-            
-            loan_type_instruction = contextual_instructions.get(loan_type, contextual_instructions["standard"])
+            loan_type_instruction = LLMPromptBuilder.CONTEXTUAL_INSTRUCTIONS.get(
+                loan_type, LLMPromptBuilder.CONTEXTUAL_INSTRUCTIONS["standard"])
 
             # Add historical context to the base prompt
-            contextual_prompt = f"""
-{base_prompt}
-
-=== HISTORICAL CONTEXT ===
-
-Consider these similar historical cases in your analysis:
-{historical_context}
-
-=== {loan_type.upper()} SPECIFIC COMPARATIVE ANALYSIS ===
-
-{loan_type_instruction}
-
-1. Significant deviations from historical patterns (>20% difference)
-2. Emerging risks not present in historical cases
-3. Improved risk factors compared to history
-4. Consistency with past decision patterns for similar {loan_type} loans
-
-=== UPDATED RESPONSE FORMAT ===
-Add this field to your JSON response:
-{{
-    "comparative_analysis": [
-        "Key difference 1 with historical context",
-        "Key difference 2 with trend analysis"
-    ],
-    "loan_type_specific_insights": [
-        "Specialized insight 1 for {loan_type} loans",
-        "Specialized insight 2 for {loan_type} loans"
-    ]
-}}
-
-Maintain all other fields from the basic analysis format.
-"""
-            return contextual_prompt
+            return prompt_templates.get('contextual').render(
+                base_prompt=base_prompt,
+                historical_context=historical_context,
+                loan_type=loan_type,
+                loan_type_upper=loan_type.upper(),
+                loan_type_instruction=loan_type_instruction
+            )
 
         except Exception as e:
             logging.error(f"Contextual prompt building failed: {str(e)}")
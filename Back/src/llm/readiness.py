@@ -0,0 +1,108 @@
+import logging
+import threading
+from time import time
+from typing import Any, Dict, Optional, Set
+
+import ollama
+
+from ..config import LLM_CONFIG
+from .backends import ollama_backends
+
+logger = logging.getLogger(__name__)
+
+
+class ModelReadiness:
+    """Once-per-process check that the Ollama models are present and loaded.
+
+    ``start`` runs the check on a daemon thread: models missing from the
+    server are pulled, then each one gets a tiny warm-up request so its
+    weights are in memory before the first analysis. Analyzers no longer
+    touch the model list themselves; ``status`` is reported by /health.
+    """
+
+    def __init__(self, generation_model: str = LLM_CONFIG['model_name'],
+                 embedding_model: str = LLM_CONFIG['embedding_model'],
+                 keep_alive: str = LLM_CONFIG['keep_alive']):
+        self.generation_model = generation_model
+        self.embedding_model = embedding_model
+        self.keep_alive = keep_alive
+        self._states = {generation_model: 'pending', embedding_model: 'pending'}
+        self._error: Optional[str] = None
+        self._ready_at: Optional[float] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def start(self) -> threading.Thread:
+        """Start the background check unless it already ran in this process"""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="model-warmup", daemon=True)
+                self._thread.start()
+            return self._thread
+
+    def _run(self):
+        started = time()
+        try:
+            self.verify()
+            self._ready_at = time()
+            logger.info(f"Models ready in {self._ready_at - started:.1f}s")
+        except Exception as e:
+            self._error = str(e)
+            logger.warning(f"Model verification warning: {str(e)}")
+
+    def verify(self):
+        """Pull missing models and load them into memory on every Ollama host"""
+        clients = [backend.client for backend in ollama_backends.backends] if ollama_backends.is_pooled else [ollama]
+        for model in self._states:
+            self._states[model] = 'loading'
+        for client in clients:
+            self._prepare(client)
+        for model in self._states:
+            self._states[model] = 'ready'
+
+    def _prepare(self, client):
+        available = self._available_models(client)
+        for model in self._states:
+            if model not in available:
+                self._states[model] = 'pulling'
+                logger.info(f"Downloading model: {model}")
+                client.pull(model)
+                self._states[model] = 'loading'
+
+            try:
+                if model == self.embedding_model:
+                    client.embeddings(model=model, prompt="warm-up", keep_alive=self.keep_alive)
+                else:
+                    # An empty prompt only loads the weights, nothing is generated
+                    client.generate(model=model, prompt="", keep_alive=self.keep_alive)
+            except Exception:
+                self._states[model] = 'failed'
+                raise
+
+    @staticmethod
+    def _available_models(client) -> Set[str]:
+        models_response = client.list()
+        available_models = set()
+
+        if isinstance(models_response, dict) and 'models' in models_response:
+            for model in models_response['models']:
+                if 'model' in model:
+                    available_models.add(model['model'])
+                elif 'name' in model:
+                    available_models.add(model['name'])
+        return available_models
+
+    @property
+    def ready(self) -> bool:
+        return all(state == 'ready' for state in self._states.values())
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            'ready': self.ready,
+            'models': dict(self._states),
+            'error': self._error,
+            'ready_at': self._ready_at
+        }
+
+
+model_readiness = ModelReadiness()
@@ -0,0 +1,166 @@
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+from prometheus_client import Counter
+
+from ..config import LLM_CACHE_FILE, LLM_CACHE_CONFIG
+
+logger = logging.getLogger(__name__)
+
+LLM_CACHE_HITS = Counter('llm_response_cache_hits_total', 'LLM responses served from the on-disk cache')
+LLM_CACHE_MISSES = Counter('llm_response_cache_misses_total', 'LLM prompts not found in the on-disk cache')
+LLM_CACHE_EVICTIONS = Counter('llm_response_cache_evictions_total', 'LLM cache entries removed by TTL or size cap')
+
+
+class LLMResponseCache:
+    """Content-addressed SQLite store of LLM responses.
+
+    Entries are keyed by a hash of the model, the generation options and the
+    prompt. They expire after ``ttl_seconds`` and the least recently used
+    ones are evicted once the stored responses exceed ``max_bytes``.
+    """
+
+    def __init__(self, db_path: Path = LLM_CACHE_FILE,
+                 ttl_seconds: int = LLM_CACHE_CONFIG['ttl_seconds'],
+                 max_bytes: int = LLM_CACHE_CONFIG['max_bytes'],
+                 enabled: bool = LLM_CACHE_CONFIG['enabled']):
+        self.db_path = Path(db_path)
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._initialized = False
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _ready(self) -> bool:
+        """Create the database on first use; disable the cache if it cannot be opened"""
+        if not self.enabled:
+            return False
+        if self._initialized:
+            return True
+        with self._lock:
+            if not self._initialized and self.enabled:
+                try:
+                    self._init_db()
+                    self._initialized = True
+                except sqlite3.Error as e:
+                    logger.warning(f"LLM response cache disabled - cannot open {self.db_path}: {str(e)}")
+                    self.enabled = False
+        return self.enabled
+
+    def _init_db(self):
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    model TEXT NOT NULL,
+                    response TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses (last_used)")
+
+    @staticmethod
+    def key(model: str, options: Dict[str, Any], prompt: str) -> str:
+        content = json.dumps([model, options, prompt], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Cached response for key, or None when missing or expired"""
+        if not self._ready():
+            return None
+        now = time.time()
+        try:
+            with self._lock, self._connect() as conn:
+                row = conn.execute(
+                    "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and now - row[1] > self.ttl_seconds:
+                    conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    LLM_CACHE_EVICTIONS.inc()
+                    row = None
+                if row is None:
+                    LLM_CACHE_MISSES.inc()
+                    return None
+                conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+        except sqlite3.Error as e:
+            logger.warning(f"LLM cache read failed: {str(e)}")
+            return None
+
+        LLM_CACHE_HITS.inc()
+        return row[0]
+
+    def put(self, key: str, model: str, response: str):
+        """Store a response and enforce the size cap"""
+        if not self._ready():
+            return
+        now = time.time()
+        size = len(response.encode('utf-8'))
+        try:
+            with self._lock, self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, model, response, size, created_at, last_used) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, model, response, size, now, now)
+                )
+                self._evict(conn, now)
+        except sqlite3.Error as e:
+            logger.warning(f"LLM cache write failed: {str(e)}")
+
+    def _evict(self, conn: sqlite3.Connection, now: float):
+        expired = conn.execute(
+            "DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,)
+        ).rowcount
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        evicted = []
+        if total > self.max_bytes:
+            for key, size in conn.execute("SELECT key, size FROM responses ORDER BY last_used"):
+                if total <= self.max_bytes:
+                    break
+                evicted.append((key,))
+                total -= size
+            conn.executemany("DELETE FROM responses WHERE key = ?", evicted)
+        if expired or evicted:
+            LLM_CACHE_EVICTIONS.inc(expired + len(evicted))
+
+    def clear(self):
+        if not self._ready():
+            return
+        try:
+            with self._lock, self._connect() as conn:
+                conn.execute("DELETE FROM responses")
+        except sqlite3.Error as e:
+            logger.warning(f"LLM cache clear failed: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        if not self._ready():
+            return {'enabled': False}
+        try:
+            with self._lock, self._connect() as conn:
+                entries, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"LLM cache stats failed: {str(e)}")
+            return {'enabled': True, 'error': str(e)}
+        return {'enabled': True, 'entries': entries, 'bytes': total, 'max_bytes': self.max_bytes}
+
+
+llm_response_cache = LLMResponseCache()
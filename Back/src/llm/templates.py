@@ -0,0 +1,162 @@
+import logging
+import string
+import threading
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, NamedTuple, Optional, Tuple
+
+from ..config import PROMPT_TEMPLATE_DIR
+
+logger = logging.getLogger(__name__)
+
+_FORMATTER = string.Formatter()
+
+# Variables LLMPromptBuilder passes to the loan type templates and to the contextual one
+BASIC_PROMPT_FIELDS = frozenset({
+    'customer_name', 'customer_age', 'customer_gender', 'marital_status', 'loan_amount', 'currency',
+    'personal_contribution', 'monthly_payment', 'assets_total', 'apr', 'interest_rate', 'term_months',
+    'total_score', 'risk_table', 'udf_data'
+})
+CONTEXTUAL_PROMPT_FIELDS = frozenset({
+    'base_prompt', 'historical_context', 'loan_type', 'loan_type_upper', 'loan_type_instruction'
+})
+
+
+class PromptTemplate:
+    """A str.format style template parsed once into literal and field parts.
+
+    ``prefix`` is the literal text before the first field: the part of every
+    rendered prompt that is identical across loans, which Ollama can serve
+    from its KV cache when consecutive prompts start with it.
+    """
+    __slots__ = ('name', 'source', 'fields', 'prefix', '_parts')
+
+    def __init__(self, name: str, source: str):
+        self.name = name
+        self.source = source
+        self._parts: List[Tuple[str, Optional[str], Optional[str], str]] = [
+            (literal, field, conversion, spec or '')
+            for literal, field, conversion, spec in _FORMATTER.parse(source)
+        ]
+        self.fields = frozenset(field for _, field, _, _ in self._parts if field)
+        self.prefix = ''
+        for literal, field, _, _ in self._parts:
+            self.prefix += literal
+            if field is not None:
+                break
+
+    def validate(self, allowed: frozenset):
+        """Raise ValueError for placeholders the prompt builder does not provide"""
+        unknown = self.fields - allowed
+        if unknown:
+            raise ValueError(f"Prompt template '{self.name}' uses unknown placeholders: {sorted(unknown)}")
+        for _, field, conversion, _ in self._parts:
+            if field is not None and conversion and conversion not in ('s', 'r', 'a'):
+                raise ValueError(f"Prompt template '{self.name}' has an invalid conversion '!{conversion}'")
+
+    def render(self, **values: Any) -> str:
+        """Same output as ``source.format(**values)`` without re-parsing the source"""
+        out = []
+        for literal, field, conversion, spec in self._parts:
+            out.append(literal)
+            if field is None:
+                continue
+            value = values[field]
+            if conversion:
+                value = _FORMATTER.convert_field(value, conversion)
+            out.append(format(value, spec))
+        return ''.join(out)
+
+
+class TemplateSnapshot(NamedTuple):
+    """Immutable set of compiled templates and the file mtimes they came from"""
+    templates: Mapping[str, PromptTemplate]
+    mtimes: Tuple[Tuple[str, float], ...]
+
+
+class PromptTemplateStore:
+    """Process-wide registry of the prompt templates in ``template_dir``.
+
+    Every ``*.txt`` file is one template named after its stem. Templates are
+    compiled once per file version; ``current()`` only stats the files and
+    swaps in a new snapshot when one was added, removed or edited, so
+    wording can be changed without a restart. Each template is checked
+    against the variables it will be rendered with (``field_sets`` by name,
+    ``BASIC_PROMPT_FIELDS`` otherwise); an edit that does not parse or
+    validate is logged and the previous snapshot stays in use. The default
+    template and every template with its own field set are required, since
+    a fallback would be rendered with the wrong variables.
+    """
+
+    def __init__(self, template_dir: Path = PROMPT_TEMPLATE_DIR, default: str = 'standard',
+                 field_sets: Optional[Mapping[str, frozenset]] = None):
+        self.template_dir = Path(template_dir)
+        self.default = default
+        self.field_sets = {'contextual': CONTEXTUAL_PROMPT_FIELDS} if field_sets is None else field_sets
+        self._snapshot: Optional[TemplateSnapshot] = None
+        self._rejected_mtimes: Optional[Tuple[Tuple[str, float], ...]] = None
+        self._lock = threading.Lock()
+
+    def _mtimes(self) -> Tuple[Tuple[str, float], ...]:
+        return tuple(sorted((path.stem, path.stat().st_mtime) for path in self.template_dir.glob('*.txt')))
+
+    def current(self) -> TemplateSnapshot:
+        """Return the current snapshot, reloading if a template changed on disk"""
+        snapshot = self._snapshot
+        try:
+            mtimes = self._mtimes()
+        except OSError as e:
+            if snapshot is None:
+                raise
+            logger.warning(f"Prompt templates unavailable, keeping the loaded ones: {str(e)}")
+            return snapshot
+
+        if snapshot is None or (mtimes != snapshot.mtimes and mtimes != self._rejected_mtimes):
+            return self.reload()
+        return snapshot
+
+    def reload(self) -> TemplateSnapshot:
+        """Compile every template file and atomically swap in a new snapshot"""
+        with self._lock:
+            mtimes = self._mtimes()
+            if self._snapshot is not None and self._snapshot.mtimes == mtimes:
+                return self._snapshot
+
+            try:
+                templates = self._compile()
+            except (OSError, ValueError) as e:
+                if self._snapshot is None:
+                    raise
+                # Remember the broken file versions so they are not re-read on every request
+                self._rejected_mtimes = mtimes
+                logger.error(f"Prompt templates rejected, keeping the loaded ones: {str(e)}")
+                return self._snapshot
+
+            self._rejected_mtimes = None
+            self._snapshot = TemplateSnapshot(templates=MappingProxyType(templates), mtimes=mtimes)
+            logger.info(f"Loaded {len(templates)} prompt templates from {self.template_dir}")
+            return self._snapshot
+
+    def _compile(self) -> Dict[str, PromptTemplate]:
+        templates = {}
+        for path in sorted(self.template_dir.glob('*.txt')):
+            try:
+                template = PromptTemplate(path.stem, path.read_text(encoding='utf-8'))
+            except ValueError as e:
+                raise ValueError(f"Prompt template '{path.stem}' does not parse: {str(e)}") from e
+            template.validate(self.field_sets.get(path.stem, BASIC_PROMPT_FIELDS))
+            templates[path.stem] = template
+        for name in (self.default, *self.field_sets):
+            if name not in templates:
+                raise FileNotFoundError(f"Missing required prompt template '{name}' in {self.template_dir}")
+        return templates
+
+    def get(self, name: str) -> PromptTemplate:
+        """Template by name; loan types without their own template use the default one"""
+        templates = self.current().templates
+        if name in self.field_sets:
+            return templates[name]
+        return templates.get(name) or templates[self.default]
+
+
+prompt_templates = PromptTemplateStore()
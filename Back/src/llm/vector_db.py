@@ -1,8 +1,10 @@
 import chromadb
 import json
 import logging
-from typing import List, Dict, Optional
+import threading
+from typing import Callable, List, Dict, Optional
 from chromadb.utils import embedding_functions
+from ..risk_engine.results import json_default
 
 logger = logging.getLogger(__name__)
 
@@ -35,7 +37,7 @@ class LoanVectorDB:
             self.collection.upsert(
                 ids=[f"loan_{loan_id}"],
                 embeddings=[embedding],
-                documents=[json.dumps(loan_data)],
+                documents=[json.dumps(loan_data, default=json_default)],
                 metadatas=[{
                     'loan_id': loan_id,
                     'has_feedback': False,
@@ -96,9 +98,57 @@ class LoanVectorDB:
                 'similarities': []
             }
 
+    def stale_embedding_ids(self, version: int) -> List[str]:
+        """Ids of stored loans whose vector was built from another embedding view version"""
+        try:
+            results = self.collection.get(include=['metadatas'])
+            return [
+                loan_id for loan_id, meta in zip(results['ids'], results['metadatas'])
+                if (meta or {}).get('embedding_view_version') != version
+            ]
+        except Exception as e:
+            logger.error(f"Failed to list stale embeddings: {str(e)}")
+            return []
+
+    def reembed_stale(self, embed: Callable[[Dict], List[float]], version: int, batch_size: int = 50) -> int:
+        """Rebuild the vectors of loans stored under another embedding view version.
+
+        Documents hold the full assessment, so each one is embedded again with
+        ``embed`` and stamped with ``version``. Returns the number of loans
+        migrated; a failed batch is logged and left for the next run.
+        """
+        stale = self.stale_embedding_ids(version)
+        migrated = 0
+        for start in range(0, len(stale), batch_size):
+            ids = stale[start:start + batch_size]
+            try:
+                batch = self.collection.get(ids=ids, include=['documents', 'metadatas'])
+                embeddings = [embed(json.loads(document)) for document in batch['documents']]
+                metadatas = [{**(meta or {}), 'embedding_view_version': version} for meta in batch['metadatas']]
+                self.collection.update(ids=batch['ids'], embeddings=embeddings, metadatas=metadatas)
+                migrated += len(batch['ids'])
+            except Exception as e:
+                logger.error(f"Failed to re-embed {len(ids)} stored loans: {str(e)}")
+        if stale:
+            logger.info(f"Re-embedded {migrated}/{len(stale)} stored loans for embedding view v{version}")
+        return migrated
+
     def get_loan_count(self) -> int:
         try:
             return self.collection.count()
         except Exception as e:
             logger.error(f"Failed to get loan count: {str(e)}")
-            return 0
\ No newline at end of file
+            return 0
+
+
+_shared_vector_db: Optional[LoanVectorDB] = None
+_shared_vector_db_lock = threading.Lock()
+
+
+def shared_vector_db() -> LoanVectorDB:
+    """Process-wide vector DB for background work that outlives a request"""
+    global _shared_vector_db
+    with _shared_vector_db_lock:
+        if _shared_vector_db is None:
+            _shared_vector_db = LoanVectorDB()
+        return _shared_vector_db
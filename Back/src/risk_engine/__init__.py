@@ -5,4 +5,8 @@ from .scoring import RiskScorer
 class RiskEngine(RiskEngine, RiskScorer):
     """Combined risk engine with scoring capabilities"""
 
-__all__ = ['RiskEngine', 'BusinessRulesEngine']
\ No newline at end of file
+from .rule_store import RuleStore, RuleSnapshot, rule_store
+from .incremental import IncrementalRiskEvaluator, incremental_evaluator
+
+__all__ = ['RiskEngine', 'BusinessRulesEngine', 'RuleStore', 'RuleSnapshot', 'rule_store',
+           'IncrementalRiskEvaluator', 'incremental_evaluator']
\ No newline at end of file
@@ -1,16 +1,42 @@
 from datetime import datetime
-from typing import Dict, Any, Tuple, List, Union, Optional
+from functools import lru_cache
+import hashlib
+import json
+import numpy as np
+import pandas as pd
+from typing import Callable, Dict, Any, Tuple, List, NamedTuple, Union, Optional, Set
 from ..data_models import RiskIndicator, CustomerInfo, LoanFinancials, LoanBasicInfo, UDFGroup, UDFField
-from ..config import RISK_THRESHOLDS
+from ..config import RISK_THRESHOLDS, NORMALIZATION_CACHE_SIZE
+from .matching import RuleMatcher, compile_rule_matchers
+from .results import IndicatorTable, RiskAssessment, LoanAssessment, UDFGroupView
 import logging
 
 logger = logging.getLogger(__name__)
 
+def rules_version(rules: Dict[str, Dict[str, float]]) -> str:
+    """Short content hash identifying a rule set (item order included)"""
+    content = json.dumps(
+        [(category, list(items.items())) for category, items in rules.items()],
+        ensure_ascii=False
+    )
+    return hashlib.sha1(content.encode('utf-8')).hexdigest()[:12]
+
+class _ScoredBatch(NamedTuple):
+    """Per-field and per-category score columns of one evaluate_many batch"""
+    customers: List[Dict[str, Any]]
+    field_results: Dict[str, Tuple[np.ndarray, np.ndarray, np.ndarray]]
+    udf_indicators: List[List[Tuple]]
+    total_risk: np.ndarray
+    category_scores: Dict[str, np.ndarray]
+
 class RiskEngine:
     def __init__(self, rules: Dict[str, Dict[str, float]]):
         """Initialize the risk engine with scoring rules"""
         self.rules = rules
+        self.rules_version = rules_version(rules)
+        self.rule_matchers = compile_rule_matchers(rules)
         self.valid_customer_types = ['SA', 'SUARL', 'SARL', 'ONG', 'Société Personne Physique']
+        self._valid_customer_types_upper = frozenset(ct.upper() for ct in self.valid_customer_types)
         
         # Field mappings for standard fields
         self.field_mappings = {
@@ -37,6 +63,10 @@ class RiskEngine:
         
         self._build_normalization_maps()
         self._build_udf_normalization_maps()
+        
+        # Raw values repeat heavily across customers; memoize their normalization
+        self._normalized_values = lru_cache(maxsize=NORMALIZATION_CACHE_SIZE, typed=True)(self._compute_normalized_value)
+        self._normalized_udf_values = lru_cache(maxsize=NORMALIZATION_CACHE_SIZE, typed=True)(self._compute_normalized_udf_value)
 
     def _build_normalization_maps(self):
         """Initialize normalization maps for standard fields"""
@@ -46,6 +76,10 @@ class RiskEngine:
             'marié': ['marié', 'married', 'm', 'M'],
             'veuf': ['veuf', 'widow', 'widowed', 'v', 'V']
         }
+        self._marital_status_lookup = {}
+        for norm_status, variants in self.marital_status_map.items():
+            for variant in variants:
+                self._marital_status_lookup.setdefault(variant, norm_status)
         
         self.risk_levels = {
             'non risqué': (0, 0),
@@ -70,194 +104,405 @@ class RiskEngine:
                 'Logé gratuitement': ['logé gratuitement', 'free housing']
             }
         }
+        
+        # One compiled matcher per field over all variants, in map order
+        self._udf_variant_matchers = {
+            field_name: (
+                RuleMatcher(variant for variants in value_map.values() for variant in variants),
+                tuple(normalized for normalized, variants in value_map.items() for _ in variants)
+            )
+            for field_name, value_map in self.udf_value_maps.items()
+        }
 
     def _normalize_value(self, field: str, value: str) -> Tuple[str, bool]:
         """Normalize field values for consistent matching"""
+        try:
+            return self._normalized_values(field, value)
+        except TypeError:  # unhashable raw value
+            return self._compute_normalized_value(field, value)
+
+    def _compute_normalized_value(self, field: str, value: str) -> Tuple[str, bool]:
         if not value:
             return (value, False)
         
         value = str(value).strip().lower()
         
         if field == 'maritalStatus':
-            for norm_status, variants in self.marital_status_map.items():
-                if value in variants:
-                    return (norm_status, True)
-            return (value, False)
+            norm_status = self._marital_status_lookup.get(value)
+            return (norm_status, True) if norm_status is not None else (value, False)
         
         elif field == 'customerType':
-            is_valid = value.upper() in [ct.upper() for ct in self.valid_customer_types]
+            is_valid = value.upper() in self._valid_customer_types_upper
             return (value if is_valid else "Autres", is_valid)
         
         return (value, False)
 
     def _normalize_udf_value(self, field_name: str, value: str) -> str:
         """Normalize UDF field values for consistent matching"""
+        try:
+            return self._normalized_udf_values(field_name, value)
+        except TypeError:  # unhashable raw value
+            return self._compute_normalized_udf_value(field_name, value)
+
+    def _compute_normalized_udf_value(self, field_name: str, value: str) -> str:
         if not value:
             return value
         
         value = str(value).strip().lower()
         
-        if field_name in self.udf_value_maps:
-            for normalized, variants in self.udf_value_maps[field_name].items():
-                if any(variant.lower() in value for variant in variants):
-                    return normalized
+        if field_name in self._udf_variant_matchers:
+            matcher, normalized_values = self._udf_variant_matchers[field_name]
+            position = matcher.match_index(value)
+            if position is not None:
+                return normalized_values[position]
                 
         return value
 
-    def evaluate(self, loan_data: Dict[str, Any]) -> Dict[str, Any]:
+    def evaluate(self, loan_data: Dict[str, Any]) -> LoanAssessment:
         """Evaluate loan risk with both standard and UDF fields"""
+        return self._evaluate(
+            loan_data, self._standard_indicator_row, self._udf_indicator_rows, self._aml_indicator_rows
+        )
+
+    def _evaluate(self, loan_data: Dict[str, Any],
+                  standard_row: Callable[[str, Any], Tuple],
+                  udf_rows: Callable[[List[UDFField]], Tuple[List[Tuple], bool]],
+                  aml_rows: Callable[[List[Dict[str, Any]]], List[Tuple]]) -> LoanAssessment:
+        """Body of evaluate with the scorers of standard fields, UDF groups and AML checks passed in"""
         try:
             customer_data = loan_data.get('customerDTO', {})
             consolidated_info = self._consolidate_customer_info(customer_data)
             consolidated_info['udf_data'] = loan_data.get('udf_data', [])
             
-            # Evaluate standard fields
-            evaluation_fields = {
-                'customerType': consolidated_info['type'],
-                'loanPurpose': loan_data.get('loanReasonCode'),
-                'gender': consolidated_info['demographics']['gender'],
-                'maritalStatus': consolidated_info['demographics']['marital_status'],
-                'region': self._extract_region(
-                    branch_desc=loan_data.get('branchDescription', ''),
-                    customer_address=consolidated_info.get('address', '')
-                ),
-                'product': loan_data.get('productCode'),
-                'industryCode': loan_data.get('industryCode')
-            }
-            
-            indicators = {}
+            indicators = IndicatorTable()
             total_risk = 0.0
             
             # Evaluate standard fields
-            for field, value in evaluation_fields.items():
-                normalized_value, is_valid = self._normalize_value(field, value)
-                rule_category = self.field_mappings.get(field, field)
-                
-                if field == 'customerType':
-                    if not is_valid:
-                        total_risk += 5.0
-                        indicators[field] = self._create_indicator(value, "Autres (Not in valid list)", 5.0)
-                    else:
-                        indicators[field] = self._create_indicator(value, value, 0.0)
-                    continue
-                
-                if rule_category not in self.rules:
-                    indicators[field] = self._create_indicator(value, "No rule category", 0.0)
-                    continue
-                
-                matched_rule, score = self._find_matching_rule(rule_category, normalized_value)
-                total_risk += score
-                indicators[field] = self._create_indicator(value, matched_rule, score)
+            for field, value in self._evaluation_fields(loan_data, consolidated_info).items():
+                row = standard_row(field, value)
+                total_risk += row[3]
+                indicators.add(*row)
             
-            # Evaluate UDF fields and separate scoring vs non-scoring fields
-            scoring_udfs = []
-            non_scoring_udfs = []
-            
-            for group in consolidated_info['udf_data']:
-                new_group = {
-                    'userDefinedFieldGroupName': group['userDefinedFieldGroupName'],
-                    'udfGroupeFieldsModels': []
-                }
-                
-                for field in group.get('udfGroupeFieldsModels', []):
-                    field_name = field.get('fieldName')
-                    field_value = field.get('value')
-                    
-                    if field_name in self.udf_field_mappings:
-                        rule_category = self.udf_field_mappings[field_name]
-                        normalized_value = self._normalize_udf_value(field_name, field_value)
-                        
-                        if rule_category in self.rules:
-                            matched_rule, score = self._find_matching_rule(rule_category, normalized_value)
-                            if matched_rule != "No matching rule":
-                                key = f"udf_{field_name.replace(' ', '_').lower()}"
-                                indicators[key] = self._create_indicator(
-                                    field_value,
-                                    matched_rule,
-                                    score
-                                )
-                                total_risk += score
-                                # Add to scoring UDFs
-                                new_group['udfGroupeFieldsModels'].append(field)
-                                continue
-                    
-                    # Add to non-scoring UDFs
-                    new_group['udfGroupeFieldsModels'].append(field)
-                
-                if new_group['udfGroupeFieldsModels']:
-                    if any(field.get('fieldName') in self.udf_field_mappings for field in new_group['udfGroupeFieldsModels']):
-                        scoring_udfs.append(new_group)
-                    else:
-                        non_scoring_udfs.append(new_group)
+            # Evaluate UDF fields and separate scoring vs non-scoring groups
+            total_risk, scoring_udfs, non_scoring_udfs = self._partition_udf_groups(
+                consolidated_info['udf_data'], indicators, total_risk, udf_rows
+            )
             
             # Evaluate AML checks
-            for aml_check in consolidated_info['aml_checks']:
-                key = f"aml_{aml_check.get('listName', '').lower()}"
-                aml_score = float(aml_check.get('score', 0))
-                indicators[key] = self._create_aml_indicator(aml_check)
+            for row in aml_rows(consolidated_info['aml_checks']):
+                indicators.add(*row)
             
-            return {
-                'customer_info': {
-                    **consolidated_info,
-                    'udf_data': non_scoring_udfs,  # Only non-scoring UDFs go here
-                    'scoring_udf_data': scoring_udfs  # Scoring UDFs kept separate
-                },
-                'loan_info': self._extract_loan_info(loan_data),
-                'risk_assessment': {
-                    'indicators': indicators,
-                    'total_score': total_risk,
-                    'risk_level': self._determine_overall_risk(total_risk)
-                }
-            }
+            return self._build_assessment(
+                loan_data, consolidated_info, indicators, total_risk, scoring_udfs, non_scoring_udfs
+            )
         except Exception as e:
             logger.error(f"Risk evaluation failed: {str(e)}")
             raise
 
-    def _create_indicator(self, value: Any, rule: str, score: float) -> RiskIndicator:
-        """Create a standardized risk indicator"""
-        return {
-            'value': value,
-            'matched_rule': rule,
-            'score': score,
-            'risk_level': self._get_risk_level(score)
+    def _build_assessment(self, loan_data: Dict[str, Any], consolidated_info: Dict[str, Any],
+                          indicators: IndicatorTable, total_risk: float,
+                          scoring_udfs: List[UDFGroupView], non_scoring_udfs: List[UDFGroupView]) -> LoanAssessment:
+        """Assemble the assessment returned by evaluate"""
+        return LoanAssessment(
+            customer_info={
+                **consolidated_info,
+                'udf_data': non_scoring_udfs,  # Only non-scoring UDFs go here
+                'scoring_udf_data': scoring_udfs  # Scoring UDFs kept separate
+            },
+            loan_info=self._extract_loan_info(loan_data),
+            risk_assessment=RiskAssessment(
+                indicators,
+                total_risk,
+                self._determine_overall_risk(total_risk)
+            ),
+            rules_version=self.rules_version
+        )
+
+    def _standard_indicator_row(self, field: str, value: Any) -> Tuple[str, Any, str, float, str]:
+        """Score one standard field into an indicator row"""
+        normalized_value, is_valid = self._normalize_value(field, value)
+        if field == 'customerType':
+            if not is_valid:
+                return self._indicator_row(field, value, "Autres (Not in valid list)", 5.0)
+            return self._indicator_row(field, value, value, 0.0)
+
+        rule_category = self.field_mappings.get(field, field)
+        if rule_category not in self.rules:
+            return self._indicator_row(field, value, "No rule category", 0.0)
+
+        matched_rule, score = self._find_matching_rule(rule_category, normalized_value)
+        return self._indicator_row(field, value, matched_rule, score)
+
+    def _udf_indicator_rows(self, fields: List[UDFField]) -> Tuple[List[Tuple[str, Any, str, float, str]], bool]:
+        """Score the mapped fields of one UDF group.
+
+        Returns the indicator rows of fields that matched a rule and whether
+        the group contains any mapped UDF field at all.
+        """
+        rows = []
+        is_scoring = False
+        for field in fields:
+            field_name = field.get('fieldName')
+            rule_category = self.udf_field_mappings.get(field_name)
+            if rule_category is None:
+                continue
+            is_scoring = True
+            if rule_category not in self.rules:
+                continue
+
+            field_value = field.get('value')
+            normalized_value = self._normalize_udf_value(field_name, field_value)
+            matched_rule, score = self._find_matching_rule(rule_category, normalized_value)
+            if matched_rule != "No matching rule":
+                key = f"udf_{field_name.replace(' ', '_').lower()}"
+                rows.append(self._indicator_row(key, field_value, matched_rule, score))
+        return rows, is_scoring
+
+    def _aml_indicator_rows(self, aml_checks: List[Dict[str, Any]]) -> List[Tuple[str, Any, str, float, str]]:
+        """AML indicators are reported but do not add to the total score"""
+        return [
+            self._aml_indicator_row(f"aml_{aml_check.get('listName', '').lower()}", aml_check)
+            for aml_check in aml_checks
+        ]
+
+    def _partition_udf_groups(self, udf_data: List[UDFGroup],
+                              indicators: IndicatorTable,
+                              total_risk: float = 0.0,
+                              udf_rows: Optional[Callable[[List[UDFField]], Tuple[List[Tuple], bool]]] = None
+                              ) -> Tuple[float, List[UDFGroupView], List[UDFGroupView]]:
+        """Score mapped UDF fields and split groups into scoring and non-scoring in one pass.
+
+        A group counts as scoring when any of its fields is a mapped UDF field.
+        Scores are added to ``total_risk`` one by one (the same order as
+        ``evaluate_many``) and groups are returned as views over the payload's
+        own field lists. ``udf_rows`` scores one group's fields and defaults
+        to ``_udf_indicator_rows``.
+        """
+        udf_rows = udf_rows or self._udf_indicator_rows
+        scoring_udfs = []
+        non_scoring_udfs = []
+        for group in udf_data:
+            fields = group.get('udfGroupeFieldsModels') or []
+            rows, is_scoring = udf_rows(fields)
+            for row in rows:
+                total_risk += row[3]
+                indicators.add(*row)
+
+            if fields:
+                view = UDFGroupView(group['userDefinedFieldGroupName'], fields)
+                (scoring_udfs if is_scoring else non_scoring_udfs).append(view)
+        return total_risk, scoring_udfs, non_scoring_udfs
+
+    def evaluate_many(self, loans: List[Dict[str, Any]],
+                      categories: Optional[Set[str]] = None) -> List[RiskAssessment]:
+        """Evaluate a batch of loans column-wise.
+
+        Each result matches ``evaluate(loan)['risk_assessment']``. Field values
+        are gathered into columns, every distinct value is matched against the
+        rules once, and scores are spread back to the loans with array lookups.
+        When ``categories`` is given only fields scored from those rule
+        categories are evaluated, which gives their partial contribution.
+        """
+        if not loans:
+            return []
+
+        batch = self._score_columns(loans, categories)
+        risk_levels = {}
+        results = []
+        for row, customer in enumerate(batch.customers):
+            indicators = IndicatorTable()
+            for field, (raw_values, rules, scores) in batch.field_results.items():
+                score = float(scores[row])
+                if score not in risk_levels:
+                    risk_levels[score] = self._get_risk_level(score)
+                indicators.add(field, raw_values[row], rules[row], score, risk_levels[score])
+            for key, value, rule, score in batch.udf_indicators[row]:
+                indicators.add(*self._indicator_row(key, value, rule, score))
+            for indicator in self._aml_indicator_rows(customer['aml_checks']) if categories is None else []:
+                indicators.add(*indicator)
+
+            total_score = float(batch.total_risk[row])
+            results.append(RiskAssessment(indicators, total_score, self._determine_overall_risk(total_score)))
+        return results
+
+    def category_scores_many(self, loans: List[Dict[str, Any]],
+                             categories: Optional[Set[str]] = None) -> List[Dict[str, float]]:
+        """Score contributed by each rule category, for every loan of a batch.
+
+        The values of one loan add up to its ``total_score``. The customer
+        type check is not driven by a rule category and is reported under
+        ``customerType``. When ``categories`` is given only those categories
+        are scored, without matching any other field.
+        """
+        if not loans:
+            return []
+
+        batch = self._score_columns(loans, categories)
+        return [
+            {category: float(scores[row]) for category, scores in batch.category_scores.items()}
+            for row in range(len(loans))
+        ]
+
+    def _score_columns(self, loans: List[Dict[str, Any]],
+                       categories: Optional[Set[str]] = None) -> _ScoredBatch:
+        """Column-wise scoring shared by evaluate_many and category_scores_many"""
+        customers = [self._consolidate_customer_info(loan.get('customerDTO', {})) for loan in loans]
+        records = [self._evaluation_fields(loan, info) for loan, info in zip(loans, customers)]
+        columns = pd.DataFrame({
+            field: pd.Series([record[field] for record in records], dtype=object)
+            for field in records[0]
+        })
+
+        total_risk = np.zeros(len(loans))
+        field_results = {}
+        category_scores = {}
+        for field in columns.columns:
+            raw_values = columns[field]
+            rule_category = self.field_mappings.get(field, field)
+            if categories is not None and (field == 'customerType' or rule_category not in categories):
+                continue
+            keys = raw_values.astype(str).str.strip().str.lower()
+
+            if field == 'customerType':
+                invalid = ~keys.str.upper().isin(self._valid_customer_types_upper).to_numpy()
+                scores = np.where(invalid, 5.0, 0.0)
+                rules = np.where(invalid, "Autres (Not in valid list)", raw_values.to_numpy())
+            elif rule_category not in self.rules:
+                scores = np.zeros(len(loans))
+                rules = np.full(len(loans), "No rule category", dtype=object)
+            else:
+                if field == 'maritalStatus':
+                    keys = keys.map(self._marital_status_lookup).fillna(keys)
+                codes, uniques = pd.factorize(keys)
+                matches = [self._find_matching_rule(rule_category, key) for key in uniques]
+                rules = np.array([rule for rule, _ in matches], dtype=object)[codes]
+                scores = np.array([score for _, score in matches], dtype=float)[codes]
+
+            total_risk += scores
+            field_results[field] = (raw_values.to_numpy(), rules, scores)
+            category = field if field == 'customerType' else rule_category
+            category_scores[category] = category_scores.get(category, 0.0) + scores
+
+        udf_indicators, udf_scores, udf_category_scores = self._evaluate_udf_columns(loans, categories)
+        for position in range(udf_scores.shape[1]):
+            total_risk += udf_scores[:, position]
+        for category, scores in udf_category_scores.items():
+            category_scores[category] = category_scores.get(category, 0.0) + scores
+
+        return _ScoredBatch(customers, field_results, udf_indicators, total_risk, category_scores)
+
+    def _evaluate_udf_columns(self, loans: List[Dict[str, Any]],
+                              categories: Optional[Set[str]] = None
+                              ) -> Tuple[List[List[Tuple]], np.ndarray, Dict[str, np.ndarray]]:
+        """Score mapped UDF fields of a batch, one rule lookup per distinct (field, value)"""
+        scored_fields = {
+            field_name for field_name, category in self.udf_field_mappings.items()
+            if category in self.rules and (categories is None or category in categories)
         }
+        rows, names, values = [], [], []
+        for row, loan in enumerate(loans):
+            for group in loan.get('udf_data', []):
+                for field in group.get('udfGroupeFieldsModels', []):
+                    field_name = field.get('fieldName')
+                    if field_name in scored_fields:
+                        rows.append(row)
+                        names.append(field_name)
+                        values.append(field.get('value'))
 
-    def _create_aml_indicator(self, aml_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Create AML risk indicator"""
-        score = float(aml_data.get('score', 0))
+        udf_indicators = [[] for _ in loans]
+        if not rows:
+            return udf_indicators, np.zeros((len(loans), 0)), {}
+
+        frame = pd.DataFrame({
+            'row': rows,
+            'name': names,
+            'value': pd.Series(values, dtype=object)
+        })
+        codes, uniques = pd.factorize(frame['name'] + '\x1f' + frame['value'].astype(str))
+        first_seen = pd.Series(np.arange(len(frame))).groupby(codes).first().to_numpy()
+        matches = [
+            self._find_matching_rule(
+                self.udf_field_mappings[names[index]],
+                self._normalize_udf_value(names[index], values[index])
+            )
+            for index in first_seen
+        ]
+        rules = np.array([rule for rule, _ in matches], dtype=object)[codes]
+        scores = np.array([score for _, score in matches], dtype=float)[codes]
+
+        matched = rules != "No matching rule"
+        frame = frame[matched]
+        positions = frame.groupby('row').cumcount().to_numpy()
+        udf_scores = np.zeros((len(loans), int(positions.max()) + 1 if len(positions) else 0))
+        udf_scores[frame['row'].to_numpy(), positions] = scores[matched]
+
+        category_scores = {}
+        matched_rows = frame['row'].to_numpy()
+        matched_categories = frame['name'].map(self.udf_field_mappings).to_numpy()
+        for category in set(matched_categories):
+            in_category = matched_categories == category
+            category_scores[category] = np.bincount(
+                matched_rows[in_category], weights=scores[matched][in_category], minlength=len(loans)
+            )
+
+        for row, name, value, rule, score in zip(frame['row'], frame['name'], frame['value'], rules[matched], scores[matched]):
+            key = f"udf_{name.replace(' ', '_').lower()}"
+            udf_indicators[row].append((key, value, rule, float(score)))
+        return udf_indicators, udf_scores, category_scores
+
+    def _evaluation_fields(self, loan_data: Dict[str, Any], consolidated_info: Dict[str, Any]) -> Dict[str, Any]:
+        """Collect the raw values of the standard scored fields"""
         return {
-            'value': aml_data.get('amlStatus', 'N/A'),
-            'matched_rule': aml_data.get('listName', 'N/A'),
-            'score': score,
-            'risk_level': self._get_aml_risk_level(score)
+            'customerType': consolidated_info['type'],
+            'loanPurpose': loan_data.get('loanReasonCode'),
+            'gender': consolidated_info['demographics']['gender'],
+            'maritalStatus': consolidated_info['demographics']['marital_status'],
+            'region': self._extract_region(
+                branch_desc=loan_data.get('branchDescription', ''),
+                customer_address=consolidated_info.get('address', '')
+            ),
+            'product': loan_data.get('productCode'),
+            'industryCode': loan_data.get('industryCode')
         }
 
+    def _indicator_row(self, key: str, value: Any, rule: str, score: float) -> Tuple[str, Any, str, float, str]:
+        """Create a standardized risk indicator row"""
+        return (key, value, rule, score, self._get_risk_level(score))
+
+    def _aml_indicator_row(self, key: str, aml_data: Dict[str, Any]) -> Tuple[str, Any, str, float, str]:
+        """Create an AML risk indicator row"""
+        score = float(aml_data.get('score', 0))
+        return (
+            key,
+            aml_data.get('amlStatus', 'N/A'),
+            aml_data.get('listName', 'N/A'),
+            score,
+            self._get_aml_risk_level(score)
+        )
+
     def _find_matching_rule(self, category: str, value: str) -> Tuple[str, float]:
         """Find the best matching rule for a given value"""
-        if category not in self.rules:
+        if category not in self.rule_matchers:
             return ("No matching category", 0.0)
         
-        str_value = str(value).lower()
-        for rule, score in self.rules[category].items():
-            if rule.lower() in str_value:
-                return (rule, float(score))
+        matcher, scores = self.rule_matchers[category]
+        position = matcher.match_index(str(value))
+        if position is not None:
+            return (matcher.items[position], scores[position])
         
         return ("No matching rule", 0.0)
 
     def _extract_region(self, branch_desc: str, customer_address: str) -> str:
         """Extract region from branch description or customer address"""
-        regions = self.rules.get('Région', {}).keys()
-        
-        # First try branch description
-        if branch_desc:
-            for region in regions:
-                if region.lower() in branch_desc.lower():
-                    return region
+        if 'Région' not in self.rule_matchers:
+            return "Unknown"
+        matcher = self.rule_matchers['Région'][0]
         
-        # Then try customer address
-        if customer_address:
-            for region in regions:
-                if region.lower() in customer_address.lower():
+        # First try branch description, then customer address
+        for text in (branch_desc, customer_address):
+            if text:
+                region = matcher.match(text)
+                if region is not None:
                     return region
         
         return "Unknown"
@@ -1,33 +1,155 @@
-from typing import Dict, Any, List
+import json
+import logging
+import operator
+from collections.abc import Mapping, Sequence
+from pathlib import Path
+from typing import Dict, Any, List, Callable, Iterable, NamedTuple, Optional
 from ..data_models import BusinessRuleResult
-from ..config import RULE_PRIORITIES
+from ..config import RULE_PRIORITIES, BUSINESS_RULES_FILE
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+def _numeric(compare: Callable[[float, float], bool]) -> Callable[[Any, Any], bool]:
+    def check(actual: Any, expected: Any) -> bool:
+        try:
+            return compare(float(actual), float(expected))
+        except (TypeError, ValueError):
+            return False
+    return check
+
+
+def _member(actual: Any, expected: Any) -> bool:
+    try:
+        return actual in expected
+    except TypeError:
+        return False
+
+
+OPERATORS: Dict[str, Callable[[Any, Any], bool]] = {
+    'eq': operator.eq,
+    'ne': operator.ne,
+    'gt': _numeric(operator.gt),
+    'gte': _numeric(operator.ge),
+    'lt': _numeric(operator.lt),
+    'lte': _numeric(operator.le),
+    'in': _member,
+    'not_in': lambda actual, expected: not _member(actual, expected),
+    'contains': lambda actual, expected: str(expected).lower() in str(actual).lower(),
+}
+
+
+class CompiledRule(NamedTuple):
+    name: str
+    priority: float
+    condition: Callable[[Any], bool]
+    impact: Dict[str, Any]
+    stop: bool
+
+
+def compile_accessor(path: str) -> Callable[[Any], Any]:
+    """Resolve a dotted field path once into a getter over nested mappings"""
+    keys = tuple(int(key) if key.isdigit() else key for key in path.split('.'))
+
+    def get(data: Any) -> Any:
+        node = data
+        for key in keys:
+            if isinstance(node, Mapping):
+                node = node.get(key, _MISSING)
+            elif isinstance(key, int) and isinstance(node, Sequence) and not isinstance(node, str):
+                node = node[key] if -len(node) <= key < len(node) else _MISSING
+            else:
+                return _MISSING
+            if node is _MISSING:
+                return _MISSING
+        return node
+    return get
+
+
+def compile_condition(spec: Dict[str, Any]) -> Callable[[Any], bool]:
+    """Compile a condition spec into a predicate; all/any short-circuit"""
+    if 'all' in spec:
+        parts = [compile_condition(part) for part in spec['all']]
+        return lambda data: all(part(data) for part in parts)
+    if 'any' in spec:
+        parts = [compile_condition(part) for part in spec['any']]
+        return lambda data: any(part(data) for part in parts)
+    if 'not' in spec:
+        inner = compile_condition(spec['not'])
+        return lambda data: not inner(data)
+
+    get = compile_accessor(spec['field'])
+    op = spec.get('op', 'exists')
+    if op == 'exists':
+        return lambda data: get(data) is not _MISSING
+    if op not in OPERATORS:
+        raise ValueError(f"Unknown business rule operator: {op}")
+
+    compare = OPERATORS[op]
+    expected = spec.get('value')
+    if op in ('in', 'not_in'):
+        expected = frozenset(expected) if all(isinstance(v, str) for v in expected) else tuple(expected)
+
+    def condition(data: Any) -> bool:
+        actual = get(data)
+        return actual is not _MISSING and compare(actual, expected)
+    return condition
+
 
 class BusinessRulesEngine:
-    def __init__(self):
-        self.rules = self._load_business_rules()
-
-    def _load_business_rules(self) -> Dict[str, Dict]:
-        return {
-            "region_risk": {
-                "condition": lambda data: data.get('region') in ["GABES", "TUNIS"],
-                "action": lambda data: {"score": 15, "message": "High risk region"},
-                "priority": RULE_PRIORITIES['region_risk']
-            },
-            "loan_amount_threshold": {
-                "condition": lambda data: float(data.get('loan_amount', 0)) > 10000,
-                "action": lambda data: {"score": 10, "message": "Large loan amount"},
-                "priority": RULE_PRIORITIES['loan_amount_threshold']
-            }
-        }
+    """Applies data-driven bank policy rules to assessments.
+
+    Rules are read from ``Data/business_rules.json``, their only source, as field-path /
+    operator / value conditions and compiled once into a plan that is
+    already sorted by priority. A rule with ``"stop": true`` ends the
+    evaluation for that assessment when it fires.
+    """
+
+    def __init__(self, rules_file: Path = BUSINESS_RULES_FILE,
+                 definitions: Optional[List[Dict[str, Any]]] = None):
+        self.definitions = definitions if definitions is not None else self._load_business_rules(rules_file)
+        self.plan = self._compile(self.definitions)
+
+    def _load_business_rules(self, rules_file: Path) -> List[Dict[str, Any]]:
+        try:
+            with open(rules_file, 'r', encoding='utf-8') as f:
+                return json.load(f)['rules']
+        except FileNotFoundError:
+            # The JSON file is the only source of policy rules; without it none are applied
+            logger.warning(f"No business rules file at {rules_file} - no business rules will be applied")
+            return []
+        except Exception as e:
+            logger.error(f"Error loading business rules: {str(e)}")
+            raise
+
+    @staticmethod
+    def _compile(definitions: Iterable[Dict[str, Any]]) -> List[CompiledRule]:
+        plan = [
+            CompiledRule(
+                name=definition['name'],
+                priority=definition.get('priority', RULE_PRIORITIES.get(definition['name'], float('inf'))),
+                condition=compile_condition(definition['when']),
+                impact=dict(definition.get('impact', {})),
+                stop=bool(definition.get('stop', False))
+            )
+            for definition in definitions
+        ]
+        plan.sort(key=lambda rule: rule.priority)
+        return plan
 
     def apply_rules(self, loan_data: Dict) -> List[BusinessRuleResult]:
         results = []
-        for rule_name, rule in sorted(self.rules.items(), 
-                                    key=lambda x: x[1]['priority']):
-            if rule['condition'](loan_data):
-                result = rule['action'](loan_data)
+        for rule in self.plan:
+            if rule.condition(loan_data):
                 results.append(BusinessRuleResult(
-                    rule=rule_name,
-                    impact=result
+                    rule=rule.name,
+                    impact=dict(rule.impact)
                 ))
-        return results
\ No newline at end of file
+                if rule.stop:
+                    break
+        return results
+
+    def apply_rules_many(self, assessments: Iterable[Dict]) -> List[List[BusinessRuleResult]]:
+        """Apply the compiled plan to a batch of assessments"""
+        return [self.apply_rules(assessment) for assessment in assessments]
@@ -0,0 +1,54 @@
+import re
+from typing import Dict, Iterable, Optional, Tuple
+
+
+class RuleMatcher:
+    """Compiled substring matcher for the items of one rule category.
+
+    All items are folded into a single lookahead alternation so a value is
+    scanned once in C instead of once per item. Alternatives are tried in rule
+    order at every position, so the lowest-index item found anywhere in the
+    value wins - the same first-match-wins result as looping over the items
+    and testing ``item.lower() in value.lower()``.
+    """
+
+    __slots__ = ('items', '_index', '_pattern')
+
+    def __init__(self, items: Iterable[str]):
+        self.items = tuple(items)
+        self._index: Dict[str, int] = {}
+        for position, item in enumerate(self.items):
+            self._index.setdefault(item.lower(), position)
+
+        if self._index:
+            alternation = '|'.join(re.escape(key) for key in self._index)
+            self._pattern = re.compile(f"(?=({alternation}))")
+        else:
+            self._pattern = None
+
+    def match_index(self, value: str) -> Optional[int]:
+        """Return the index of the first item contained in value, if any"""
+        if self._pattern is None:
+            return None
+
+        best = None
+        for match in self._pattern.finditer(value.lower()):
+            position = self._index[match.group(1)]
+            if best is None or position < best:
+                best = position
+                if best == 0:
+                    break
+        return best
+
+    def match(self, value: str) -> Optional[str]:
+        """Return the first item contained in value, if any"""
+        position = self.match_index(value)
+        return None if position is None else self.items[position]
+
+
+def compile_rule_matchers(rules: Dict[str, Dict[str, float]]) -> Dict[str, Tuple[RuleMatcher, Tuple[float, ...]]]:
+    """Compile every rule category into a matcher and its aligned weights"""
+    return {
+        category: (RuleMatcher(items.keys()), tuple(float(score) for score in items.values()))
+        for category, items in rules.items()
+    }
@@ -0,0 +1,199 @@
+import json
+from array import array
+from collections.abc import Mapping, MutableMapping
+from types import MappingProxyType
+from typing import Any, Dict, Iterator, List, Optional
+
+from ..data_models import RiskIndicator
+
+
+class IndicatorTable(Mapping):
+    """Risk indicators stored column-wise.
+
+    Scores live in a float array and the other columns in flat lists, so an
+    assessment holds five containers instead of one dict per indicator, plus
+    a key -> row index for lookups. Rows are materialized as read-only
+    ``RiskIndicator`` mappings when read; writing to one raises instead of
+    being silently lost, use ``add`` to replace an indicator.
+    """
+
+    __slots__ = ('_rows', '_keys', '_values', '_rules', '_scores', '_levels')
+
+    def __init__(self):
+        self._rows: Dict[str, int] = {}
+        self._keys = []
+        self._values = []
+        self._rules = []
+        self._scores = array('d')
+        self._levels = []
+
+    def add(self, key: str, value: Any, rule: str, score: float, risk_level: str):
+        """Append an indicator, replacing an earlier one with the same key in place"""
+        row = self._rows.get(key)
+        if row is None:
+            self._rows[key] = len(self._keys)
+            self._keys.append(key)
+            self._values.append(value)
+            self._rules.append(rule)
+            self._scores.append(score)
+            self._levels.append(risk_level)
+            return
+        self._values[row] = value
+        self._rules[row] = rule
+        self._scores[row] = score
+        self._levels[row] = risk_level
+
+    def score(self, key: str) -> float:
+        """Score of one indicator without building its mapping"""
+        return self._scores[self._rows[key]]
+
+    def __getitem__(self, key: str) -> RiskIndicator:
+        row = self._rows[key]
+        return MappingProxyType({
+            'value': self._values[row],
+            'matched_rule': self._rules[row],
+            'score': self._scores[row],
+            'risk_level': self._levels[row]
+        })
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._rows
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._keys)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __repr__(self) -> str:
+        return f"IndicatorTable({to_plain(self)!r})"
+
+
+class UDFGroupView(Mapping):
+    """Read-only UDF group sharing the payload's field list by reference"""
+
+    __slots__ = ('name', 'fields')
+
+    _keys = ('userDefinedFieldGroupName', 'udfGroupeFieldsModels')
+
+    def __init__(self, name: str, fields: List[Dict[str, Any]]):
+        self.name = name
+        self.fields = fields
+
+    def __getitem__(self, key: str) -> Any:
+        if key == 'userDefinedFieldGroupName':
+            return self.name
+        if key == 'udfGroupeFieldsModels':
+            return self.fields
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._keys)
+
+    def __len__(self) -> int:
+        return 2
+
+    def __repr__(self) -> str:
+        return f"UDFGroupView({self.name!r}, {len(self.fields)} fields)"
+
+
+class RiskAssessment(Mapping):
+    """Indicators, total score and overall level of one loan"""
+
+    __slots__ = ('indicators', 'total_score', 'risk_level')
+
+    _fields = ('indicators', 'total_score', 'risk_level')
+
+    def __init__(self, indicators: IndicatorTable, total_score: float, risk_level: str):
+        self.indicators = indicators
+        self.total_score = total_score
+        self.risk_level = risk_level
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self._fields:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._fields)
+
+    def __len__(self) -> int:
+        return len(self._fields)
+
+    def __repr__(self) -> str:
+        return f"RiskAssessment({to_plain(self)!r})"
+
+
+class LoanAssessment(MutableMapping):
+    """Compact result of RiskEngine.evaluate with a dict-compatible view.
+
+    The evaluated sections are slots; keys added later in the pipeline
+    (``business_rules``, ``llm_analysis``...) go to a small extras dict.
+    Use ``to_dict()``/``to_json()`` where a plain structure is required.
+    """
+
+    __slots__ = ('customer_info', 'loan_info', 'risk_assessment', 'rules_version', '_extras')
+
+    _fields = ('customer_info', 'loan_info', 'risk_assessment', 'rules_version')
+
+    def __init__(self, customer_info: Dict[str, Any], loan_info: Dict[str, Any],
+                 risk_assessment: RiskAssessment, rules_version: Optional[str] = None):
+        self.customer_info = customer_info
+        self.loan_info = loan_info
+        self.risk_assessment = risk_assessment
+        self.rules_version = rules_version
+        self._extras = None
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self._fields:
+            return getattr(self, key)
+        if self._extras is None:
+            raise KeyError(key)
+        return self._extras[key]
+
+    def __setitem__(self, key: str, value: Any):
+        if key in self._fields:
+            setattr(self, key, value)
+            return
+        if self._extras is None:
+            self._extras = {}
+        self._extras[key] = value
+
+    def __delitem__(self, key: str):
+        if key in self._fields or self._extras is None:
+            raise KeyError(key)
+        del self._extras[key]
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self._fields
+        if self._extras:
+            yield from self._extras
+
+    def __len__(self) -> int:
+        return len(self._fields) + len(self._extras or ())
+
+    def __repr__(self) -> str:
+        return f"LoanAssessment({self.to_dict()!r})"
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain nested dict/list copy of the assessment"""
+        return to_plain(self)
+
+    def to_json(self, **kwargs) -> str:
+        return json.dumps(self, default=json_default, **kwargs)
+
+
+def to_plain(obj: Any) -> Any:
+    """Recursively convert mapping views into plain dicts and lists"""
+    if isinstance(obj, Mapping):
+        return {key: to_plain(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [to_plain(item) for item in obj]
+    return obj
+
+
+def json_default(obj: Any) -> Any:
+    """``json.dumps`` hook serializing assessment views lazily"""
+    if isinstance(obj, Mapping):
+        return dict(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
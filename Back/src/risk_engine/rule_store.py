@@ -0,0 +1,150 @@
+import csv
+import io
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Callable, Dict, List, Mapping, NamedTuple, Optional
+
+from ..config import RULES_FILE
+from ..data_loader import DataLoader
+
+logger = logging.getLogger(__name__)
+
+RULE_FIELDS = ['Category', 'Item', 'Weight']
+
+
+class RuleSnapshot(NamedTuple):
+    """Immutable rule set with the engines compiled from it"""
+    version: str
+    rules: Mapping[str, Mapping[str, float]]
+    mtime: float
+    risk_engine: Any
+    business_rules: Any
+
+
+class RuleStore:
+    """Process-wide holder of the current KYC rule snapshot.
+
+    The rules file is parsed once and the engines are built once per
+    version. ``current()`` only stats the file; a new snapshot is built when
+    its mtime changes (or on ``reload()`` after the API rewrote it) and
+    swapped in with a single reference assignment, so in-flight requests
+    keep the snapshot they started with. Subscribers are called with the
+    previous and the new snapshot whenever the rules version changes,
+    whichever of the API or a hot reload triggered it.
+
+    ``write()`` replaces the file atomically, so a reload never sees it half
+    written. A file that parses to no rules or to malformed rows is not
+    published: the previous snapshot stays in place until the file changes.
+    """
+
+    def __init__(self, rules_file: Path = RULES_FILE):
+        self.rules_file = Path(rules_file)
+        self._snapshot: Optional[RuleSnapshot] = None
+        self._lock = threading.Lock()
+        self._subscribers: List[Callable[[RuleSnapshot, RuleSnapshot], None]] = []
+        self._rejected_mtime: Optional[float] = None
+
+    def subscribe(self, callback: Callable[[RuleSnapshot, RuleSnapshot], None]):
+        """Call ``callback(previous, new)`` after each swap to a different rules version"""
+        self._subscribers.append(callback)
+
+    def current(self) -> RuleSnapshot:
+        """Return the current snapshot, reloading if the file changed on disk"""
+        snapshot = self._snapshot
+        try:
+            mtime = self.rules_file.stat().st_mtime
+        except OSError as e:
+            if snapshot is None:
+                raise
+            logger.warning(f"Rules file unavailable, keeping version {snapshot.version}: {str(e)}")
+            return snapshot
+
+        if snapshot is None or (mtime != snapshot.mtime and mtime != self._rejected_mtime):
+            return self.reload()
+        return snapshot
+
+    def reload(self, force: bool = False) -> RuleSnapshot:
+        """Parse the rules file and atomically swap in a new snapshot"""
+        from . import RiskEngine, BusinessRulesEngine
+
+        with self._lock:
+            mtime = self.rules_file.stat().st_mtime
+            if not force and self._snapshot is not None and self._snapshot.mtime == mtime:
+                return self._snapshot
+
+            try:
+                parsed = self.parse(self.rules_file.read_text(encoding='utf-8'))
+            except ValueError as e:
+                if self._snapshot is None:
+                    raise
+                self._rejected_mtime = mtime
+                logger.warning(f"Ignoring invalid rules file, keeping version {self._snapshot.version}: {str(e)}")
+                return self._snapshot
+
+            rules = MappingProxyType({category: MappingProxyType(items) for category, items in parsed.items()})
+            risk_engine = RiskEngine(rules)
+            snapshot = RuleSnapshot(
+                version=risk_engine.rules_version,
+                rules=rules,
+                mtime=mtime,
+                risk_engine=risk_engine,
+                business_rules=BusinessRulesEngine()
+            )
+
+            previous = self._snapshot
+            self._snapshot = snapshot
+            self._rejected_mtime = None
+            if previous is None or previous.version != snapshot.version:
+                logger.info(f"Loaded rules version {snapshot.version} from {self.rules_file}")
+                # Notified under the lock so successive swaps reach subscribers in order
+                if previous is not None:
+                    self._notify(previous, snapshot)
+            return snapshot
+
+    def write(self, rows: List[Dict[str, Any]]) -> RuleSnapshot:
+        """Validate ``rows``, atomically replace the rules file with them and swap in the new snapshot"""
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=RULE_FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+        content = buffer.getvalue()
+        self.parse(content)
+
+        # Written next to the target so os.replace is an atomic rename on the same filesystem
+        fd, temp_path = tempfile.mkstemp(dir=self.rules_file.parent, prefix=f".{self.rules_file.name}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8', newline='') as f:
+                f.write(content)
+            if self.rules_file.exists():
+                shutil.copymode(self.rules_file, temp_path)
+            os.replace(temp_path, self.rules_file)
+        except BaseException:
+            Path(temp_path).unlink(missing_ok=True)
+            raise
+        return self.reload(force=True)
+
+    @staticmethod
+    def parse(content: str) -> Dict[str, Dict[str, float]]:
+        """Parse rules CSV text, raising ValueError unless every row is complete and there is at least one"""
+        try:
+            rules = DataLoader.parse_rules(io.StringIO(content))
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"Malformed rules row: {str(e)}") from e
+        if not rules or None in rules or any(None in items for items in rules.values()):
+            raise ValueError("Rules file has no complete Category,Item,Weight rows")
+        return rules
+
+    def _notify(self, previous: RuleSnapshot, snapshot: RuleSnapshot):
+        for callback in self._subscribers:
+            try:
+                callback(previous, snapshot)
+            except Exception as e:
+                logger.error(f"Rules change subscriber failed: {str(e)}")
+
+
+rule_store = RuleStore()
@@ -0,0 +1,159 @@
+import asyncio
+import logging
+import math
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+from prometheus_client import Counter, Gauge, Histogram
+
+from .config import SCHEDULER_CONFIG
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 1
+PRIORITIES = {'interactive': PRIORITY_INTERACTIVE, 'batch': PRIORITY_BATCH}
+
+SCHEDULER_QUEUE_DEPTH = Gauge('analysis_queue_depth', 'Analyses waiting for a worker', ['priority'])
+SCHEDULER_RUNNING = Gauge('analysis_jobs_running', 'Analyses currently being processed')
+SCHEDULER_WAIT_TIME = Histogram(
+    'analysis_queue_wait_seconds', 'Time analyses spent queued before starting', ['priority'],
+    buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+)
+SCHEDULER_REJECTED = Counter('analysis_rejected_total', 'Analyses refused because the queue was full', ['priority'])
+
+
+class QueueFullError(Exception):
+    """Raised when the scheduler cannot admit another job"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Analysis queue is full, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+class ScheduledJob:
+    __slots__ = ('job_id', 'client_id', 'priority', 'factory', 'enqueued_at', 'started_at')
+
+    def __init__(self, client_id: str, priority: int, factory: Callable[[], Awaitable[Any]]):
+        self.job_id = str(uuid.uuid4())
+        self.client_id = client_id
+        self.priority = priority
+        self.factory = factory
+        self.enqueued_at = time.monotonic()
+        self.started_at: Optional[float] = None
+
+
+class AnalysisScheduler:
+    """Bounded worker pool for analysis jobs.
+
+    Jobs wait in one queue per priority (interactive before batch). Inside a
+    priority, clients are served round-robin so one client's burst cannot
+    delay everyone else. When ``max_queue`` jobs are already waiting, new
+    submissions are refused with an estimate of when to retry.
+    """
+
+    def __init__(self, max_workers: int = SCHEDULER_CONFIG['max_workers'],
+                 max_queue: int = SCHEDULER_CONFIG['max_queue']):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        # priority -> client_id -> pending jobs; client order is the round-robin order
+        self._queues: Dict[int, "OrderedDict[str, Deque[ScheduledJob]]"] = {
+            priority: OrderedDict() for priority in PRIORITIES.values()
+        }
+        self._depth = 0
+        self._running = 0
+        self._avg_duration = SCHEDULER_CONFIG['initial_job_seconds']
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Condition] = None
+        self._workers: List[asyncio.Task] = []
+
+    def _ensure_workers(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._wakeup = asyncio.Condition()
+            self._workers = [
+                loop.create_task(self._worker(index), name=f"analysis-worker-{index}")
+                for index in range(self.max_workers)
+            ]
+            logger.info(f"Analysis scheduler started with {self.max_workers} workers")
+
+    async def submit(self, factory: Callable[[], Awaitable[Any]], client_id: str = "anonymous",
+                     priority: int = PRIORITY_INTERACTIVE) -> ScheduledJob:
+        """Queue ``factory()`` to run on a worker, or raise QueueFullError"""
+        self._ensure_workers()
+        self.check_capacity(priority)
+
+        job = ScheduledJob(client_id, priority, factory)
+        self._queues[priority].setdefault(client_id, deque()).append(job)
+        self._depth += 1
+        SCHEDULER_QUEUE_DEPTH.labels(priority=self._label(priority)).inc()
+
+        async with self._wakeup:
+            self._wakeup.notify()
+        return job
+
+    def check_capacity(self, priority: int = PRIORITY_INTERACTIVE):
+        """Raise QueueFullError if a job submitted now would be refused"""
+        if self._depth >= self.max_queue:
+            SCHEDULER_REJECTED.labels(priority=self._label(priority)).inc()
+            raise QueueFullError(self.retry_after())
+
+    def _next_job(self) -> Optional[ScheduledJob]:
+        for priority in sorted(self._queues):
+            clients = self._queues[priority]
+            if not clients:
+                continue
+            client_id, jobs = next(iter(clients.items()))
+            job = jobs.popleft()
+            # Move the client to the back of the rotation, or drop it when drained
+            del clients[client_id]
+            if jobs:
+                clients[client_id] = jobs
+            self._depth -= 1
+            SCHEDULER_QUEUE_DEPTH.labels(priority=self._label(priority)).dec()
+            return job
+        return None
+
+    async def _worker(self, index: int):
+        while True:
+            async with self._wakeup:
+                await self._wakeup.wait_for(lambda: self._depth > 0)
+                job = self._next_job()
+
+            job.started_at = time.monotonic()
+            SCHEDULER_WAIT_TIME.labels(priority=self._label(job.priority)).observe(job.started_at - job.enqueued_at)
+            self._running += 1
+            SCHEDULER_RUNNING.set(self._running)
+            try:
+                await job.factory()
+            except Exception as e:
+                logger.error(f"Scheduled analysis {job.job_id} for {job.client_id} failed: {str(e)}")
+            finally:
+                self._running -= 1
+                SCHEDULER_RUNNING.set(self._running)
+                duration = time.monotonic() - job.started_at
+                self._avg_duration = 0.8 * self._avg_duration + 0.2 * duration
+
+    def retry_after(self) -> int:
+        """Seconds until roughly one queue slot should free up"""
+        return max(1, math.ceil(self._avg_duration / max(1, self.max_workers)))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'workers': self.max_workers,
+            'running': self._running,
+            'queued': {self._label(priority): sum(len(jobs) for jobs in clients.values())
+                       for priority, clients in self._queues.items()},
+            'max_queue': self.max_queue,
+            'avg_job_seconds': round(self._avg_duration, 2)
+        }
+
+    @staticmethod
+    def _label(priority: int) -> str:
+        return 'interactive' if priority == PRIORITY_INTERACTIVE else 'batch'
+
+
+analysis_scheduler = AnalysisScheduler()
@@ -8,6 +8,9 @@ import os
 # Add the src directory to Python path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
 
+# Keep unit tests away from the on-disk LLM response cache under Data/
+os.environ.setdefault('LLM_CACHE_ENABLED', 'false')
+
 @pytest.fixture
 def mock_loan_data():
     return {
@@ -0,0 +1,111 @@
+import asyncio
+import json
+import pytest
+from src.batch import BatchCheckpoint, BatchPipeline, Stage
+
+
+@pytest.mark.asyncio
+async def test_pipeline_bounds_concurrency_and_resumes_from_checkpoint(tmp_path):
+    """Stages run with their own worker counts, failures are recorded and finished loans are skipped on rerun"""
+    in_flight = {'fetch': 0, 'llm': 0}
+    peak = {'fetch': 0, 'llm': 0}
+
+    def stage(name, delay, fail_on=()):
+        async def run(item):
+            in_flight[name] += 1
+            peak[name] = max(peak[name], in_flight[name])
+            await asyncio.sleep(delay)
+            in_flight[name] -= 1
+            if item.loan_id in fail_on:
+                raise ValueError(f"bad loan {item.loan_id}")
+            item.data[name] = True
+        return run
+
+    def pipeline():
+        return BatchPipeline(
+            [Stage('fetch', stage('fetch', 0.001), 4), Stage('llm', stage('llm', 0.005, fail_on={'3'}), 2)],
+            BatchCheckpoint(tmp_path / "checkpoint.jsonl"),
+            queue_size=2,
+            on_done=lambda item: {'stages': sorted(item.data)}
+        )
+
+    summary = await pipeline().run([str(i) for i in range(10)] + ['1'])
+    assert summary['loans'] == {**summary['loans'], 'submitted': 10, 'done': 9, 'failed': 1, 'skipped': 0}
+    assert summary['failures'][0]['stage'] == 'llm'
+    assert summary['stages']['fetch']['processed'] == 10 and summary['stages']['llm']['failed'] == 1
+    assert peak['llm'] == 2 and peak['fetch'] <= 4
+
+    entries = [json.loads(line) for line in (tmp_path / "checkpoint.jsonl").read_text().splitlines()]
+    assert {entry['loan_id'] for entry in entries if entry['status'] == 'done'} == {str(i) for i in range(10)} - {'3'}
+    assert all(entry['stages'] == ['fetch', 'llm'] for entry in entries if entry['status'] == 'done')
+
+    rerun = await pipeline().run([str(i) for i in range(12)])
+    assert rerun['loans']['skipped'] == 9 and rerun['loans']['submitted'] == 3
+
+
+@pytest.mark.asyncio
+async def test_batch_fetch_fails_the_loan_when_the_api_errors(tmp_path):
+    """An API error is recorded as a failure instead of scoring fallback demo data"""
+    from analyse import build_batch_stages
+
+    class FailingLoader:
+        async def load_loan_data(self, loan_id, external_id=None):
+            raise ValueError(f"404 for loan {loan_id}")
+
+    stages = build_batch_stages(FailingLoader(), None, None, None,
+                                {'fetch': 1, 'risk': 1, 'llm': 1, 'pdf': 1, 'store': 1})
+    checkpoint = BatchCheckpoint(tmp_path / "checkpoint.jsonl")
+    summary = await BatchPipeline(stages, checkpoint, queue_size=1).run(['404'])
+
+    assert summary['loans']['done'] == 0 and summary['loans']['failed'] == 1
+    assert summary['failures'][0]['stage'] == 'fetch'
+    assert checkpoint.completed() == set()
+
+
+@pytest.mark.asyncio
+async def test_batch_fails_the_loan_when_the_llm_is_down(tmp_path, mock_rules, mock_loan_data):
+    """A fallback analysis from an unreachable LLM is a failure, so a resumed run retries the loan"""
+    from unittest.mock import patch
+    from analyse import build_batch_stages
+    from src.llm import AsyncLLMAnalyzer
+    from src.llm.async_client import AsyncOllamaPool
+    from src.risk_engine import RiskEngine, BusinessRulesEngine
+
+    class Loader:
+        async def load_loan_data(self, loan_id, external_id=None):
+            return mock_loan_data
+
+    async def generate(**kwargs):
+        raise ConnectionError("Ollama is down")
+
+    with patch('src.llm.analyzer.ollama'), patch('src.llm.async_client.ollama') as mock_ollama:
+        mock_ollama.AsyncClient.return_value.generate = generate
+        analyzer = AsyncLLMAnalyzer(pool=AsyncOllamaPool(host="http://ollama:11434"), use_response_cache=False)
+        stages = build_batch_stages(Loader(), RiskEngine(mock_rules), BusinessRulesEngine(definitions=[]), analyzer,
+                                    {'fetch': 1, 'risk': 1, 'llm': 1, 'pdf': 1, 'store': 1})
+        checkpoint = BatchCheckpoint(tmp_path / "checkpoint.jsonl")
+        summary = await BatchPipeline(stages, checkpoint, queue_size=1).run(['12345'])
+
+    assert summary['loans']['done'] == 0 and summary['failures'][0]['stage'] == 'llm'
+    assert "Ollama is down" in summary['failures'][0]['error']
+    assert checkpoint.completed() == set()
+
+
+@pytest.mark.asyncio
+async def test_failing_on_done_callback_fails_only_its_loan(tmp_path):
+    """An exception from on_done is recorded as a failure and the other loans still finish"""
+    async def noop(item):
+        pass
+
+    def on_done(item):
+        if item.loan_id == '2':
+            raise KeyError('assessment')
+        return {}
+
+    checkpoint = BatchCheckpoint(tmp_path / "checkpoint.jsonl")
+    pipeline = BatchPipeline([Stage('fetch', noop), Stage('store', noop)], checkpoint, queue_size=1, on_done=on_done)
+    summary = await asyncio.wait_for(pipeline.run(['1', '2', '3']), timeout=5)
+
+    assert summary['loans']['done'] == 2 and summary['loans']['failed'] == 1
+    assert summary['failures'][0] == {**summary['failures'][0], 'loan_id': '2', 'stage': 'store'}
+    assert checkpoint.completed() == {'1', '3'}
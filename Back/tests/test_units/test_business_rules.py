@@ -0,0 +1,46 @@
+import pytest
+from src.risk_engine import BusinessRulesEngine
+
+@pytest.fixture
+def assessment():
+    return {
+        "loan_info": {"financials": {"loan_amount": 13032.5}},
+        "risk_assessment": {
+            "indicators": {"region": {"value": "GABES", "score": 15.0}},
+            "total_score": 30.0
+        }
+    }
+
+def test_default_rules_fire_on_nested_fields(assessment):
+    """Region and amount rules read the real assessment structure"""
+    results = BusinessRulesEngine().apply_rules(assessment)
+    assert [r["rule"] for r in results] == ["region_risk", "loan_amount_threshold"]
+    assert results[0]["impact"] == {"score": 15, "message": "High risk region"}
+
+def test_plan_is_sorted_and_stops(assessment):
+    """Rules run by priority and a stop rule ends evaluation"""
+    engine = BusinessRulesEngine(definitions=[
+        {"name": "late", "priority": 5, "when": {"field": "risk_assessment.total_score", "op": "gte", "value": 0},
+         "impact": {"score": 1}},
+        {"name": "early", "priority": 1, "stop": True,
+         "when": {"all": [
+             {"field": "risk_assessment.indicators.region.value", "op": "eq", "value": "GABES"},
+             {"not": {"field": "loan_info.financials.missing", "op": "exists"}}
+         ]},
+         "impact": {"score": 20}}
+    ])
+    assert [r["rule"] for r in engine.apply_rules(assessment)] == ["early"]
+    assert [r["rule"] for r in engine.apply_rules({})] == []
+
+def test_apply_rules_many(assessment):
+    """Batch evaluation returns one result list per assessment"""
+    small = {"loan_info": {"financials": {"loan_amount": "500"}}}
+    results = BusinessRulesEngine().apply_rules_many([assessment, small])
+    assert len(results) == 2
+    assert results[1] == []
+
+def test_missing_rules_file_applies_no_rules(tmp_path, assessment):
+    """Without Data/business_rules.json no built-in copy of the rules is used"""
+    engine = BusinessRulesEngine(tmp_path / "missing.json")
+    assert engine.plan == []
+    assert engine.apply_rules(assessment) == []
@@ -49,4 +49,462 @@ async def test_basic_analysis(mock_loan_data):
         
         assert analysis is not None
         assert analysis['summary'] == "Test"
-        assert analysis['recommendation'] == "approve"
\ No newline at end of file
+        assert analysis['recommendation'] == "approve"
+
+def test_loan_is_embedded_once(mock_loan_data):
+    """Retrieval, feedback lookup and storage share one cached embedding"""
+    vector_db = MagicMock()
+    vector_db.collection.count.return_value = 1
+    vector_db.find_similar_loans.return_value = {'documents': [], 'metadatas': [], 'similarities': []}
+    vector_db.collection.query.return_value = {'documents': [], 'metadatas': [], 'distances': []}
+
+    with patch('src.llm.analyzer.ollama') as mock_ollama:
+        mock_ollama.embeddings.return_value = {'embedding': [0.1, 0.2]}
+        mock_ollama.generate.return_value = {
+            'response': '{"summary": "Test", "recommendation": "approve", "rationale": [], "key_findings": [], "conditions": []}'
+        }
+        loan_data = {**mock_loan_data, "loan_info": {"basic_info": {"loan_id": "embed-once"}}}
+
+        analyzer = LLMAnalyzer(vector_db)
+        analyzer.analyze_loan(loan_data)
+        analyzer.store_current_loan(loan_data)
+        LLMAnalyzer(vector_db).analyze_loan({key: value for key, value in loan_data.items() if key != 'llm_analysis'})
+
+        assert mock_ollama.embeddings.call_count == 1
+        assert vector_db.collection.upsert.call_args.kwargs['embeddings'] == [[0.1, 0.2]]
+
+
+def test_llm_responses_are_cached(tmp_path):
+    """Identical prompts are answered from the cache unless it is bypassed"""
+    from src.llm.response_cache import LLMResponseCache
+
+    cache = LLMResponseCache(tmp_path / "llm_cache.db", ttl_seconds=3600, max_bytes=1024, enabled=True)
+    with patch('src.llm.analyzer.ollama') as mock_ollama:
+        mock_ollama.generate.return_value = {'response': '{"summary": "cached"}'}
+
+        analyzer = LLMAnalyzer(response_cache=cache)
+        assert analyzer._call_llm("prompt") == '{"summary": "cached"}'
+        assert analyzer._call_llm("prompt") == '{"summary": "cached"}'
+        assert mock_ollama.generate.call_count == 1
+
+        LLMAnalyzer(response_cache=cache, use_response_cache=False)._call_llm("prompt")
+        assert mock_ollama.generate.call_count == 2
+
+    cache.put("big", "model", "x" * 2048)
+    assert cache.stats()['bytes'] <= 1024
+
+
+def test_unparseable_llm_responses_are_not_cached(tmp_path):
+    """A reasoning-only answer is regenerated on retry instead of being replayed from the cache"""
+    from src.llm.response_cache import LLMResponseCache
+
+    cache = LLMResponseCache(tmp_path / "llm_cache.db", ttl_seconds=3600, max_bytes=1024 * 1024, enabled=True)
+    with patch('src.llm.analyzer.ollama') as mock_ollama:
+        mock_ollama.generate.return_value = {'response': '<think>still thinking'}
+        analyzer = LLMAnalyzer(response_cache=cache)
+        analyzer._call_llm("prompt")
+        analyzer._call_llm("prompt")
+
+        assert mock_ollama.generate.call_count == 2
+        assert cache.stats()['entries'] == 0
+
+
+def test_llm_cache_opens_lazily_and_survives_a_corrupt_file(tmp_path):
+    """No database is created until first use; stats and clear do not raise on a broken file"""
+    from src.llm.response_cache import LLMResponseCache
+
+    cache = LLMResponseCache(tmp_path / "cache" / "llm_cache.db", enabled=True)
+    assert not (tmp_path / "cache").exists()
+    assert cache.stats() == {**cache.stats(), 'enabled': True, 'entries': 0}
+
+    corrupt = tmp_path / "corrupt.db"
+    corrupt.write_bytes(b"not a database" * 100)
+    broken = LLMResponseCache(corrupt, enabled=True)
+    broken._initialized = True  # opened before the file was damaged
+    assert 'error' in broken.stats()
+    broken.clear()
+    assert broken.get("key") is None
+
+
+@pytest.mark.asyncio
+async def test_async_analysis_respects_concurrency_limit(mock_loan_data):
+    """Async analyses are awaited directly and capped by the pool's generation slots"""
+    import asyncio
+    from src.llm import AsyncLLMAnalyzer
+    from src.llm.async_client import AsyncOllamaPool
+
+    in_flight = 0
+    peak = 0
+
+    async def generate(**kwargs):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return {'response': '{"summary": "Async", "recommendation": "approve"}'}
+
+    with patch('src.llm.analyzer.ollama'), patch('src.llm.async_client.ollama') as mock_ollama:
+        mock_ollama.AsyncClient.return_value.generate = generate
+        pool = AsyncOllamaPool(host="http://ollama:11434", max_generations=2, max_embeddings=1)
+        analyzers = [AsyncLLMAnalyzer(pool=pool) for _ in range(5)]
+        loans = [{**mock_loan_data, "loan_info": {"financials": {"loan_amount": i}}} for i in range(5)]
+
+        results = await asyncio.gather(*(a.analyze_loan_async(loan) for a, loan in zip(analyzers, loans)))
+
+    assert [result['summary'] for result in results] == ["Async"] * 5
+    assert peak == 2
+
+
+@pytest.mark.asyncio
+async def test_streamed_tokens_are_forwarded_and_parsed(mock_loan_data):
+    """Streaming forwards every token and still parses the full response"""
+    from src.llm import AsyncLLMAnalyzer
+    from src.llm.async_client import AsyncOllamaPool
+
+    chunks = ['{"summary": ', '"Streamed", ', '"recommendation": "reject"}']
+
+    async def stream():
+        for chunk in chunks:
+            yield {'response': chunk, 'done': False}
+        yield {'response': '', 'done': True}
+
+    async def generate(**kwargs):
+        assert kwargs['stream'] is True
+        return stream()
+
+    received = []
+
+    async def on_token(token):
+        received.append(token)
+
+    with patch('src.llm.analyzer.ollama'), patch('src.llm.async_client.ollama') as mock_ollama:
+        mock_ollama.AsyncClient.return_value.generate = generate
+        analyzer = AsyncLLMAnalyzer(pool=AsyncOllamaPool(host="http://ollama:11434"))
+        analysis = await analyzer.analyze_loan_async(mock_loan_data, on_token=on_token)
+
+    assert received == chunks
+    assert analysis['summary'] == "Streamed"
+    assert analysis['recommendation'] == "deny"
+
+
+def test_feedback_summary_is_cached_per_neighbor_set():
+    """The feedback summary is generated once per neighbor set and rebuilt after new feedback"""
+    from src.llm.feedback_cache import feedback_summary_cache
+
+    feedback_summary_cache.clear()
+    documents = ['{"customer_info": {"name": "A"}}', '{"customer_info": {"name": "B"}}']
+    metadatas = [
+        {'loan_id': '1', 'has_feedback': True, 'feedback': {'comments': 'check income', 'timestamp': 't1'}},
+        {'loan_id': '2', 'has_feedback': True, 'feedback': {'comments': 'ok', 'timestamp': 't2'}},
+    ]
+    vector_db = MagicMock()
+    vector_db.collection.get.return_value = {'documents': documents, 'metadatas': metadatas}
+
+    with patch('src.llm.analyzer.ollama') as mock_ollama:
+        mock_ollama.generate.return_value = {'response': '- verify income'}
+        analyzer = LLMAnalyzer(vector_db)
+
+        first = analyzer._build_feedback_context(documents, metadatas, [0.1, 0.2])
+        reordered = analyzer._build_feedback_context(documents[::-1], metadatas[::-1], [0.3, 0.1])
+        assert "FEEDBACK SUMMARY:\n- verify income" in first
+        assert "FEEDBACK SUMMARY:\n- verify income" in reordered
+        assert mock_ollama.generate.call_count == 1
+
+        refreshers = feedback_summary_cache.invalidate('2')
+        assert len(refreshers) == 1 and feedback_summary_cache.stats()['entries'] == 0
+        assert analyzer not in refreshers[0].args  # refreshers rebuild through the shared analyzer
+        with patch('src.llm.analyzer.summary_analyzer', return_value=analyzer):
+            refreshers[0]()
+        assert mock_ollama.generate.call_count == 2
+
+        updated = [metadatas[0], {**metadatas[1], 'feedback': {'comments': 'deny', 'timestamp': 't3'}}]
+        analyzer._build_feedback_context(documents, updated, [0.1, 0.2])
+        assert mock_ollama.generate.call_count == 3
+
+
+def test_embedding_view_is_compact_and_deterministic(mock_loan_data):
+    """The embedded text keeps risk-relevant fields in a fixed order and drops the rest"""
+    from src.llm.embeddings import EMBEDDING_VIEW_VERSION, embedding_text
+
+    indicators = {f"field_{i}": {'value': i, 'score': i, 'risk_level': 'low'} for i in range(40)}
+    loan = {**mock_loan_data, "risk_assessment": {"total_score": 15.0, "risk_level": "low", "indicators": indicators}}
+    reordered = {**loan, "risk_assessment": {**loan["risk_assessment"], "indicators": dict(reversed(indicators.items()))}}
+
+    text = embedding_text(loan, max_indicators=5)
+    assert text == embedding_text(reordered, max_indicators=5)
+    assert text.startswith(f"view: v{EMBEDDING_VIEW_VERSION}\n")
+    assert "loan.loan_amount: 50000" in text and "John Doe" not in text
+    assert [line.split(':')[0] for line in text.splitlines() if line.startswith('indicator.')] == [
+        'indicator.field_35', 'indicator.field_36', 'indicator.field_37', 'indicator.field_38', 'indicator.field_39']
+    assert embedding_text({**loan, 'llm_analysis': {'summary': 'x'}}, max_indicators=5) == text
+    assert len(embedding_text(loan, max_chars=100)) == 100
+
+
+@pytest.mark.asyncio
+async def test_speculative_basic_analysis_races_retrieval(mock_loan_data):
+    """The basic run is cancelled when context arrives in time and used when it does not"""
+    import asyncio
+    from src.llm import AsyncLLMAnalyzer
+
+    class FakePool:
+        def __init__(self, embed_delay):
+            self.embed_delay = embed_delay
+            self.cancelled = 0
+
+        async def embeddings(self, model, prompt):
+            await asyncio.sleep(self.embed_delay)
+            return [0.1, 0.2]
+
+        async def generate(self, prompt, **kwargs):
+            contextual = "SIMILAR" in prompt.upper()
+            try:
+                await asyncio.sleep(0.01 if contextual else 0.05)
+            except asyncio.CancelledError:
+                self.cancelled += 1
+                raise
+            return {'response': '{"summary": "%s"}' % ("contextual" if contextual else "basic")}
+
+        async def generate_stream(self, prompt, **kwargs):
+            yield await self.generate(prompt, **kwargs)
+
+    vector_db = MagicMock()
+    vector_db.collection.count.return_value = 1
+    vector_db.find_similar_loans.return_value = {
+        'documents': ['{"customer_info": {"name": "Jane"}}'], 'metadatas': [{}], 'similarities': [0.9]}
+    vector_db.collection.query.return_value = {'documents': [], 'metadatas': [], 'distances': []}
+
+    with patch('src.llm.analyzer.ollama'), patch('src.llm.prompts.LLMPromptBuilder.build_contextual_prompt',
+                                                 return_value="Similar loans: Jane"):
+        fast = FakePool(embed_delay=0)
+        analyzer = AsyncLLMAnalyzer(vector_db, pool=fast, speculative=True, speculative_deadline=1)
+        loan = {**mock_loan_data, "loan_info": {"financials": {"loan_amount": 1}}}
+        assert (await analyzer.analyze_loan_async(loan))['summary'] == "contextual"
+        assert analyzer.last_analysis_type == "contextual" and fast.cancelled == 1
+
+        slow = FakePool(embed_delay=0.2)
+        tokens = []
+
+        async def on_token(token):
+            tokens.append(token)
+
+        analyzer = AsyncLLMAnalyzer(vector_db, pool=slow, speculative=True, speculative_deadline=0.02)
+        loan = {**mock_loan_data, "loan_info": {"financials": {"loan_amount": 2}}}
+        assert (await analyzer.analyze_loan_async(loan, on_token=on_token))['summary'] == "basic"
+        assert analyzer.last_analysis_type == "basic" and tokens == ['{"summary": "basic"}']
+
+
+def test_models_are_verified_once_in_background():
+    """Constructing analyzers never lists models; the readiness check pulls and pre-loads them once"""
+    from src.llm.readiness import ModelReadiness
+
+    with patch('src.llm.analyzer.ollama') as analyzer_ollama, patch('src.llm.readiness.ollama') as mock_ollama:
+        LLMAnalyzer()
+        assert not analyzer_ollama.list.called
+
+        mock_ollama.list.return_value = {'models': [{'model': 'nomic-embed-text'}]}
+        readiness = ModelReadiness(generation_model='deepseek-r1:1.5b', embedding_model='nomic-embed-text',
+                                   keep_alive='30m')
+        assert readiness.status()['ready'] is False
+
+        readiness.start().join(timeout=5)
+        assert readiness.start() is readiness.start()
+        mock_ollama.pull.assert_called_once_with('deepseek-r1:1.5b')
+        mock_ollama.generate.assert_called_once_with(model='deepseek-r1:1.5b', prompt="", keep_alive='30m')
+        assert mock_ollama.list.call_count == 1
+        assert readiness.status()['ready'] is True
+
+
+def test_prompt_budget_trims_low_value_sections_and_sizes_context(mock_loan_data):
+    """Detailed feedback goes first, then UDFs, and num_ctx is the smallest window that fits"""
+    from src.llm.budget import PromptBudget
+
+    loan = {**mock_loan_data, "customer_info": {**mock_loan_data["customer_info"], "udf_data": [
+        {"userDefinedFieldGroupName": "Extra", "udfGroupeFieldsModels": [{"fieldName": "Note", "value": "u" * 300}]}
+    ]}}
+    feedback = ("- check income", ["d" * 400])
+    build = lambda udf_data, loan_type: f"BASE\n{udf_data}"
+
+    with patch('src.llm.analyzer.ollama'):
+        analyzer = LLMAnalyzer()
+
+    analyzer.prompt_budget = PromptBudget(context_sizes=[512, 2048], response_tokens=100, chars_per_token=1.0)
+    prompt, num_ctx = analyzer._fit_prompt(build, loan, ("", []))
+    assert num_ctx == 512 and "u" * 300 in prompt
+
+    prompt, num_ctx = analyzer._fit_prompt(build, loan, feedback)
+    assert num_ctx == 2048 and "d" * 400 in prompt
+
+    analyzer.prompt_budget = PromptBudget(context_sizes=[512, 768], response_tokens=100, chars_per_token=1.0)
+    prompt, num_ctx = analyzer._fit_prompt(build, loan, feedback)
+    assert num_ctx == 768 and "d" * 400 not in prompt and "u" * 300 in prompt
+    assert "FEEDBACK SUMMARY:\n- check income" in prompt
+
+    analyzer.prompt_budget = PromptBudget(context_sizes=[256, 512], response_tokens=100, chars_per_token=1.0)
+    prompt, num_ctx = analyzer._fit_prompt(build, loan, feedback)
+    assert num_ctx == 512 and "u" * 300 not in prompt and "- check income" in prompt
+
+
+def test_applied_feedback_refreshes_cached_summaries():
+    """Feedback from the API path updates the vector DB entry and rebuilds the summaries citing the loan"""
+    import threading
+    from src.llm.feedback import FeedbackSystem
+    from src.llm.feedback_cache import feedback_summary_cache
+
+    feedback_summary_cache.clear()
+    refreshed = threading.Event()
+    feedback_summary_cache.put('key', (('7', 't1'),), "old summary", refreshed.set)
+    vector_db = MagicMock()
+    vector_db.collection.get.return_value = {'ids': ['loan_7'], 'metadatas': [{'loan_id': '7'}], 'documents': ['{}']}
+    entry = {'human_decision': 'reject', 'rating': 2, 'comments': 'income unverified',
+             'analyst_id': 'web_user', 'timestamp': 't2'}
+
+    with patch('src.llm.feedback.FEEDBACK_SUMMARY_PRECOMPUTE', True):
+        FeedbackSystem(vector_db).apply_feedback('7', entry, {'recommendation': 'approve'})
+
+    assert refreshed.wait(timeout=5)
+    assert feedback_summary_cache.stats()['entries'] == 0
+    metadata = vector_db.collection.update.call_args.kwargs['metadatas'][0]
+    assert metadata['has_feedback'] and metadata['feedback']['comments'] == 'income unverified'
+
+
+@pytest.mark.asyncio
+async def test_speculative_analysis_reuses_basic_run_and_respects_budget(mock_loan_data):
+    """A failed contextual run falls back to the running basic one, and the whole analysis is time-bounded"""
+    import asyncio
+    import time
+    from src.llm import AsyncLLMAnalyzer
+
+    class FakePool:
+        def __init__(self, basic_delay):
+            self.basic_delay = basic_delay
+            self.prompts = []
+
+        async def embeddings(self, model, prompt):
+            return [0.1, 0.2]
+
+        async def generate(self, prompt, **kwargs):
+            self.prompts.append(prompt)
+            if "SIMILAR" in prompt.upper():
+                raise ConnectionError("contextual host down")
+            await asyncio.sleep(self.basic_delay)
+            return {'response': '{"summary": "basic"}'}
+
+        async def generate_stream(self, prompt, **kwargs):
+            yield await self.generate(prompt, **kwargs)
+
+    vector_db = MagicMock()
+    vector_db.collection.count.return_value = 1
+    vector_db.find_similar_loans.return_value = {
+        'documents': ['{"customer_info": {"name": "Jane"}}'], 'metadatas': [{}], 'similarities': [0.9]}
+    vector_db.collection.query.return_value = {'documents': [], 'metadatas': [], 'distances': []}
+
+    with patch('src.llm.analyzer.ollama'), patch('src.llm.prompts.LLMPromptBuilder.build_contextual_prompt',
+                                                 return_value="Similar loans: Jane"):
+        pool = FakePool(basic_delay=0.02)
+        analyzer = AsyncLLMAnalyzer(vector_db, pool=pool, speculative=True, speculative_deadline=1)
+        loan = {**mock_loan_data, "loan_info": {"financials": {"loan_amount": 3}}}
+        assert (await analyzer.analyze_loan_async(loan))['summary'] == "basic"
+        assert len(pool.prompts) == 2  # the basic prompt was generated once, not restarted
+
+        pool = FakePool(basic_delay=5)
+        analyzer = AsyncLLMAnalyzer(vector_db, pool=pool, speculative=True, speculative_deadline=1,
+                                    speculative_budget=0.05)
+        loan = {**mock_loan_data, "loan_info": {"financials": {"loan_amount": 4}}}
+        started = time.monotonic()
+        await analyzer.analyze_loan_async(loan)
+        assert time.monotonic() - started < 1
+        assert analyzer.last_analysis_type == "fallback"
+
+
+@pytest.mark.asyncio
+async def test_contextual_stream_cancels_basic_run_and_is_replaced_on_failure(mock_loan_data):
+    """The first contextual token frees the basic run's slot; a later failure replaces the partial text"""
+    import asyncio
+    from src.llm import AsyncLLMAnalyzer
+
+    class FakePool:
+        def __init__(self):
+            self.basic_runs = 0
+            self.cancelled = 0
+
+        async def embeddings(self, model, prompt):
+            return [0.1, 0.2]
+
+        async def generate(self, prompt, **kwargs):
+            self.basic_runs += 1
+            try:
+                await asyncio.sleep(0.05)
+            except asyncio.CancelledError:
+                self.cancelled += 1
+                raise
+            return {'response': '{"summary": "basic"}'}
+
+        async def generate_stream(self, prompt, **kwargs):
+            yield {'response': '{"summary": "cont'}
+            raise ConnectionError("stream dropped")
+
+    vector_db = MagicMock()
+    vector_db.collection.count.return_value = 1
+    vector_db.find_similar_loans.return_value = {
+        'documents': ['{"customer_info": {"name": "Jane"}}'], 'metadatas': [{}], 'similarities': [0.9]}
+    vector_db.collection.query.return_value = {'documents': [], 'metadatas': [], 'distances': []}
+    sent = []
+
+    async def on_token(token, replace=False):
+        sent.append((token, replace))
+
+    with patch('src.llm.analyzer.ollama'), patch('src.llm.prompts.LLMPromptBuilder.build_contextual_prompt',
+                                                 return_value="Similar loans: Jane"):
+        pool = FakePool()
+        analyzer = AsyncLLMAnalyzer(vector_db, pool=pool, speculative=True, speculative_deadline=1,
+                                    use_response_cache=False)
+        loan = {**mock_loan_data, "loan_info": {"financials": {"loan_amount": 5}}}
+        analysis = await analyzer.analyze_loan_async(loan, on_token=on_token)
+
+    assert analysis['summary'] == "basic" and analyzer.last_analysis_type == "basic"
+    assert pool.cancelled == 1 and pool.basic_runs == 2
+    assert sent == [('{"summary": "cont', False), ('{"summary": "basic"}', True)]
+
+
+def test_sticky_context_size_only_grows_per_model():
+    """A sticky budget keeps each model's largest num_ctx; the default picks the smallest adequate one"""
+    from src.llm.budget import PromptBudget
+
+    sticky = PromptBudget(context_sizes=[512, 1024], response_tokens=100, chars_per_token=1.0, sticky=True)
+    assert [sticky.context_size("x" * n, "a") for n in (10, 800, 10)] == [512, 1024, 1024]
+    assert sticky.context_size("x" * 10, "b") == 512
+
+    exact = PromptBudget(context_sizes=[512, 1024], response_tokens=100, chars_per_token=1.0)
+    assert not exact.sticky
+    assert [exact.context_size("x" * n, "a") for n in (10, 800, 10)] == [512, 1024, 512]
+
+
+def test_stale_embeddings_are_rebuilt_from_stored_documents(tmp_path):
+    """Loans embedded from another view version are re-embedded and stamped with the current one"""
+    import json
+    import chromadb
+    from src.llm import LoanVectorDB
+
+    # Skip __init__ and its Ollama embedding function: vectors are passed explicitly here
+    vector_db = LoanVectorDB.__new__(LoanVectorDB)
+    vector_db.collection = chromadb.PersistentClient(path=str(tmp_path / "vectors")).get_or_create_collection(
+        name="loan_assessments", metadata={"hnsw:space": "cosine"})
+    vector_db.collection.upsert(
+        ids=["loan_1", "loan_2"],
+        embeddings=[[1.0, 0.0], [0.0, 1.0]],
+        documents=[json.dumps({"customer_info": {"name": "Old"}}), json.dumps({"customer_info": {"name": "New"}})],
+        metadatas=[{"loan_id": "1"}, {"loan_id": "2", "embedding_view_version": 2}]
+    )
+    embedded = []
+
+    def embed(loan):
+        embedded.append(loan["customer_info"]["name"])
+        return [0.5, 0.5]
+
+    assert vector_db.reembed_stale(embed, version=2) == 1
+    assert embedded == ["Old"]
+    assert vector_db.stale_embedding_ids(2) == []
+    stored = vector_db.collection.get(ids=["loan_1"], include=["embeddings", "metadatas"])
+    assert list(stored["embeddings"][0]) == [0.5, 0.5]
+    assert stored["metadatas"][0] == {"loan_id": "1", "embedding_view_version": 2}
@@ -0,0 +1,121 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from src.llm.backends import NoBackendAvailable, OllamaBackendPool
+
+
+class StandInOllama:
+    """Minimal local HTTP server answering the Ollama generate/embeddings/tags endpoints"""
+
+    def __init__(self, delay=0.0, status=200):
+        self.delay = delay
+        self.status = status
+        self.requests = 0
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _reply(self, payload):
+                stand_in.requests += 1
+                time.sleep(stand_in.delay)
+                body = json.dumps(payload if stand_in.status == 200 else {'error': 'down'}).encode()
+                self.send_response(stand_in.status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers['Content-Length']))
+                if self.path == '/api/embeddings':
+                    self._reply({'embedding': [0.1, 0.2]})
+                else:
+                    self._reply({'response': f'from {self.server.server_port}', 'done': True})
+
+            def do_GET(self):
+                self._reply({'models': []})
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.host = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stand_ins():
+    servers = [StandInOllama(delay=0.05), StandInOllama(delay=0.05)]
+    yield servers
+    for server in servers:
+        server.close()
+
+
+def test_requests_are_spread_by_outstanding_load(stand_ins):
+    """Concurrent calls go to the host with the fewest in-flight requests"""
+    pool = OllamaBackendPool([server.host for server in stand_ins], failure_threshold=2, cooldown_seconds=60, slow_seconds=5)
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        responses = list(executor.map(lambda _: pool.generate(model='m', prompt='p')['response'], range(8)))
+
+    assert sum(server.requests for server in stand_ins) == 8
+    assert min(server.requests for server in stand_ins) >= 3
+    assert len(set(responses)) == 2
+    assert pool.embeddings(model='e', prompt='p')['embedding'] == [0.1, 0.2]
+    assert all(stats['outstanding'] == 0 and stats['avg_latency'] > 0 for stats in pool.stats())
+
+
+def test_failing_host_is_skipped_until_it_recovers(stand_ins):
+    """Failures fail over to healthy hosts and open the circuit of the bad one"""
+    healthy, failing = stand_ins
+    failing.status = 500
+    pool = OllamaBackendPool([failing.host, healthy.host], failure_threshold=2, cooldown_seconds=60, slow_seconds=5)
+
+    for _ in range(4):
+        assert pool.generate(model='m', prompt='p')['response'] == f"from {healthy.server.server_port}"
+    assert failing.requests == 2
+    assert [stats['up'] for stats in pool.stats()] == [False, True]
+
+    failing.status = 200
+    pool.check_health()
+    assert [stats['up'] for stats in pool.stats()] == [False, True]
+
+    healthy.status = failing.status = 500
+    with pytest.raises(NoBackendAvailable):
+        pool.generate(model='m', prompt='p')
+
+
+def test_health_probes_do_not_close_a_slow_host_and_half_open_allows_one_trial(stand_ins):
+    """A tripped host stays open despite fast health probes until one trial request succeeds"""
+    slow, fast = stand_ins
+    slow.delay, fast.delay = 0.2, 0.0
+    pool = OllamaBackendPool([slow.host, fast.host], failure_threshold=1, cooldown_seconds=0.3, slow_seconds=0.1)
+    slow_backend = pool.backends[0]
+
+    pool.backends[1].outstanding = 5  # steer the first call to the slow host
+    pool.generate(model='m', prompt='p')
+    pool.backends[1].outstanding = 0
+    assert [stats['up'] for stats in pool.stats()] == [False, True]
+
+    pool.check_health()
+    assert [stats['up'] for stats in pool.stats()] == [False, True]
+    assert not slow_backend.available(time.monotonic())
+
+    time.sleep(0.35)
+    trial = pool.acquire()
+    assert trial is slow_backend and not slow_backend.available(time.monotonic())
+    assert pool.acquire() is pool.backends[1]
+    pool.release(pool.backends[1], 'generate', time.monotonic(), ok=True)
+
+    slow.delay = 0.0
+    started = time.monotonic()
+    trial.client.generate(model='m', prompt='p')
+    pool.release(trial, 'generate', started, ok=True)
+    assert [stats['up'] for stats in pool.stats()] == [True, True]
@@ -0,0 +1,34 @@
+from src.llm.parsing import extract_json_objects, parse_analysis
+
+
+def test_reasoning_and_prose_around_json_are_ignored():
+    """<think> blocks, braces in reasoning and trailing prose do not break parsing"""
+    response = (
+        "<think>The schema is {summary, recommendation}. Maybe deny?</think>\n"
+        "Here is my answer:\n```json\n"
+        '{"summary": "Solid {cash} flow", "recommendation": "Approved", '
+        '"rationale": "Low debt", "key_findings": ["Stable income"], "conditions": []}\n'
+        "```\nLet me know if you need more."
+    )
+    analysis = parse_analysis(response)
+    assert analysis == {
+        'summary': "Solid {cash} flow",
+        'recommendation': "approve",
+        'rationale': ["Low debt"],
+        'key_findings': ["Stable income"],
+        'conditions': []
+    }
+
+
+def test_common_defects_are_repaired():
+    """Trailing commas, raw newlines, Python literals and truncation are repaired"""
+    response = '{"summary": "Line one\nline two", "recommendation": "approve|deny|review",' \
+               ' "rationale": ["a", "b",], "flag": True, "key_findings": ["x"'
+    analysis = parse_analysis(response)
+    assert analysis['summary'] == "Line one\nline two"
+    assert analysis['recommendation'] == "review"
+    assert analysis['rationale'] == ["a", "b"]
+    assert analysis['key_findings'] == ["x"]
+
+    assert extract_json_objects('a {"b": "}"} c {"d": 1}') == ['{"b": "}"}', '{"d": 1}']
+    assert parse_analysis("I cannot decide.") is None
@@ -0,0 +1,109 @@
+import os
+
+import pytest
+
+from src.config import PROMPT_TEMPLATE_DIR
+from src.llm.prompts import LLMPromptBuilder
+from src.llm.templates import PromptTemplate, PromptTemplateStore
+
+
+def test_compiled_template_matches_str_format():
+    """Every shipped template renders exactly as str.format would"""
+    store = PromptTemplateStore(PROMPT_TEMPLATE_DIR)
+    for name, template in store.current().templates.items():
+        values = {field: f"<{field}>" for field in template.fields}
+        assert template.render(**values) == template.source.format(**values), name
+
+
+def test_contextual_prompt_detects_loan_type_once(monkeypatch):
+    """The contextual prompt reuses the loan type of its basic prompt"""
+    loan_data = {
+        "customer_info": {"name": "John Doe", "demographics": {"age": "45"}},
+        "loan_info": {"basic_info": {"product": "Crédit agricole"}, "financials": {"loan_amount": 50000}},
+        "risk_assessment": {"total_score": 15.0, "indicators": {}}
+    }
+    calls = []
+    detect = LLMPromptBuilder.determine_loan_type
+    monkeypatch.setattr(LLMPromptBuilder, 'determine_loan_type',
+                        staticmethod(lambda loan_data: calls.append(1) or detect(loan_data)))
+
+    prompt = LLMPromptBuilder.build_contextual_prompt(loan_data, {'documents': []})
+    assert len(calls) == 1
+    assert "=== AGRICULTURAL SPECIFIC COMPARATIVE ANALYSIS ===" in prompt
+    assert "No sufficiently similar historical cases" in prompt
+    assert "{{" not in prompt
+
+
+def test_edited_template_is_reloaded(tmp_path):
+    """Changing a template file swaps in the new wording without a restart"""
+    (tmp_path / 'standard.txt').write_text("Standard {customer_name}")
+    (tmp_path / 'personal.txt').write_text("Personal {customer_name}")
+    (tmp_path / 'contextual.txt').write_text("{base_prompt}")
+    store = PromptTemplateStore(tmp_path)
+
+    assert store.get('personal').render(customer_name="A") == "Personal A"
+    assert store.get('mortgage').render(customer_name="A") == "Standard A"
+    first = store.current()
+    assert store.current() is first  # unchanged files are not recompiled
+
+    path = tmp_path / 'personal.txt'
+    path.write_text("Personal loan for {customer_name}: {{\"summary\": \"\"}}")
+    mtime = dict(first.mtimes)['personal'] + 10
+    os.utime(path, (mtime, mtime))
+    assert store.get('personal').render(customer_name="A") == 'Personal loan for A: {"summary": ""}'
+
+
+def test_broken_template_edit_keeps_the_loaded_templates(tmp_path):
+    """A template that does not parse or uses unknown placeholders is rejected until it is fixed"""
+    path = tmp_path / 'standard.txt'
+    path.write_text("Standard {customer_name}")
+    (tmp_path / 'contextual.txt').write_text("{base_prompt}")
+    store = PromptTemplateStore(tmp_path)
+    first = store.current()
+    mtime = dict(first.mtimes)['standard']
+
+    for edit in ("Standard {customer_name} stray { brace", "Standard {customer_nmae}"):
+        mtime += 10
+        path.write_text(edit)
+        os.utime(path, (mtime, mtime))
+        assert store.current() is first
+        assert store.get('standard').render(customer_name="A") == "Standard A"
+
+    path.write_text("Fixed {customer_name}")
+    os.utime(path, (mtime + 10, mtime + 10))
+    assert store.get('standard').render(customer_name="A") == "Fixed A"
+
+
+def test_missing_contextual_template_is_rejected(tmp_path):
+    """The contextual template never falls back to a loan type template"""
+    (tmp_path / 'standard.txt').write_text("Standard {customer_name}")
+    with pytest.raises(FileNotFoundError):
+        PromptTemplateStore(tmp_path).current()
+
+    contextual = tmp_path / 'contextual.txt'
+    contextual.write_text("{base_prompt}")
+    store = PromptTemplateStore(tmp_path)
+    first = store.current()
+
+    contextual.unlink()
+    assert store.current() is first
+    assert store.get('contextual').render(base_prompt="B") == "B"
+
+
+def test_prompts_of_one_loan_type_share_the_template_prefix():
+    """Instructions come before the loan data so Ollama can reuse the cached prefix"""
+    def assessment(name, amount):
+        return {
+            "customer_info": {"name": name, "demographics": {"age": "45"}},
+            "loan_info": {"basic_info": {"product": "Crédit auto"}, "financials": {"loan_amount": amount}},
+            "risk_assessment": {"total_score": amount / 1000, "indicators": {}}
+        }
+
+    template = PromptTemplateStore(PROMPT_TEMPLATE_DIR).get('personal')
+    first = LLMPromptBuilder.build_basic_prompt(assessment("John Doe", 20000), loan_type='personal')
+    second = LLMPromptBuilder.build_contextual_prompt(assessment("Jane Roe", 30000), {'documents': []},
+                                                      loan_type='personal')
+
+    assert "=== REQUIRED ANALYSIS ===" in template.prefix
+    assert first.startswith(template.prefix) and second.startswith(template.prefix)
+    assert len(template.prefix) > len(first) / 2
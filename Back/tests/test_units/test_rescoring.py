@@ -0,0 +1,108 @@
+import json
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from Backend.database import Base
+from Backend import models
+from Backend.rescoring import RescoringJob, changed_categories
+from src.risk_engine import RiskEngine
+
+@pytest.fixture
+def session_factory():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)
+
+def test_changed_categories(mock_rules):
+    """Only categories with different items or weights are reported"""
+    new_rules = {**mock_rules, "Genre": {"M": 4, "F": 1}}
+    assert changed_categories(mock_rules, new_rules) == {"Genre"}
+    assert changed_categories(mock_rules, mock_rules) == set()
+
+def test_rescoring_updates_stored_scores(session_factory, mock_rules, mock_loan_data):
+    """Stored scores are adjusted to match a full evaluation under the new rules"""
+    new_rules = {**mock_rules, "Genre": {"M": 4, "F": 1}}
+    old_score = RiskEngine(mock_rules).evaluate(mock_loan_data)['risk_assessment']['total_score']
+
+    db = session_factory()
+    db.add(models.Analysis(analysis_id="a1", loan_id="12345", risk_score=old_score,
+                           loan_payload=json.dumps(mock_loan_data)))
+    db.add(models.Analysis(analysis_id="a2", loan_id="legacy", risk_score=12.0))
+    db.commit()
+
+    job = RescoringJob(mock_rules, new_rules, session_factory=session_factory, batch_size=1)
+    job.run()
+
+    expected = RiskEngine(new_rules).evaluate(mock_loan_data)['risk_assessment']['total_score']
+    scores = {a.analysis_id: a.risk_score for a in session_factory().query(models.Analysis)}
+    assert scores == {"a1": expected, "a2": 12.0}
+    assert job.progress()['status'] == "completed"
+    assert job.progress()['processed'] == 1
+    assert job.progress()['updated'] == 1
+
+def _stored_analysis(analysis_id, rules, loan):
+    engine = RiskEngine(rules)
+    return models.Analysis(
+        analysis_id=analysis_id, loan_id=loan["loanId"],
+        risk_score=engine.evaluate(loan)['risk_assessment']['total_score'],
+        rules_version=engine.rules_version,
+        category_scores=json.dumps(engine.category_scores_many([loan])[0]),
+        loan_payload=json.dumps(loan)
+    )
+
+def test_rows_scored_under_other_rules_are_fully_reevaluated(session_factory, mock_rules, mock_loan_data):
+    """Stored category scores are only reused for rows scored with the old rules"""
+    older_rules = {**mock_rules, "Situation familiale": {"marié": 7, "célibataire": 5}}
+    new_rules = {**mock_rules, "Genre": {"M": 4, "F": 1}}
+
+    db = session_factory()
+    db.add(_stored_analysis("current", mock_rules, mock_loan_data))
+    db.add(_stored_analysis("stale", older_rules, mock_loan_data))
+    db.commit()
+
+    RescoringJob(mock_rules, new_rules, session_factory=session_factory).run()
+
+    expected = RiskEngine(new_rules).evaluate(mock_loan_data)['risk_assessment']['total_score']
+    rows = {a.analysis_id: a for a in session_factory().query(models.Analysis)}
+    assert rows["current"].risk_score == expected and rows["stale"].risk_score == expected
+    assert json.loads(rows["stale"].category_scores)["Situation familiale"] == 0.0
+    assert {a.rules_version for a in rows.values()} == {RiskEngine(new_rules).rules_version}
+
+def test_rescoring_recomputes_only_changed_categories(session_factory, mock_rules, mock_loan_data, monkeypatch):
+    """Untouched categories keep their stored scores and are not matched again"""
+    new_rules = {**mock_rules, "Genre": {"M": 4, "F": 1}}
+    db = session_factory()
+    db.add(_stored_analysis("a1", mock_rules, mock_loan_data))
+    db.commit()
+
+    job = RescoringJob(mock_rules, new_rules, session_factory=session_factory)
+    matched_categories = []
+    find_matching_rule = job.engine._find_matching_rule
+    monkeypatch.setattr(job.engine, '_find_matching_rule',
+                        lambda category, value: matched_categories.append(category) or find_matching_rule(category, value))
+    job.run()
+
+    stored = session_factory().query(models.Analysis).one()
+    assert set(matched_categories) == {"Genre"}
+    assert json.loads(stored.category_scores) == RiskEngine(new_rules).category_scores_many([mock_loan_data])[0]
+    assert stored.risk_score == RiskEngine(new_rules).evaluate(mock_loan_data)['risk_assessment']['total_score']
+
+def test_rule_store_notifies_subscribers_on_hot_reload(tmp_path):
+    """Editing the rules file outside the API reaches subscribers with both snapshots"""
+    import os
+    from src.risk_engine import RuleStore
+
+    rules_file = tmp_path / "KYC.LOV.csv"
+    rules_file.write_text("Category,Item,Weight\nGenre,M,2\n", encoding='utf-8')
+    store = RuleStore(rules_file)
+    changes = []
+    store.subscribe(lambda previous, snapshot: changes.append((dict(previous.rules['Genre']),
+                                                               dict(snapshot.rules['Genre']))))
+    store.current()
+
+    rules_file.write_text("Category,Item,Weight\nGenre,M,4\n", encoding='utf-8')
+    os.utime(rules_file, (1, 1))
+    store.current()
+    store.current()
+
+    assert changes == [({'M': 2.0}, {'M': 4.0})]
@@ -1,5 +1,6 @@
 import pytest
 from src.risk_engine import RiskEngine
+from src.risk_engine.results import to_plain
 
 def test_risk_engine_initialization(mock_rules):
     """Test risk engine initialization with rules"""
@@ -18,4 +19,221 @@ def test_risk_evaluation(mock_rules, mock_loan_data):
     assert 'loan_info' in assessment
     assert 'risk_assessment' in assessment
     assert 'indicators' in assessment['risk_assessment']
-    assert 'total_score' in assessment['risk_assessment']
\ No newline at end of file
+    assert 'total_score' in assessment['risk_assessment']
+
+def test_find_matching_rule_first_match_wins():
+    """Earlier rules win even when a later rule occurs first in the value"""
+    rules = {"Produit": {"Tok tok": 5, "Tijarati": 5, "Tok": 1}}
+    engine = RiskEngine(rules)
+
+    assert engine._find_matching_rule("Produit", "tijarati tok tok") == ("Tok tok", 5.0)
+    assert engine._find_matching_rule("Produit", "TOK") == ("Tok", 1.0)
+    assert engine._find_matching_rule("Produit", "karhabti") == ("No matching rule", 0.0)
+    assert engine._find_matching_rule("Genre", "M") == ("No matching category", 0.0)
+
+
+def test_extract_region_prefers_branch_description():
+    """Branch description is searched before the customer address"""
+    engine = RiskEngine({"Région": {"TUNIS": 5, "GABES": 15}})
+
+    assert engine._extract_region("AGENCE GABES\r\n", "Tunis, Tunisia") == "GABES"
+    assert engine._extract_region("", "Tunis, Tunisia") == "TUNIS"
+    assert engine._extract_region("", "") == "Unknown"
+
+
+def test_evaluate_many_matches_evaluate(mock_rules, mock_loan_data):
+    """Batch scoring returns the same risk assessment as per-loan scoring"""
+    rules = {**mock_rules, "Niveau d'étude": {"Primaire": 3, "Supérieur": 0}}
+    engine = RiskEngine(rules)
+    other_loan = {
+        **mock_loan_data,
+        "customerDTO": {**mock_loan_data["customerDTO"], "customerType": "INDIV", "maritalStatus": "S"},
+        "udf_data": [{
+            "userDefinedFieldGroupName": "Profil",
+            "udfGroupeFieldsModels": [{"fieldName": "Niveau d'étude", "value": "primary"}]
+        }]
+    }
+    loans = [mock_loan_data, other_loan, mock_loan_data]
+
+    batch = engine.evaluate_many(loans)
+
+    assert batch == [engine.evaluate(loan)['risk_assessment'] for loan in loans]
+    assert [to_plain(result) for result in batch] == [
+        to_plain(engine.evaluate(loan)['risk_assessment']) for loan in loans
+    ]
+    assert batch[1]['indicators']["udf_niveau_d'étude"]['score'] == 3.0
+    assert engine.evaluate_many([]) == []
+
+
+def test_category_scores_add_up_to_total(mock_rules, mock_loan_data):
+    """Per-category scores split the total and can be limited to some categories"""
+    rules = {**mock_rules, "Niveau d'étude": {"Primaire": 3, "Supérieur": 0}}
+    engine = RiskEngine(rules)
+    loan = {**mock_loan_data, "udf_data": [{
+        "userDefinedFieldGroupName": "Profil",
+        "udfGroupeFieldsModels": [{"fieldName": "Niveau d'étude", "value": "primary"}]
+    }]}
+
+    scores = engine.category_scores_many([loan])[0]
+
+    assert sum(scores.values()) == engine.evaluate(loan)['risk_assessment']['total_score']
+    assert scores["Niveau d'étude"] == 3.0 and scores["Genre"] == 2.0
+    assert engine.category_scores_many([loan], {"Genre"}) == [{"Genre": 2.0}]
+    assert engine.category_scores_many([]) == []
+
+
+def test_rule_store_reloads_on_change(tmp_path):
+    """Snapshots are reused until the rules file changes"""
+    import os
+    from src.risk_engine import RuleStore
+
+    rules_file = tmp_path / "KYC.LOV.csv"
+    rules_file.write_text("Category,Item,Weight\nGenre,M,2\nGenre,F,1\n", encoding="utf-8")
+    store = RuleStore(rules_file)
+
+    first = store.current()
+    assert store.current() is first
+    assert first.rules["Genre"]["M"] == 2.0
+    assert first.risk_engine.rules_version == first.version
+
+    rules_file.write_text("Category,Item,Weight\nGenre,M,4\nGenre,F,1\n", encoding="utf-8")
+    os.utime(rules_file, (first.mtime + 5, first.mtime + 5))
+
+    second = store.current()
+    assert second is not first
+    assert second.version != first.version
+    assert second.rules["Genre"]["M"] == 4.0
+
+
+def test_rule_store_keeps_last_good_snapshot_and_writes_atomically(tmp_path):
+    """A truncated or empty rules file is never published; write() validates and replaces the file whole"""
+    import os
+    from src.risk_engine import RuleStore
+
+    rules_file = tmp_path / "KYC.LOV.csv"
+    rules_file.write_text("Category,Item,Weight\nGenre,M,2\n", encoding="utf-8")
+    store = RuleStore(rules_file)
+    changes = []
+    store.subscribe(lambda previous, snapshot: changes.append(snapshot.version))
+    first = store.current()
+
+    for mtime, content in ((first.mtime + 5, "Category,Item,Weight\nGenre,M"), (first.mtime + 10, "")):
+        rules_file.write_text(content, encoding="utf-8")
+        os.utime(rules_file, (mtime, mtime))
+        assert store.current() is first
+    assert changes == []
+
+    with pytest.raises(ValueError):
+        store.write([{'Category': 'Genre', 'Item': 'M', 'Weight': 'heavy'}])
+    assert store.current() is first
+
+    snapshot = store.write([{'Category': 'Genre', 'Item': 'M', 'Weight': '4'}])
+    assert snapshot.rules["Genre"]["M"] == 4.0 and changes == [snapshot.version]
+    assert store.current() is snapshot
+    assert [path.name for path in tmp_path.iterdir()] == ["KYC.LOV.csv"]
+
+
+def test_normalization_lookups_are_memoized(mock_rules):
+    """Normalization uses the precomputed maps and caches repeated raw values"""
+    engine = RiskEngine(mock_rules)
+
+    assert engine._normalize_value('maritalStatus', ' Married ') == ('marié', True)
+    assert engine._normalize_value('customerType', 'sarl') == ('sarl', True)
+    assert engine._normalize_value('customerType', 'INDIV') == ('Autres', False)
+    assert engine._normalize_udf_value("Niveau d'étude", "Higher education") == 'Supérieur'
+    assert engine._normalize_udf_value("Niveau d'étude", "Higher education") == 'Supérieur'
+    assert engine._normalize_udf_value('Type Logement', ['unhashable']) == "['unhashable']"
+
+    assert engine._normalized_udf_values.cache_info().hits == 1
+
+
+def test_assessment_is_a_compact_mapping(mock_rules, mock_loan_data):
+    """Assessments behave like the former nested dicts and serialize lazily"""
+    import json
+    from src.risk_engine.results import json_default
+
+    assessment = RiskEngine(mock_rules).evaluate(mock_loan_data)
+    assessment['business_rules'] = []
+
+    assert not hasattr(assessment, '__dict__')
+    assert list(assessment) == ['customer_info', 'loan_info', 'risk_assessment', 'rules_version', 'business_rules']
+    indicators = assessment['risk_assessment']['indicators']
+    assert indicators['customerType'] == {
+        'value': 'SA', 'matched_rule': 'SA', 'score': 0.0, 'risk_level': indicators['customerType']['risk_level']
+    }
+    assert indicators.score('customerType') == 0.0
+    with pytest.raises(TypeError):
+        indicators['customerType']['score'] = 10.0  # rows are read-only, not silently discarded copies
+
+    plain = assessment.to_dict()
+    assert type(plain['risk_assessment']['indicators']) is dict
+    assert json.loads(json.dumps(assessment, default=json_default)) == json.loads(json.dumps(plain))
+
+
+def test_udf_groups_are_partitioned_by_reference(mock_rules, mock_loan_data):
+    """UDF groups are split in one pass and share the payload's field lists"""
+    rules = {**mock_rules, "Niveau d'étude": {"Primaire": 3}}
+    profile = [{"fieldName": "Niveau d'étude", "value": "Primaire"}, {"fieldName": "Hobby", "value": "x"}]
+    other = [{"fieldName": "Hobby", "value": "y"}]
+    loan = {**mock_loan_data, "udf_data": [
+        {"userDefinedFieldGroupName": "Profil", "udfGroupeFieldsModels": profile},
+        {"userDefinedFieldGroupName": "Divers", "udfGroupeFieldsModels": other},
+        {"userDefinedFieldGroupName": "Vide", "udfGroupeFieldsModels": []}
+    ]}
+
+    customer_info = RiskEngine(rules).evaluate(loan)['customer_info']
+
+    [scoring] = customer_info['scoring_udf_data']
+    [non_scoring] = customer_info['udf_data']
+    assert scoring['udfGroupeFieldsModels'] is profile
+    assert non_scoring['udfGroupeFieldsModels'] is other
+    assert dict(non_scoring) == {"userDefinedFieldGroupName": "Divers", "udfGroupeFieldsModels": other}
+
+
+def test_incremental_evaluation_recomputes_only_changed_groups(mock_rules, mock_loan_data):
+    """Unchanged inputs are reused and the result matches a full evaluation"""
+    from src.risk_engine import IncrementalRiskEvaluator
+
+    rules = {**mock_rules, "Niveau d'étude": {"Primaire": 3, "Supérieur": 0}}
+    engine = RiskEngine(rules)
+    evaluator = IncrementalRiskEvaluator()
+    loan = {**mock_loan_data, "udf_data": [{
+        "userDefinedFieldGroupName": "Profil",
+        "udfGroupeFieldsModels": [{"fieldName": "Niveau d'étude", "value": "Supérieur"}]
+    }]}
+
+    first = evaluator.evaluate(engine, loan)
+    computed = evaluator.recomputed
+
+    updated = {**loan, "udf_data": [{
+        "userDefinedFieldGroupName": "Profil",
+        "udfGroupeFieldsModels": [{"fieldName": "Niveau d'étude", "value": "Primaire"}]
+    }]}
+    second = evaluator.evaluate(engine, updated)
+
+    assert first == engine.evaluate(loan)
+    assert second == engine.evaluate(updated)
+    assert evaluator.recomputed == computed + 1
+    assert evaluator.reused == computed - 1
+    assert second['risk_assessment']['total_score'] == first['risk_assessment']['total_score'] + 3.0
+
+
+def test_incremental_counters_are_exact_under_threads_and_retired_versions_are_dropped(mock_rules, mock_loan_data):
+    """Concurrent evaluations lose no counter updates; forgetting a rules version frees its states"""
+    from concurrent.futures import ThreadPoolExecutor
+    from src.risk_engine import IncrementalRiskEvaluator
+
+    engine = RiskEngine(mock_rules)
+    evaluator = IncrementalRiskEvaluator()
+    loans = [{**mock_loan_data, "loanId": str(i % 20)} for i in range(400)]
+    groups = len(engine._evaluation_fields(mock_loan_data, engine._consolidate_customer_info(
+        mock_loan_data['customerDTO']))) + 1
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(lambda loan: evaluator.evaluate(engine, loan), loans))
+
+    assert evaluator.reused + evaluator.recomputed == len(loans) * groups
+    other = RiskEngine({**mock_rules, "Genre": {"M": 4}})
+    evaluator.evaluate(other, loans[0])
+    evaluator.forget_rules_version(engine.rules_version)
+    assert [key[1] for key in evaluator._states] == [other.rules_version]
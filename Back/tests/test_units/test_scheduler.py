@@ -0,0 +1,38 @@
+import asyncio
+import pytest
+from src.scheduler import AnalysisScheduler, QueueFullError, PRIORITY_BATCH, PRIORITY_INTERACTIVE
+
+
+@pytest.mark.asyncio
+async def test_priority_fairness_and_admission():
+    """Interactive jobs run first, clients alternate and a full queue is refused"""
+    scheduler = AnalysisScheduler(max_workers=1, max_queue=5)
+    gate = asyncio.Event()
+    order = []
+
+    def job(name, wait=False):
+        async def run():
+            if wait:
+                await gate.wait()
+            order.append(name)
+        return run
+
+    await scheduler.submit(job("blocker", wait=True), client_id="x")
+    await asyncio.sleep(0)  # let the single worker pick up the blocker
+
+    await scheduler.submit(job("batch"), client_id="a", priority=PRIORITY_BATCH)
+    await scheduler.submit(job("a1"), client_id="a")
+    await scheduler.submit(job("a2"), client_id="a")
+    await scheduler.submit(job("b1"), client_id="b")
+    await scheduler.submit(job("a3"), client_id="a")
+
+    with pytest.raises(QueueFullError) as refused:
+        await scheduler.submit(job("late"), client_id="c", priority=PRIORITY_INTERACTIVE)
+    assert refused.value.retry_after >= 1
+
+    gate.set()
+    for _ in range(20):
+        await asyncio.sleep(0)
+
+    assert order == ["blocker", "a1", "b1", "a2", "a3", "batch"]
+    assert scheduler.stats()['running'] == 0
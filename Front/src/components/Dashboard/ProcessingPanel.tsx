@@ -8,7 +8,7 @@ interface ProcessingPanelProps {
 }
 
 export default function ProcessingPanel({ analysisId, onCompletion }: ProcessingPanelProps) {
-  const { socket, logs, progress, result, error } = useAnalysisWebSocket(analysisId);
+  const { socket, logs, progress, result, llmOutput, error } = useAnalysisWebSocket(analysisId);
   const logsEndRef = useRef<HTMLDivElement>(null);
   const [connectionStatus, setConnectionStatus] = useState<'disconnected' | 'connecting' | 'connected' | 'error'>('disconnected');
   const [isProcessing, setIsProcessing] = useState(false);
@@ -163,6 +163,16 @@ export default function ProcessingPanel({ analysisId, onCompletion }: Processing
         )}
       </div>
 
+      {/* Live model output */}
+      {llmOutput && !result && (
+        <div className="mt-4 pt-4 border-t border-gray-200 dark:border-gray-700">
+          <div className="text-xs font-medium mb-1 text-gray-500 dark:text-gray-400">AI analysis in progress</div>
+          <pre className="max-h-40 overflow-y-auto whitespace-pre-wrap text-xs font-mono text-gray-700 dark:text-gray-300">
+            {llmOutput}
+          </pre>
+        </div>
+      )}
+
       {/* Progress Bar */}
       {progress > 0 && progress < 100 && (
         <div className="mt-4 pt-4 border-t border-gray-200 dark:border-gray-700">
@@ -2,8 +2,10 @@ import { useEffect, useState } from "react";
 import { toast } from "./use-toast";
 
 interface WebSocketMessage {
-  type: 'log' | 'status' | 'progress' | 'result' | 'error';
+  type: 'log' | 'status' | 'progress' | 'result' | 'error' | 'llm_token';
   message?: string;
+  token?: string;
+  replace?: boolean;
   progress?: number;
   data?: any;
   level?: 'info' | 'warning' | 'error' | 'success';
@@ -22,6 +24,7 @@ export const useAnalysisWebSocket = (analysisId: string | null) => {
   const [logs, setLogs] = useState<LogEntry[]>([]);
   const [progress, setProgress] = useState<number>(0);
   const [result, setResult] = useState<any>(null);
+  const [llmOutput, setLlmOutput] = useState<string>('');
   const [error, setError] = useState<string | null>(null);
   const [isConnected, setIsConnected] = useState<boolean>(false);
 
@@ -32,6 +35,7 @@ useEffect(() => {
     setLogs([]);
     setProgress(0);
     setResult(null);
+    setLlmOutput('');
     setError(null);
     setIsConnected(false);
     console.log('🔄 Analysis ID cleared, resetting state');
@@ -58,7 +62,9 @@ useEffect(() => {
   ws.onmessage = (event) => {
     try {
       const message: WebSocketMessage = JSON.parse(event.data);
-      console.log('📨 WebSocket message received:', message);
+      if (message.type !== 'llm_token') {
+        console.log('📨 WebSocket message received:', message);
+      }
       
       switch (message.type) {
         case 'log':
@@ -79,6 +85,12 @@ useEffect(() => {
           }
           break;
           
+        case 'llm_token':
+          // Generated text streamed while the model is still writing; a replace
+          // message supersedes the partial output of an abandoned generation
+          setLlmOutput(prev => message.replace ? (message.token || '') : prev + (message.token || ''));
+          break;
+          
         case 'result':
           console.log('🎉 Analysis result received:', message.data);
           setResult(message.data || message);
@@ -154,6 +166,7 @@ useEffect(() => {
     logs, 
     progress, 
     result, 
+    llmOutput,
     error,
     isConnected
   };